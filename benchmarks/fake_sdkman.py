@@ -0,0 +1,312 @@
+"""
+合成的 SDKMAN 安装目录
+
+生成一个带有 stub `sdkman-init.sh` 的 SDKMAN_DIR：其中的 `sdk` 函数输出与真实
+SDKMAN 格式一致的列表表格，安装/卸载/切换默认版本只修改合成目录里的
+candidates 布局，不访问网络。FakeBroker 在本机 HTTP 端口上代替 SDKMAN 的下载
+接口，供归档预取使用。
+"""
+
+import hashlib
+import io
+import os
+import shlex
+import threading
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+# (供应商, dist 代码)，顺序与 `sdk list java` 一致
+JAVA_VENDORS = [
+    ("Corretto", "amzn"),
+    ("Gluon", "gln"),
+    ("GraalVM CE", "graalce"),
+    ("GraalVM Oracle", "graal"),
+    ("Java.net", "open"),
+    ("JetBrains", "jbr"),
+    ("Liberica", "librca"),
+    ("Liberica NIK", "nik"),
+    ("Mandrel", "mandrel"),
+    ("Microsoft", "ms"),
+    ("Oracle", "oracle"),
+    ("SapMachine", "sapmchn"),
+    ("Semeru", "sem"),
+    ("Temurin", "tem"),
+    ("Tencent", "kona"),
+    ("Trava", "trava"),
+    ("Zulu", "zulu"),
+]
+JAVA_MAJORS = [23, 22, 21, 17, 11, 8]
+
+CANDIDATES = ["gradle", "java", "kotlin", "maven", "scala"]
+INSTALLED = {
+    "java": ["21.0.2-tem", "17.0.10-tem"],
+    "gradle": ["8.6"],
+}
+CURRENT = {"java": "21.0.2-tem", "gradle": "8.6"}
+# 非 java 候选以网格列出的版本，新版本在前
+GRID_VERSIONS = {
+    "gradle": [f"{major}.{minor}" for major in (8, 7, 6) for minor in range(6, -1, -1)],
+    "kotlin": [f"1.9.{patch}" for patch in range(24, 0, -1)],
+    "maven": [f"3.9.{patch}" for patch in range(6, -1, -1)],
+    "scala": [f"3.3.{patch}" for patch in range(3, -1, -1)],
+}
+
+SEPARATOR = "=" * 80
+
+INIT_SCRIPT = r"""# 基准测试用的 SDKMAN stub，只模拟输出格式与 candidates 目录布局
+export SDKMAN_DIR=%(sdkman_dir)s
+export SDKMAN_CANDIDATES_DIR="$SDKMAN_DIR/candidates"
+sdk() {
+  local fixtures="$SDKMAN_DIR/fixtures"
+  case "$1" in
+    list)
+      if [ -z "$2" ]; then cat "$fixtures/list.txt"
+      elif [ -f "$fixtures/list-$2.txt" ]; then cat "$fixtures/list-$2.txt"
+      else echo "Stop! $2 is not a valid candidate." >&2; return 1; fi;;
+    current)
+      if [ -n "$2" ]; then
+        if [ -L "$SDKMAN_CANDIDATES_DIR/$2/current" ]; then
+          echo "Using $2 version $(basename "$(readlink "$SDKMAN_CANDIDATES_DIR/$2/current")")"
+        else echo "Not using any version of $2"; fi
+      else
+        echo "Using:"; echo
+        for c in "$SDKMAN_CANDIDATES_DIR"/*; do
+          [ -L "$c/current" ] && echo "$(basename "$c"): $(basename "$(readlink "$c/current")")"
+        done
+      fi;;
+    home)
+      if [ -d "$SDKMAN_CANDIDATES_DIR/$2/$3" ]; then echo "$SDKMAN_CANDIDATES_DIR/$2/$3"
+      else echo "Stop! Candidate version is not installed." >&2; return 1; fi;;
+    install)
+      mkdir -p "$SDKMAN_CANDIDATES_DIR/$2/$3/bin"
+      echo "Downloading: $2 $3"; echo "Installing: $2 $3"; echo "Done installing!";;
+    uninstall)
+      rm -rf "$SDKMAN_CANDIDATES_DIR/$2/$3"; echo "Uninstalling $2 $3...";;
+    default)
+      ln -sfn "$SDKMAN_CANDIDATES_DIR/$2/$3" "$SDKMAN_CANDIDATES_DIR/$2/current"
+      echo "Default $2 version set to $3";;
+    use) echo "Using $2 version $3 in this shell.";;
+    version) echo; echo "SDKMAN!"; echo "script: 5.18.2"; echo "native: 0.4.6"; echo;;
+    upgrade) echo "All candidates are up-to-date";;
+    offline) echo "Offline mode ${2}d.";;
+    selfupdate) echo "No update available at this time.";;
+    update) echo "No new candidates found at this time.";;
+    flush) echo "Cleared ${2:-all} state.";;
+    env) echo "sdk env ${2:-use}: nothing to do.";;
+    help) echo "Usage: sdk <subcommand> [candidate] [version]";;
+    config) echo "Opening $SDKMAN_DIR/etc/config";;
+    *) echo "Invalid command: $1" >&2; return 1;;
+  esac
+}
+"""
+
+
+def java_versions(scale: int = 1) -> List[str]:
+    """Return Java version numbers newest first; `scale` multiplies the patch releases."""
+    versions = []
+    for major in JAVA_MAJORS:
+        for patch in range(2 * scale, 0, -1):
+            versions.append(f"{major}.0.{patch}" if major != 8 else f"8.0.{400 + patch}")
+    return versions
+
+
+def java_list_table(scale: int = 1) -> str:
+    """Render `sdk list java` for every vendor in JAVA_VENDORS."""
+    installed = set(INSTALLED["java"])
+    lines = [
+        SEPARATOR,
+        "Available Java Versions for Linux 64bit",
+        SEPARATOR,
+        " Vendor        | Use | Version      | Dist    | Status     | Identifier",
+        "-" * 80,
+    ]
+    for vendor, dist in JAVA_VENDORS:
+        for position, version in enumerate(java_versions(scale)):
+            identifier = f"{version}-{dist}"
+            use = ">>>" if identifier == CURRENT["java"] else ""
+            status = "installed" if identifier in installed else ""
+            name = vendor if position == 0 else ""
+            lines.append(
+                f" {name:<13} | {use:<3} | {version:<12} | {dist:<7} | {status:<10} | {identifier}"
+            )
+    lines += [
+        SEPARATOR,
+        f"Omit Identifier to install default version {CURRENT['java']}:",
+        "    $ sdk install java",
+        "Use TAB completion to discover available versions",
+        "    $ sdk install java [TAB]",
+        "Or install a specific version by Identifier:",
+        f"    $ sdk install java {CURRENT['java']}",
+        "Hit Q to exit this list view",
+        SEPARATOR,
+    ]
+    return "\n".join(lines) + "\n"
+
+
+def grid_list_table(candidate: str, versions: Sequence[str]) -> str:
+    """Render the multi-column layout used by `sdk list <candidate>` for non-Java candidates."""
+    installed = set(INSTALLED.get(candidate, []))
+    cells = []
+    for version in versions:
+        marker = (">" if version == CURRENT.get(candidate) else " ") + " "
+        marker += "*" if version in installed else " "
+        cells.append(f" {marker} {version:<15}")
+    rows = [" ".join(cells[i:i + 4]).rstrip() for i in range(0, len(cells), 4)]
+    return "\n".join([
+        SEPARATOR,
+        f"Available {candidate.capitalize()} Versions",
+        SEPARATOR,
+        *rows,
+        SEPARATOR,
+        "+ - local version",
+        "* - installed",
+        "> - currently in use",
+        SEPARATOR,
+    ]) + "\n"
+
+
+def candidates_overview(candidates: Sequence[str]) -> str:
+    """Render the `sdk list` candidate overview."""
+    lines = [SEPARATOR, "Available Candidates", SEPARATOR]
+    for candidate in candidates:
+        lines += [
+            "-" * 80,
+            f"{candidate.capitalize()} (1.0.0)".ljust(52) + f"https://{candidate}.example.org/",
+            "",
+            f"{candidate.capitalize()} is a synthetic candidate used for benchmarking.",
+            "",
+            f"$ sdk install {candidate}".rjust(80),
+        ]
+    lines.append("-" * 80)
+    return "\n".join(lines) + "\n"
+
+
+def list_fixtures(scale: int = 1) -> Dict[str, str]:
+    """Return the recorded `sdk list` outputs by fixture file name."""
+    fixtures = {
+        "list.txt": candidates_overview(CANDIDATES),
+        "list-java.txt": java_list_table(scale),
+    }
+    for candidate, versions in GRID_VERSIONS.items():
+        fixtures[f"list-{candidate}.txt"] = grid_list_table(candidate, versions)
+    return fixtures
+
+
+def expected_versions(candidate: str, scale: int = 1) -> List[Dict[str, object]]:
+    """Return the records `sdk list <candidate>` of the fake should parse into, built from
+    the same inputs as the tables rather than from their text."""
+    installed = set(INSTALLED.get(candidate, []))
+    if candidate == "java":
+        rows = [
+            (vendor, version, dist, f"{version}-{dist}")
+            for vendor, dist in JAVA_VENDORS for version in java_versions(scale)
+        ]
+    else:
+        rows = [("", version, "", version) for version in GRID_VERSIONS[candidate]]
+    return [
+        {
+            "vendor": vendor,
+            "use": identifier == CURRENT.get(candidate),
+            "version": version,
+            "dist": dist,
+            "status": "installed" if identifier in installed else "",
+            "identifier": identifier,
+        }
+        for vendor, version, dist, identifier in rows
+    ]
+
+
+def build_fake_sdkman(root: str, scale: int = 1) -> str:
+    """Create a synthetic SDKMAN_DIR under root and return its path."""
+    sdkman_dir = os.path.join(root, "sdkman")
+    for name in ("bin", "etc", "tmp", "var", "fixtures"):
+        os.makedirs(os.path.join(sdkman_dir, name), exist_ok=True)
+
+    with open(os.path.join(sdkman_dir, "bin", "sdkman-init.sh"), "w", encoding="utf-8") as f:
+        f.write(INIT_SCRIPT % {"sdkman_dir": shlex.quote(sdkman_dir)})
+    with open(os.path.join(sdkman_dir, "var", "candidates"), "w", encoding="utf-8") as f:
+        f.write(",".join(CANDIDATES))
+    with open(os.path.join(sdkman_dir, "var", "platform"), "w", encoding="utf-8") as f:
+        f.write("linuxx64")
+    with open(os.path.join(sdkman_dir, "etc", "config"), "w", encoding="utf-8") as f:
+        f.write("sdkman_auto_answer=true\n")
+    for name, content in list_fixtures(scale).items():
+        with open(os.path.join(sdkman_dir, "fixtures", name), "w", encoding="utf-8") as f:
+            f.write(content)
+
+    for candidate, versions in INSTALLED.items():
+        for version in versions:
+            os.makedirs(os.path.join(sdkman_dir, "candidates", candidate, version, "bin"),
+                        exist_ok=True)
+        current = os.path.join(sdkman_dir, "candidates", candidate, "current")
+        if not os.path.lexists(current):
+            os.symlink(os.path.join(sdkman_dir, "candidates", candidate, CURRENT[candidate]),
+                       current)
+    return sdkman_dir
+
+
+def fake_archive(candidate: str, version: str) -> bytes:
+    """Return a small zip laid out like an SDKMAN candidate archive."""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr(f"{candidate}-{version}/bin/{candidate}", f"#!/bin/sh\necho {version}\n")
+    return buffer.getvalue()
+
+
+class FakeBroker:
+    """Serve archives on 127.0.0.1 the way SDKMAN's broker does.
+
+    `GET /broker/download/<candidate>/<version>/<platform>` returns the archive with its
+    SHA-256 in the X-Sdkman-Checksum-SHA-256 header. Keys in `corrupt` are served with a
+    damaged body but the original checksum; every request path is kept in `requests`.
+    """
+
+    def __init__(self) -> None:
+        self.archives: Dict[Tuple[str, str], bytes] = {}
+        self.corrupt: Set[Tuple[str, str]] = set()
+        self.requests: List[str] = []
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def add(self, candidate: str, version: str, data: Optional[bytes] = None) -> bytes:
+        data = data if data is not None else fake_archive(candidate, version)
+        self.archives[(candidate, version)] = data
+        return data
+
+    def start(self) -> str:
+        """Start serving in a daemon thread and return the API base URL."""
+        broker = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                broker.requests.append(self.path)
+                parts = self.path.strip("/").split("/")
+                key = (parts[2], parts[3]) if len(parts) == 5 and parts[:2] == [
+                    "broker", "download"] else None
+                data = broker.archives.get(key) if key else None
+                if data is None:
+                    self.send_error(404)
+                    return
+                checksum = hashlib.sha256(data).hexdigest()
+                if key in broker.corrupt:
+                    data = data[:-1] + bytes([data[-1] ^ 0xFF])
+                self.send_response(200)
+                self.send_header("Content-Type", "application/zip")
+                self.send_header("Content-Length", str(len(data)))
+                self.send_header("X-Sdkman-Checksum-SHA-256", checksum)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format: str, *args: object) -> None:
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
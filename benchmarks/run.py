@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+SDKMAN MCP 基准测试
+
+在合成的 SDKMAN_DIR 上测量命令层、解析器、MCP 工具和服务器启动的延迟与吞吐量，
+结果以 JSON 输出，便于在不同版本之间比较。
+
+用法：
+    python benchmarks/run.py [--suite all|command|parse|tools|startup]
+                             [--iterations N] [--scale N] [--output results.json]
+
+示例：
+    python benchmarks/run.py                          # 运行全部基准，结果打印到标准输出
+    python benchmarks/run.py --suite parse --scale 20 # 只测解析器，使用 20 倍大小的 Java 表格
+    python benchmarks/run.py --output bench.json      # 结果写入文件
+"""
+
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.abspath(os.path.join(BENCHMARKS_DIR, "..", "src"))
+sys.path.insert(0, SRC_DIR)
+sys.path.insert(0, BENCHMARKS_DIR)
+
+from fake_sdkman import (  # noqa: E402
+    FakeBroker, build_fake_sdkman, expected_versions, java_list_table, list_fixtures
+)
+
+SUITES = ("command", "parse", "tools", "startup")
+
+# 每个 MCP 工具的调用参数；修改类工具按顺序执行，安装后再卸载以保持合成目录不变
+TOOL_ARGUMENTS: Dict[str, Dict[str, Any]] = {
+    "sdk_list_all": {},
+    "sdk_list_versions": {"candidate": "java"},
+    "sdk_query_versions": {"candidate": "java", "vendor": "tem", "major": "21"},
+    "sdk_resolve_version": {"spec": "java@21 vendor=tem"},
+    "sdk_install_resolved": {"spec": "java@21", "background": False},
+    "sdk_current_all": {},
+    "sdk_current_version": {"candidate": "java"},
+    "sdk_get_home": {"candidate": "java", "version": "21.0.2-tem"},
+    "sdk_install_version": {"candidate": "kotlin", "version": "1.9.22", "background": False},
+    "sdk_install_many": {"items": [
+        {"candidate": "kotlin", "version": "1.9.21"},
+        {"candidate": "maven", "version": "3.9.6"},
+    ]},
+    "sdk_prefetch": {"items": [
+        {"candidate": "kotlin", "version": "1.9.20"},
+        {"candidate": "maven", "version": "3.9.5"},
+    ]},
+    "sdk_uninstall_version": {"candidate": "kotlin", "version": "1.9.22"},
+    "sdk_use_version": {"candidate": "java", "version": "17.0.10-tem"},
+    "sdk_set_default": {"candidate": "java", "version": "21.0.2-tem"},
+    "sdk_manage_env": {},
+    "sdk_resolve_env": {"sdks": ["java@21", "gradle"], "format": "export"},
+    "sdk_disk_usage": {},
+    "sdk_gc": {"keep": 1},
+    "sdk_dedup": {"dry_run": True},
+    "sdk_check_upgrade": {"background": False},
+    "sdk_get_version": {},
+    "sdk_set_offline": {"mode": "disable"},
+    "sdk_self_update": {"background": False},
+    "sdk_update_candidates": {},
+    "sdk_flush_state": {"mode": "tmp"},
+    "sdk_get_help": {},
+    "sdk_job_status": {},
+    "sdk_edit_config": {},
+}
+
+# 需要访问 SDKMAN 元数据 API 的工具不参与基准；归档下载由本机的 FakeBroker 提供
+NETWORK_TOOLS = {"sdk_refresh_metadata"}
+
+
+def summarize(samples: List[float]) -> Dict[str, Any]:
+    """Summarise latency samples given in seconds as milliseconds."""
+    ordered = sorted(samples)
+
+    def percentile(p: float) -> float:
+        return ordered[min(len(ordered) - 1, int(round(p * (len(ordered) - 1))))]
+
+    return {
+        "iterations": len(samples),
+        "mean_ms": round(statistics.fmean(samples) * 1000, 3),
+        "p50_ms": round(percentile(0.50) * 1000, 3),
+        "p95_ms": round(percentile(0.95) * 1000, 3),
+        "p99_ms": round(percentile(0.99) * 1000, 3),
+        "min_ms": round(ordered[0] * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+
+
+def measure(func: Callable[[], Any], iterations: int, warmup: int = 2) -> Dict[str, Any]:
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    return summarize(samples)
+
+
+def throughput(func: Callable[[], Any], total: int, concurrency: int) -> Dict[str, Any]:
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for future in [executor.submit(func) for _ in range(total)]:
+            future.result()
+    elapsed = time.perf_counter() - started
+    return {
+        "operations": total,
+        "concurrency": concurrency,
+        "elapsed_seconds": round(elapsed, 3),
+        "ops_per_second": round(total / elapsed, 1),
+    }
+
+
+def bench_command(iterations: int) -> Dict[str, Any]:
+    """Latency of _run_command through the worker pool and through one-shot shells."""
+    sdk_commands = importlib.import_module("sdkman_mcp.sdk_commands")
+
+    def check(result: Any) -> None:
+        if result[0] != 0:
+            raise RuntimeError(f"Command failed: {result[2]}")
+
+    results = {
+        "run_command.version": measure(
+            lambda: check(sdk_commands._run_command(["version"])), iterations),
+        "run_command.list_java": measure(
+            lambda: check(sdk_commands._run_command(["list", "java"])), iterations),
+        "run_command_oneshot.version": measure(
+            lambda: check(sdk_commands._run_command_oneshot(["version"])), iterations),
+    }
+    concurrency = max(1, sdk_commands.WORKER_POOL_SIZE) * 2
+    results["run_command.throughput"] = throughput(
+        lambda: check(sdk_commands._run_command(["list", "java"])), iterations * 5, concurrency)
+    return results
+
+
+def check_parsers(scale: int) -> None:
+    """Check that the streaming parser, fed line by line, yields the records every
+    generated `sdk list <candidate>` table was built from."""
+    sdk_commands = importlib.import_module("sdkman_mcp.sdk_commands")
+    for name, table in list_fixtures(scale).items():
+        candidate = name[len("list-"):-len(".txt")] if name.startswith("list-") else None
+        if candidate is None:
+            continue
+        for search in (None, "21", "8"):
+            expected = [
+                record for record in expected_versions(candidate, scale)
+                if not search or search in record["version"]
+            ]
+            streamed = list(sdk_commands.iter_sdk_versions(iter(table.splitlines(True)), search))
+            if streamed != expected:
+                raise RuntimeError(f"iter_sdk_versions misparses {name} (search={search!r})")
+
+
+def bench_parse(iterations: int, scale: int) -> Dict[str, Any]:
+    """Parsing speed of parse_sdk_versions on Java tables of increasing size, and of the
+    streaming parser stopping at the first match."""
+    sdk_commands = importlib.import_module("sdkman_mcp.sdk_commands")
+    check_parsers(scale)
+
+    def first_installed(table: str) -> Any:
+        versions = sdk_commands.iter_sdk_versions(table, "21")
+        return next(v for v in versions if v["dist"] == "tem" and v["status"] == "installed")
+
+    results = {}
+    for factor in sorted({1, scale}):
+        table = java_list_table(factor)
+        rows = len(sdk_commands.parse_sdk_versions(table))
+        result = measure(lambda: sdk_commands.parse_sdk_versions(table), iterations)
+        result.update(rows=rows, bytes=len(table.encode("utf-8")))
+        result["rows_per_second"] = round(rows / (result["mean_ms"] / 1000), 1)
+        results[f"parse_sdk_versions.x{factor}"] = result
+        results[f"parse_sdk_versions.x{factor}.search"] = measure(
+            lambda: sdk_commands.parse_sdk_versions(table, "21"), iterations)
+        results[f"iter_sdk_versions.x{factor}.first_installed"] = measure(
+            lambda: first_installed(table), iterations)
+    return results
+
+
+def _tool_succeeded(response: Any) -> bool:
+    """Tools report SDKMAN failures as {"success": false} rather than MCP errors."""
+    for content in response.content:
+        try:
+            if json.loads(getattr(content, "text", "")).get("success") is False:
+                return False
+        except (ValueError, AttributeError):
+            continue
+    return True
+
+
+async def _bench_tools(iterations: int) -> Dict[str, Any]:
+    from mcp.shared.memory import create_connected_server_and_client_session
+
+    server_module = importlib.import_module("sdkman_mcp.server")
+    server = server_module.create_server()
+    results: Dict[str, Any] = {}
+    async with create_connected_server_and_client_session(server._mcp_server) as session:
+        tools = (await session.list_tools()).tools
+        for tool in tools:
+            if tool.name in NETWORK_TOOLS:
+                results[f"tool.{tool.name}"] = {"skipped": "requires the SDKMAN API"}
+                continue
+            arguments = TOOL_ARGUMENTS.get(tool.name)
+            if arguments is None:
+                results[f"tool.{tool.name}"] = {"skipped": "no benchmark arguments"}
+                continue
+            samples, errors = [], 0
+            for _ in range(iterations):
+                started = time.perf_counter()
+                response = await session.call_tool(tool.name, arguments)
+                samples.append(time.perf_counter() - started)
+                errors += int(bool(response.isError) or not _tool_succeeded(response))
+            results[f"tool.{tool.name}"] = dict(summarize(samples), errors=errors)
+    return results
+
+
+def bench_tools(iterations: int) -> Dict[str, Any]:
+    """Round-trip latency of every MCP tool through an in-memory client session."""
+    return asyncio.run(_bench_tools(iterations))
+
+
+def bench_startup(iterations: int) -> Dict[str, Any]:
+    """Wall time of fresh interpreters importing the server and creating it."""
+    scripts = {
+        "startup.import_server": "import sdkman_mcp.server",
+        "startup.create_server": "import sdkman_mcp.server as s; s.create_server()",
+    }
+    env = dict(os.environ, PYTHONPATH=SRC_DIR)
+    results = {}
+    for name, script in scripts.items():
+        results[name] = measure(
+            lambda: subprocess.run([sys.executable, "-c", script], env=env, check=True),
+            iterations, warmup=1)
+    return results
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BENCHMARKS_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main() -> None:
+    """主入口函数"""
+    parser = argparse.ArgumentParser(description="SDKMAN MCP 基准测试")
+    parser.add_argument("--suite", choices=("all",) + SUITES, default="all", help="要运行的基准")
+    parser.add_argument("--iterations", type=int, default=20, help="每项测量的迭代次数")
+    parser.add_argument("--scale", type=int, default=10, help="大表格解析基准的放大倍数")
+    parser.add_argument("--output", help="结果 JSON 文件（默认输出到标准输出）")
+    args = parser.parse_args()
+
+    broker = FakeBroker()
+    for item in TOOL_ARGUMENTS["sdk_prefetch"]["items"]:
+        broker.add(item["candidate"], item["version"])
+    with tempfile.TemporaryDirectory(prefix="sdkman-bench-") as root:
+        sdkman_dir = build_fake_sdkman(root, args.scale)
+        # sdkman_mcp 在导入时读取配置，必须在导入前设置
+        os.environ.update({
+            "SDKMAN_DIR": sdkman_dir,
+            "SDKMAN_MCP_ARCHIVE_CACHE_DIR": os.path.join(root, "archives"),
+            "SDKMAN_MCP_SNAPSHOT_PATH": os.path.join(root, "metadata.sqlite"),
+            "SDKMAN_MCP_SNAPSHOT_REFRESH_INTERVAL": "0",
+            "SDKMAN_MCP_JOB_JOURNAL": os.path.join(root, "jobs.sqlite"),
+            "SDKMAN_MCP_DEDUP_INDEX": os.path.join(root, "dedup.sqlite"),
+            "SDKMAN_MCP_OUTPUT_SPILL_DIR": os.path.join(root, "output"),
+            "SDKMAN_CANDIDATES_API": broker.start(),
+            "FASTMCP_LOG_LEVEL": "WARNING",
+        })
+
+        suites = SUITES if args.suite == "all" else (args.suite,)
+        results: Dict[str, Any] = {}
+        for suite in suites:
+            if suite == "command":
+                results.update(bench_command(args.iterations))
+            elif suite == "parse":
+                results.update(bench_parse(args.iterations, args.scale))
+            elif suite == "tools":
+                results.update(bench_tools(args.iterations))
+            elif suite == "startup":
+                results.update(bench_startup(max(1, args.iterations // 4)))
+
+        # 删除合成目录前先关闭常驻 worker
+        sdk_commands = sys.modules.get("sdkman_mcp.sdk_commands")
+        if sdk_commands is not None:
+            for root in sdk_commands.active_roots():
+                root.close()
+        broker.stop()
+
+    sdkman_mcp = importlib.import_module("sdkman_mcp")
+    report = {
+        "meta": {
+            "version": sdkman_mcp.__version__,
+            "revision": _git_revision(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "suites": list(suites),
+            "iterations": args.iterations,
+            "scale": args.scale,
+        },
+        "results": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,157 @@
-"""SDKMAN! MCP Server main entry point."""
+"""SDKMAN! MCP Server main entry point.
 
-import asyncio
+Only the standard library is imported here; the MCP SDK and the server are imported
+inside main() so that `--version` and `--profile-startup` stay cheap, and the SDKMAN
+command layer is imported on the first tool call.
+"""
+
+import argparse
 import os
+import subprocess
 import sys
-from importlib import metadata
+import time
+from functools import lru_cache
+from typing import Dict, List, Tuple
 
-from mcp.server.fastmcp import FastMCP
+# 启动预算（毫秒）：导入 sdkman_mcp.server 并创建服务器，不含 MCP SDK 本身的导入
+STARTUP_TARGET_MS = 50.0
 
-from .server import create_server
 
+@lru_cache(maxsize=None)
+def package_version() -> str:
+    """Return the installed package version, falling back to `__version__`."""
+    from importlib import metadata
 
-def main() -> None:
-    """Run the SDKMAN! MCP Server."""
     try:
-        version = metadata.version("sdkman-mcp")
+        return metadata.version("sdkman-mcp")
     except metadata.PackageNotFoundError:
-        from . import __version__ as version
+        from . import __version__
+
+        return __version__
+
+
+def _import_breakdown(top: int = 12) -> List[Tuple[str, float]]:
+    """Import the server in a fresh interpreter with `-X importtime` and return the
+    import time of each top-level package in milliseconds, slowest first."""
+    script = "import sdkman_mcp.server as s; s.create_server()"
+    src_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    python_path = os.pathsep.join(filter(None, [src_dir, os.environ.get("PYTHONPATH")]))
+    env = dict(os.environ, PYTHONPATH=python_path)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", script],
+        env=env, capture_output=True, text=True, check=False,
+    )
+    totals: Dict[str, float] = {}
+    for line in result.stderr.splitlines():
+        # 格式："import time: self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        try:
+            self_us = int(line.split(":", 1)[1].split("|")[0])
+        except ValueError:
+            continue
+        package = line.rsplit("|", 1)[1].strip().split(".")[0]
+        totals[package] = totals.get(package, 0.0) + self_us / 1000
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)[:top]
+
+
+def profile_startup() -> int:
+    """Print how long each startup phase takes and whether the startup target is met.
+
+    Nothing is started or written: the command layer is imported but its background
+    work (snapshot refresher, job queue, watcher) is not.
+    """
+    phases: List[Tuple[str, float]] = []
+
+    def phase(name: str, started: float) -> float:
+        now = time.perf_counter()
+        phases.append((name, (now - started) * 1000))
+        return now
+
+    started = time.perf_counter()
+    import mcp.server.fastmcp  # noqa: F401
+
+    started = phase("import mcp.server.fastmcp", started)
+    from .server import create_server
+
+    started = phase("import sdkman_mcp.server", started)
+    server = create_server()
+    started = phase("create_server()", started)
+
+    import asyncio
+
+    started = time.perf_counter()
+    asyncio.run(server.list_tools())
+    started = phase("first tools/list (build tool schemas)", started)
+    # 只计时导入；server._commands() 还会启动快照刷新、任务队列（打开并恢复任务日志）
+    # 与目录监视，性能分析不应产生这些副作用
+    from . import async_commands, sdk_commands  # noqa: F401
+
+    phase("first tool call (import command layer)", started)
+
+    out = sys.stderr
+    print("Startup phases:", file=out)
+    for name, ms in phases:
+        print(f"  {name:<42} {ms:8.1f} ms", file=out)
+
+    print("Import time by top-level package (fresh interpreter, self time):", file=out)
+    for package, ms in _import_breakdown():
+        print(f"  {package:<42} {ms:8.1f} ms", file=out)
+
+    own = phases[1][1] + phases[2][1]
+    verdict = "ok" if own <= STARTUP_TARGET_MS else "over budget"
+    print(f"sdkman_mcp startup: {own:.1f} ms (target {STARTUP_TARGET_MS:.0f} ms, {verdict})",
+          file=out)
+    return 0 if own <= STARTUP_TARGET_MS else 1
+
+
+def main() -> int:
+    """Run the SDKMAN! MCP Server."""
+    parser = argparse.ArgumentParser(prog="sdkman-mcp", description="SDKMAN! MCP Server")
+    parser.add_argument("--version", action="store_true", help="Print the version and exit")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="Print a breakdown of startup and import times and exit")
+    parser.add_argument("--transport", choices=("stdio", "sse", "http"),
+                        default=os.environ.get("SDKMAN_MCP_TRANSPORT", "stdio"),
+                        help="stdio for one client, or serve many clients over SSE or "
+                             "streamable HTTP (default: stdio)")
+    parser.add_argument("--host", default=os.environ.get("SDKMAN_MCP_HOST", "127.0.0.1"),
+                        help="Address to listen on with sse/http (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int,
+                        default=int(os.environ.get("SDKMAN_MCP_PORT", "8000")),
+                        help="Port to listen on with sse/http (default: 8000)")
+    parser.add_argument("--max-connections", type=int,
+                        default=int(os.environ.get("SDKMAN_MCP_MAX_CONNECTIONS", "256")),
+                        help="Open connections accepted at once with sse/http; "
+                             "0 means no limit (default: 256)")
+    parser.add_argument("--drain-timeout", type=float,
+                        default=float(os.environ.get("SDKMAN_MCP_DRAIN_TIMEOUT", "600")),
+                        help="Seconds to wait for tool calls and background jobs when "
+                             "stopping with sse/http (default: 600)")
+    args = parser.parse_args()
+
+    if args.version:
+        print(f"sdkman-mcp {package_version()}")
+        return 0
+    if args.profile_startup:
+        return profile_startup()
+
+    from .server import create_server
 
     sdk_server = create_server()
-    sdk_server.run()
+    if args.transport == "stdio":
+        sdk_server.run()
+        return 0
+
+    if args.transport == "http" and not hasattr(sdk_server, "streamable_http_app"):
+        parser.error("--transport http requires mcp>=1.8; use --transport sse")
+
+    from .network import serve
+
+    serve(sdk_server, args.transport, args.host, args.port,
+          max_connections=args.max_connections, drain_timeout=args.drain_timeout)
+    return 0
 
 
 if __name__ == "__main__":
-    sys.exit(main()) 
\ No newline at end of file
+    sys.exit(main())
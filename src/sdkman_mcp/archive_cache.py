@@ -0,0 +1,291 @@
+"""
+Archive Cache Module
+
+This module keeps a content-addressed cache of SDK archives outside $SDKMAN_DIR/tmp,
+so archives survive `sdk flush tmp` and can be shared between machines through a
+common volume.
+
+Layout of the cache directory:
+    objects/<sha256[:2]>/<sha256>   archive contents, named by their SHA-256
+    refs/<candidate>-<version>-<platform>   the digest of the archive for that key
+
+The modification time of an object records when it was last used, which drives the
+LRU eviction once the cache grows past its size limit. Archives are copied (cloned where
+the file system can) in and out of the cache, never hard-linked, so the read-only
+objects do not share an inode with SDKMAN's own files in tmp/.
+"""
+
+import hashlib
+import logging
+import os
+import shutil
+import stat
+import tarfile
+import tempfile
+import threading
+import time
+import urllib.request
+import zipfile
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+DOWNLOAD_TIMEOUT = 60
+ZIP_EPOCH = (1980, 1, 1, 0, 0, 0)
+# linux/fs.h 中的 FICLONE ioctl
+_FICLONE = 0x40049409
+
+
+class ArchiveCacheError(Exception):
+    """Raised when an archive cannot be downloaded or stored."""
+
+
+def archive_key(candidate: str, version: str, platform: str) -> str:
+    return f"{candidate}-{version}-{platform}"
+
+
+def _sha256_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(DOWNLOAD_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _clone_or_copy(source: str, target: str, mode: int) -> None:
+    """Replace target with a copy of source that has the given mode.
+
+    The copy is a copy-on-write clone where the file system supports it, and a plain
+    copy otherwise.
+    """
+    directory = os.path.dirname(target)
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with open(source, "rb") as src, os.fdopen(fd, "wb") as dst:
+            try:
+                import fcntl
+                fcntl.ioctl(dst.fileno(), _FICLONE, src.fileno())
+            except (ImportError, OSError):
+                shutil.copyfileobj(src, dst, DOWNLOAD_CHUNK_SIZE)
+        os.chmod(temp_path, mode)
+        os.replace(temp_path, target)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _mark_used(path: str) -> bool:
+    """Refresh the mtime of a cached object; False only when the object is gone."""
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        return False
+    except OSError as e:
+        # 共享卷上非属主不能修改 mtime（EPERM），对象仍然可用，只是 LRU 顺序不更新
+        logger.debug(f"Cannot mark {path} as used: {str(e)}")
+    return True
+
+
+def repack_tarball_as_zip(source: str, target: str) -> None:
+    """Convert a tarball into the zip layout SDKMAN installs from.
+
+    SDKMAN's post-installation hooks turn downloaded tarballs into zips before
+    installing; doing the same here lets a prefetched archive be used as-is.
+    """
+    with tarfile.open(source) as tar, zipfile.ZipFile(target, "w") as archive:
+        for member in tar:
+            info = zipfile.ZipInfo(member.name + ("/" if member.isdir() else ""))
+            # zip 无法表示 1980 年以前的时间（可复现构建常把 mtime 设为 0）
+            info.date_time = max(time.localtime(member.mtime)[:6], ZIP_EPOCH)
+            if member.issym():
+                info.external_attr = (stat.S_IFLNK | 0o777) << 16
+                archive.writestr(info, member.linkname)
+            elif member.isdir():
+                info.external_attr = (stat.S_IFDIR | member.mode) << 16 | 0x10
+                archive.writestr(info, b"")
+            elif member.isfile():
+                info.external_attr = (stat.S_IFREG | member.mode) << 16
+                info.compress_type = zipfile.ZIP_DEFLATED
+                with tar.extractfile(member) as data, archive.open(info, "w") as out:
+                    shutil.copyfileobj(data, out, DOWNLOAD_CHUNK_SIZE)
+
+
+class ArchiveCache:
+    """A size-bounded, content-addressed store of SDK archives."""
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = os.path.expanduser(directory)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stored": 0, "evicted": 0, "downloaded": 0}
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.directory, "objects", digest[:2], digest)
+
+    def _ref_path(self, key: str) -> str:
+        return os.path.join(self.directory, "refs", key)
+
+    def _bump(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self._stats[name] += amount
+
+    def lookup(self, key: str) -> Optional[str]:
+        """Return the cached archive for a key and mark it as recently used."""
+        try:
+            with open(self._ref_path(key), encoding="ascii") as f:
+                digest = f.read().strip()
+        except OSError:
+            self._bump("misses")
+            return None
+        path = self._object_path(digest)
+        if not _mark_used(path):
+            # 对象已被其他进程淘汰
+            self._bump("misses")
+            return None
+        self._bump("hits")
+        return path
+
+    def stage(self, key: str, target: str) -> bool:
+        """Place a writable copy of the cached archive for a key at target.
+
+        Returns False on a cache miss.
+        """
+        path = self.lookup(key)
+        if path is None:
+            return False
+        try:
+            _clone_or_copy(path, target, 0o644)
+        except OSError as e:
+            logger.warning(f"Failed to stage cached archive {key}: {str(e)}")
+            return False
+        return True
+
+    def store(self, key: str, source: str, digest: Optional[str] = None,
+              move: bool = False) -> str:
+        """Add a file to the cache under a key and return its digest.
+
+        The source is copied unless `move` is set, in which case it must be a file of
+        the cache's own (e.g. a finished download) and is renamed into place.
+        """
+        digest = digest or _sha256_file(source)
+        path = self._object_path(digest)
+        if not os.path.exists(path):
+            if move:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.chmod(source, 0o444)
+                os.replace(source, path)
+            else:
+                _clone_or_copy(source, path, 0o444)
+            self._bump("stored")
+        else:
+            _mark_used(path)
+        ref_path = self._ref_path(key)
+        os.makedirs(os.path.dirname(ref_path), exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+            "w", dir=os.path.dirname(ref_path), prefix=".tmp-", delete=False, encoding="ascii"
+        ) as f:
+            f.write(digest)
+        os.replace(f.name, ref_path)
+        self.evict()
+        return digest
+
+    def download(self, key: str, url: str) -> Dict[str, Any]:
+        """Download an archive into the cache, verifying SDKMAN's SHA-256 header if sent."""
+        os.makedirs(self.directory, exist_ok=True)
+        digest = hashlib.sha256()
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, prefix=".download-")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                request = urllib.request.Request(url, headers={"User-Agent": "sdkman-mcp"})
+                with urllib.request.urlopen(request, timeout=DOWNLOAD_TIMEOUT) as response:
+                    expected = response.headers.get("X-Sdkman-Checksum-SHA-256")
+                    for chunk in iter(lambda: response.read(DOWNLOAD_CHUNK_SIZE), b""):
+                        digest.update(chunk)
+                        out.write(chunk)
+            if expected and expected.lower() != digest.hexdigest():
+                raise ArchiveCacheError(f"Checksum mismatch for {url}")
+
+            archive_path, archive_digest = temp_path, digest.hexdigest()
+            if not zipfile.is_zipfile(temp_path) and tarfile.is_tarfile(temp_path):
+                archive_path = temp_path + ".zip"
+                repack_tarball_as_zip(temp_path, archive_path)
+                archive_digest = None
+            self._bump("downloaded")
+            stored = self.store(key, archive_path, archive_digest, move=True)
+            return {"digest": stored, "bytes": os.path.getsize(self._object_path(stored))}
+        except (OSError, tarfile.TarError, zipfile.BadZipFile) as e:
+            raise ArchiveCacheError(f"Failed to download {url}: {str(e)}") from e
+        finally:
+            for path in (temp_path, temp_path + ".zip"):
+                if os.path.exists(path):
+                    os.unlink(path)
+
+    def _objects(self) -> List[Tuple[float, int, str]]:
+        entries = []
+        root = os.path.join(self.directory, "objects")
+        try:
+            prefixes = list(os.scandir(root))
+        except OSError:
+            return entries
+        for prefix in prefixes:
+            if not prefix.is_dir():
+                continue
+            with os.scandir(prefix.path) as objects:
+                for entry in objects:
+                    try:
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((st.st_mtime, st.st_size, entry.path))
+        return entries
+
+    def evict(self) -> int:
+        """Remove least recently used archives until the cache fits its size limit."""
+        if self.max_bytes <= 0:
+            return 0
+        entries = self._objects()
+        total = sum(size for _, size, _ in entries)
+        evicted = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            total -= size
+            evicted += 1
+        if evicted:
+            self._bump("evicted", evicted)
+            self._prune_refs()
+        return evicted
+
+    def _prune_refs(self) -> None:
+        try:
+            refs = list(os.scandir(os.path.join(self.directory, "refs")))
+        except OSError:
+            return
+        for ref in refs:
+            try:
+                with open(ref.path, encoding="ascii") as f:
+                    digest = f.read().strip()
+                if not os.path.exists(self._object_path(digest)):
+                    os.unlink(ref.path)
+            except OSError:
+                continue
+
+    def stats(self) -> Dict[str, Any]:
+        entries = self._objects()
+        with self._lock:
+            return dict(
+                self._stats,
+                directory=self.directory,
+                archives=len(entries),
+                bytes=sum(size for _, size, _ in entries),
+                max_bytes=self.max_bytes,
+            )
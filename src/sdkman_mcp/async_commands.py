@@ -0,0 +1,339 @@
+"""
+Async SDK Command Module
+
+This module provides awaitable versions of the sdk_* functions in sdk_commands.
+Commands run on a dedicated thread pool, so a long install never blocks the event
+loop, and separate limits for queries and mutations keep read-only calls answering
+while installs are in progress. Each SDKMAN root (see sdk_commands.use_root) has its
+own thread pool and limits, so one tenant's installs cannot starve another's calls.
+"""
+
+import asyncio
+import functools
+import logging
+import os
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from . import sdk_commands
+from .jobs import FINISHED_STATES
+
+logger = logging.getLogger(__name__)
+
+# 异步流式回调：(stream, line)
+AsyncOutputCallback = Callable[[str, str], Awaitable[None]]
+
+# 查询与修改类命令分别限流，安装再多也不会占满查询的并发额度；
+# 同一 candidate 上的修改由 sdk_commands 中的锁排序，这里只限制总数
+MAX_CONCURRENT_QUERIES = int(os.environ.get("SDKMAN_MCP_MAX_CONCURRENT", "4"))
+MAX_CONCURRENT_MUTATIONS = int(os.environ.get("SDKMAN_MCP_MAX_CONCURRENT_MUTATIONS", "4"))
+
+# sdk_job_wait 轮询任务状态的间隔（秒）
+JOB_POLL_INTERVAL = 0.5
+
+# 每个 SDKMAN 根目录一个线程池，键为根目录的 key
+_executors: Dict[str, ThreadPoolExecutor] = {}
+_executors_lock = threading.Lock()
+
+# asyncio.Semaphore 绑定到事件循环，按循环、再按根目录分别创建
+_Semaphores = Tuple[asyncio.Semaphore, asyncio.Semaphore]
+_semaphores: "weakref.WeakKeyDictionary[Any, Dict[str, _Semaphores]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _executor(root: sdk_commands.SdkmanRoot) -> ThreadPoolExecutor:
+    """Return the thread pool of a root."""
+    with _executors_lock:
+        executor = _executors.get(root.key)
+        if executor is None:
+            executor = ThreadPoolExecutor(
+                max_workers=max(1, MAX_CONCURRENT_QUERIES) + max(1, MAX_CONCURRENT_MUTATIONS),
+                thread_name_prefix="sdkman-command",
+            )
+            _executors[root.key] = executor
+        return executor
+
+
+def _semaphore(root: sdk_commands.SdkmanRoot, mutating: bool) -> asyncio.Semaphore:
+    """Return the query or mutation semaphore of a root in the running event loop."""
+    loop = asyncio.get_running_loop()
+    by_root = _semaphores.setdefault(loop, {})
+    semaphores = by_root.get(root.key)
+    if semaphores is None:
+        semaphores = (
+            asyncio.Semaphore(max(1, MAX_CONCURRENT_QUERIES)),
+            asyncio.Semaphore(max(1, MAX_CONCURRENT_MUTATIONS)),
+        )
+        by_root[root.key] = semaphores
+    return semaphores[1 if mutating else 0]
+
+
+def _in_root(root: sdk_commands.SdkmanRoot, func: Callable[..., Any],
+             *args: Any, **kwargs: Any) -> Any:
+    with sdk_commands.use_root(root):
+        return func(*args, **kwargs)
+
+
+async def _run(
+    func: Callable[..., Dict[str, Any]],
+    *args: Any,
+    mutating: bool = False,
+    on_output: Optional[AsyncOutputCallback] = None,
+) -> Dict[str, Any]:
+    """Run a blocking sdk_* function off the event loop under the matching limit of the
+    current root, and against that root.
+
+    With `on_output`, lines streamed by the command are forwarded from the worker
+    thread to the event loop and awaited there in order.
+    """
+    root = sdk_commands.current_root()
+    async with _semaphore(root, mutating):
+        loop = asyncio.get_running_loop()
+        executor = _executor(root)
+        if on_output is None:
+            return await loop.run_in_executor(
+                executor, functools.partial(_in_root, root, func, *args)
+            )
+
+        queue: "asyncio.Queue[Optional[Tuple[str, str]]]" = asyncio.Queue()
+
+        def forward(stream: str, line: str) -> None:
+            loop.call_soon_threadsafe(queue.put_nowait, (stream, line))
+
+        future = loop.run_in_executor(
+            executor, functools.partial(_in_root, root, func, *args, on_output=forward)
+        )
+        # 完成回调排在所有已转发的输出之后
+        future.add_done_callback(lambda _: queue.put_nowait(None))
+        while True:
+            item = await queue.get()
+            if item is None:
+                break
+            try:
+                await on_output(*item)
+            except Exception as e:
+                logger.debug(f"Async output callback failed: {str(e)}")
+        return await future
+
+
+async def sdk_list(format: str = "raw") -> Dict[str, Any]:
+    """List all available candidates in SDKMAN."""
+    return await _run(sdk_commands.sdk_list, format)
+
+
+async def sdk_list_candidate(candidate: str, format: str = "raw") -> Dict[str, Any]:
+    """List versions of a specific candidate."""
+    return await _run(sdk_commands.sdk_list_candidate, candidate, format)
+
+
+async def sdk_query_versions(
+    candidate: str,
+    vendor: Optional[str] = None,
+    major: Optional[str] = None,
+    installed: Optional[bool] = None,
+    dist: Optional[str] = None,
+    limit: int = 50,
+) -> Dict[str, Any]:
+    """Filter the versions of a candidate and return them as structured records."""
+    return await _run(
+        sdk_commands.sdk_query_versions, candidate, vendor, major, installed, dist, limit
+    )
+
+
+async def resolve_version(spec: str) -> Dict[str, Any]:
+    """Resolve a version constraint such as `java@21 vendor=tem` to the best match."""
+    return await _run(sdk_commands.resolve_version, spec)
+
+
+async def refresh_metadata_snapshot(candidates: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Bring snapshot entries up to date, re-listing only the candidates that changed."""
+    return await _run(sdk_commands.refresh_metadata_snapshot, candidates)
+
+
+async def sdk_current(format: str = "raw") -> Dict[str, Any]:
+    """Show the current version of all installed candidates."""
+    return await _run(sdk_commands.sdk_current, format)
+
+
+async def sdk_current_candidate(candidate: str, format: str = "raw") -> Dict[str, Any]:
+    """Show the current version of a specific candidate."""
+    return await _run(sdk_commands.sdk_current_candidate, candidate, format)
+
+
+async def sdk_install(
+    candidate: str,
+    version: Optional[str] = None,
+    path: Optional[str] = None,
+    on_output: Optional[AsyncOutputCallback] = None,
+) -> Dict[str, Any]:
+    """Install a candidate with the specified version or from a specific path."""
+    return await _run(
+        sdk_commands.sdk_install, candidate, version, path, mutating=True, on_output=on_output
+    )
+
+
+async def sdk_install_resolved(
+    spec: str,
+    background: bool = False,
+    on_output: Optional[AsyncOutputCallback] = None,
+) -> Dict[str, Any]:
+    """Resolve a version constraint and install the chosen version unless it is installed."""
+    return await _run(
+        sdk_commands.sdk_install_resolved, spec, background, mutating=True, on_output=on_output
+    )
+
+
+async def sdk_install_many(
+    items: List[Tuple[str, Optional[str]]], max_parallel: int = 4
+) -> Dict[str, Any]:
+    """Install several (candidate, version) pairs in parallel."""
+    return await _run(sdk_commands.sdk_install_many, items, max_parallel, mutating=True)
+
+
+async def sdk_prefetch(items: List[Tuple[str, str]], max_parallel: int = 4) -> Dict[str, Any]:
+    """Download archives into the archive cache without installing them."""
+    return await _run(sdk_commands.sdk_prefetch, items, max_parallel)
+
+
+async def sdk_uninstall(candidate: str, version: str) -> Dict[str, Any]:
+    """Uninstall a candidate with the specified version."""
+    return await _run(sdk_commands.sdk_uninstall, candidate, version, mutating=True)
+
+
+async def sdk_use(candidate: str, version: str) -> Dict[str, Any]:
+    """Use a specific version of a candidate in the current shell."""
+    return await _run(sdk_commands.sdk_use, candidate, version)
+
+
+async def sdk_default(candidate: str, version: str) -> Dict[str, Any]:
+    """Set the default version of a candidate."""
+    return await _run(sdk_commands.sdk_default, candidate, version, mutating=True)
+
+
+async def sdk_home(candidate: str, version: str) -> Dict[str, Any]:
+    """Get the home directory of a specific version of a candidate."""
+    return await _run(sdk_commands.sdk_home, candidate, version)
+
+
+async def sdk_env(
+    action: Optional[str] = None, on_output: Optional[AsyncOutputCallback] = None
+) -> Dict[str, Any]:
+    """Manage the .sdkmanrc file. Action can be 'init', 'install', or 'clear'."""
+    return await _run(sdk_commands.sdk_env, action, mutating=True, on_output=on_output)
+
+
+async def sdk_env_scan(
+    root: str, install: bool = True, max_parallel: int = 4, max_depth: Optional[int] = None
+) -> Dict[str, Any]:
+    """Resolve every .sdkmanrc under a directory tree and install the missing SDKs."""
+    return await _run(
+        sdk_commands.sdk_env_scan, root, install, max_parallel, max_depth, mutating=install
+    )
+
+
+async def sdk_disk_usage(candidate: Optional[str] = None) -> Dict[str, Any]:
+    """Report the disk space used by each installed version."""
+    return await _run(sdk_commands.sdk_disk_usage, candidate)
+
+
+async def sdk_gc(
+    keep: int = 1, sdkmanrc: Optional[List[str]] = None, candidate: Optional[str] = None,
+    dry_run: bool = True
+) -> Dict[str, Any]:
+    """Uninstall versions that are not current, not in .sdkmanrc files and not the latest."""
+    return await _run(
+        sdk_commands.sdk_gc, keep, sdkmanrc, candidate, dry_run, mutating=not dry_run
+    )
+
+
+async def sdk_resolve_env(
+    sdks: Optional[List[str]] = None, sdkmanrc: Optional[str] = None, format: str = "json"
+) -> Dict[str, Any]:
+    """Compute the SDK variables and PATH entries for a set of installed SDKs."""
+    return await _run(sdk_commands.sdk_resolve_env, sdks, sdkmanrc, format)
+
+
+async def sdk_dedup(
+    candidate: Optional[str] = None, method: Optional[str] = None, dry_run: bool = False
+) -> Dict[str, Any]:
+    """Make identical files in the installed versions of each candidate share storage."""
+    return await _run(sdk_commands.sdk_dedup, candidate, method, dry_run, mutating=not dry_run)
+
+
+async def sdk_upgrade(
+    candidate: Optional[str] = None, on_output: Optional[AsyncOutputCallback] = None
+) -> Dict[str, Any]:
+    """Check available upgrades or upgrade a specific candidate."""
+    return await _run(sdk_commands.sdk_upgrade, candidate, mutating=True, on_output=on_output)
+
+
+async def sdk_version() -> Dict[str, Any]:
+    """Display the SDKMAN version."""
+    return await _run(sdk_commands.sdk_version)
+
+
+async def sdk_offline(mode: str) -> Dict[str, Any]:
+    """Enable or disable offline mode."""
+    return await _run(sdk_commands.sdk_offline, mode, mutating=True)
+
+
+async def sdk_selfupdate(
+    force: bool = False, on_output: Optional[AsyncOutputCallback] = None
+) -> Dict[str, Any]:
+    """Update SDKMAN itself."""
+    return await _run(sdk_commands.sdk_selfupdate, force, mutating=True, on_output=on_output)
+
+
+async def sdk_update() -> Dict[str, Any]:
+    """Update SDKMAN candidates."""
+    return await _run(sdk_commands.sdk_update, mutating=True)
+
+
+async def sdk_flush(mode: Optional[str] = None) -> Dict[str, Any]:
+    """Flush SDKMAN local state. Mode can be 'tmp', 'metadata', or 'version'."""
+    return await _run(sdk_commands.sdk_flush, mode, mutating=True)
+
+
+async def sdk_help(command: Optional[str] = None) -> Dict[str, Any]:
+    """Get help about SDKMAN or a specific command."""
+    return await _run(sdk_commands.sdk_help, command)
+
+
+async def sdk_config() -> Dict[str, Any]:
+    """Edit the SDKMAN configuration."""
+    return await _run(sdk_commands.sdk_config, mutating=True)
+
+
+async def submit_job(kind: str, **params: Any) -> Dict[str, Any]:
+    """Queue an install, upgrade or selfupdate as a background job."""
+    return await _run(functools.partial(sdk_commands.submit_job, kind, **params))
+
+
+async def job_status(job_id: Optional[str] = None, limit: int = 20) -> Dict[str, Any]:
+    """Return a job, or the most recent jobs when no id is given."""
+    return await _run(sdk_commands.job_status, job_id, limit)
+
+
+async def job_wait(job_id: str, timeout: float = 60) -> Dict[str, Any]:
+    """Wait up to timeout seconds for a job to finish.
+
+    Polls the journal instead of blocking a command thread for the whole wait.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + max(0.0, timeout)
+    while True:
+        result = await job_status(job_id)
+        if not result["success"] or result["data"]["state"] in FINISHED_STATES:
+            return result
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            return result
+        await asyncio.sleep(min(JOB_POLL_INTERVAL, remaining))
+
+
+async def job_cancel(job_id: str) -> Dict[str, Any]:
+    """Cancel a queued job or stop a running one."""
+    return await _run(sdk_commands.job_cancel, job_id)
@@ -0,0 +1,431 @@
+"""
+Deduplication Module
+
+This module finds byte-identical files across the installed versions of a candidate,
+such as `21.0.1-tem` and `21.0.2-tem`, and makes them share storage through reflinks
+(copy-on-write clones), so editing one version cannot change another. File systems
+without reflinks (e.g. ext4) are left alone unless hard links are asked for explicitly:
+the shared file is then made read-only, which does not stop root, and an in-place edit
+of one version changes all of them. Trees that are edited after installation, such as
+a JDK's `lib/security`, are therefore never hard-linked.
+
+Only files of the same size, device, owner and permissions can match, so most files
+are never read. The rest are hashed in streaming chunks, and the hashes are kept in a
+SQLite index keyed by path and validated by inode, size and mtime, so a later pass
+only hashes files that are new or changed.
+"""
+
+import errno
+import hashlib
+import logging
+import os
+import shutil
+import sqlite3
+import stat
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+HASH_CHUNK_SIZE = 1024 * 1024
+# 小于此大小的文件不去重：节省的空间抵不上读取和改链接的开销
+DEFAULT_MIN_SIZE = 4096
+METHODS = ("auto", "reflink", "hardlink")
+# linux/fs.h 中的 FICLONE ioctl
+_FICLONE = 0x40049409
+# 安装后常被原地修改的目录（相对于版本目录），硬链接时跳过，
+# 例如 `keytool -importcert` 改写 lib/security/cacerts
+MUTABLE_PATHS = ("lib/security", "jre/lib/security", "conf", "etc")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS hashes (
+    path TEXT PRIMARY KEY,
+    device INTEGER NOT NULL,
+    inode INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    digest TEXT NOT NULL
+)
+"""
+
+
+class FileInfo(NamedTuple):
+    path: str
+    device: int
+    inode: int
+    size: int
+    mtime_ns: int
+    mode: int
+    uid: int
+    gid: int
+    nlink: int
+    blocks: int
+
+    @property
+    def identity(self) -> Tuple[int, int]:
+        return self.device, self.inode
+
+    @property
+    def group(self) -> Tuple[int, int, int, int, int]:
+        """Files can only be merged within a group; write bits are ignored because
+        hard-linked files are made read-only."""
+        return self.device, self.size, stat.S_IMODE(self.mode) & ~0o222, self.uid, self.gid
+
+
+def _file_info(path: str, info: os.stat_result) -> FileInfo:
+    blocks = getattr(info, "st_blocks", None)
+    return FileInfo(
+        path, info.st_dev, info.st_ino, info.st_size, info.st_mtime_ns, info.st_mode,
+        info.st_uid, info.st_gid, info.st_nlink,
+        blocks * 512 if blocks is not None else info.st_size,
+    )
+
+
+def file_digest(path: str) -> str:
+    """Hash a file in streaming chunks."""
+    digest = hashlib.blake2b(digest_size=32)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class DedupIndex:
+    """SQLite store of file hashes keyed by path; an entry is only trusted while the
+    file's device, inode, size and mtime are unchanged."""
+
+    def __init__(self, path: str):
+        self.path = os.path.expanduser(path)
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(_SCHEMA)
+            connection.commit()
+            self._connection = connection
+        return self._connection
+
+    def load(self, directory: str) -> Dict[str, Tuple[int, int, int, int, str]]:
+        """Return path -> (device, inode, size, mtime_ns, digest) for files under directory."""
+        prefix = directory.rstrip(os.sep) + os.sep
+        try:
+            with self._lock:
+                rows = self._connect().execute(
+                    "SELECT path, device, inode, size, mtime_ns, digest FROM hashes "
+                    "WHERE path >= ? AND path < ?",
+                    (prefix, prefix[:-1] + chr(ord(os.sep) + 1)),
+                ).fetchall()
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"Failed to read dedup index {self.path}: {str(e)}")
+            return {}
+        return {row[0]: tuple(row[1:]) for row in rows}  # type: ignore[misc]
+
+    def save(self, directory: str, entries: Dict[str, Tuple[int, int, int, int, str]]) -> None:
+        """Replace the entries under directory with the given ones."""
+        prefix = directory.rstrip(os.sep) + os.sep
+        try:
+            with self._lock:
+                connection = self._connect()
+                with connection:
+                    connection.execute(
+                        "DELETE FROM hashes WHERE path >= ? AND path < ?",
+                        (prefix, prefix[:-1] + chr(ord(os.sep) + 1)),
+                    )
+                    connection.executemany(
+                        "INSERT OR REPLACE INTO hashes "
+                        "(path, device, inode, size, mtime_ns, digest) VALUES (?, ?, ?, ?, ?, ?)",
+                        [(path,) + entry for path, entry in entries.items()],
+                    )
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"Failed to write dedup index {self.path}: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        try:
+            with self._lock:
+                (count,) = self._connect().execute("SELECT COUNT(*) FROM hashes").fetchone()
+        except (sqlite3.Error, OSError) as e:
+            return {"path": self.path, "error": str(e)}
+        return {"path": self.path, "files": count}
+
+    def close(self) -> None:
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+def _walk_files(directory: str, min_size: int) -> List[FileInfo]:
+    """Regular files under directory of at least min_size bytes; symlinks are skipped."""
+    files = []
+    stack = [directory]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            info = entry.stat(follow_symlinks=False)
+                            if info.st_size >= min_size:
+                                files.append(_file_info(entry.path, info))
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+    return files
+
+
+def _mutable(directory: str, path: str) -> bool:
+    """Whether path, under a version directory inside directory, is in MUTABLE_PATHS."""
+    inner = "/".join(os.path.relpath(path, directory).split(os.sep)[1:])
+    return any(inner == prefix or inner.startswith(prefix + "/") for prefix in MUTABLE_PATHS)
+
+
+def reflink_supported(directory: str) -> bool:
+    """Try cloning a small temporary file in directory."""
+    try:
+        import fcntl
+    except ImportError:
+        return False
+    paths = []
+    try:
+        for _ in range(2):
+            fd, path = tempfile.mkstemp(prefix=".sdkman-dedup-probe-", dir=directory)
+            paths.append(path)
+            os.close(fd)
+        with open(paths[0], "wb") as f:
+            f.write(b"sdkman")
+        with open(paths[0], "rb") as src, open(paths[1], "wb") as dst:
+            fcntl.ioctl(dst.fileno(), _FICLONE, src.fileno())
+        return True
+    except OSError:
+        return False
+    finally:
+        for path in paths:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+
+def _temporary_path(path: str) -> str:
+    directory, name = os.path.split(path)
+    return os.path.join(directory, f".{name}.sdkman-dedup-{os.getpid()}")
+
+
+def _reflink(source: str, target: str) -> None:
+    """Replace target with a copy-on-write clone of source, keeping target's metadata."""
+    try:
+        import fcntl
+    except ImportError:
+        raise OSError(errno.ENOSYS, "reflinks are not supported on this platform")
+
+    temporary = _temporary_path(target)
+    try:
+        with open(source, "rb") as src, open(temporary, "wb") as dst:
+            fcntl.ioctl(dst.fileno(), _FICLONE, src.fileno())
+        shutil.copystat(target, temporary)
+        os.replace(temporary, target)
+    except BaseException:
+        try:
+            os.unlink(temporary)
+        except OSError:
+            pass
+        raise
+
+
+def _hardlink(source: str, target: str) -> None:
+    """Replace target with a hard link to source."""
+    temporary = _temporary_path(target)
+    os.link(source, temporary)
+    try:
+        os.replace(temporary, target)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+
+class Deduplicator:
+    """Merges identical files under one directory tree, e.g. one candidate's versions.
+
+    `method` is "auto" (reflinks where the file system supports them, otherwise only
+    report what could be merged), "reflink" or "hardlink" (read-only hard links, skipping
+    MUTABLE_PATHS).
+    """
+
+    def __init__(self, index: Optional[DedupIndex], method: str = "auto",
+                 min_size: int = DEFAULT_MIN_SIZE, max_workers: int = 4):
+        if method not in METHODS:
+            raise ValueError(f"method must be one of {', '.join(METHODS)}")
+        self.index = index
+        self.method = method
+        self.min_size = max(1, min_size)
+        self.max_workers = max(1, max_workers)
+        # 设备 -> 是否支持 reflink，首次尝试后记录
+        self._reflink_support: Dict[int, bool] = {}
+
+    def run(self, directory: str, dry_run: bool = False) -> Dict[str, Any]:
+        """Deduplicate the files under directory and report the bytes reclaimed; with
+        dry_run nothing is changed and the report says what would be replaced."""
+        started = time.perf_counter()
+        method = self._method_for(directory)
+        note = None
+        if method is None:
+            # 文件系统不支持 reflink：只报告可合并的文件，不自动退回到硬链接
+            dry_run = True
+            note = ("The file system does not support reflinks; nothing was changed. "
+                    "Use method=hardlink to merge files through read-only hard links")
+        files = _walk_files(directory, self.min_size)
+        if method == "hardlink":
+            files = [info for info in files if not _mutable(directory, info.path)]
+        known = self.index.load(directory) if self.index is not None else {}
+
+        # 先按大小等属性分组，组内只有一个 inode 的文件无需读取
+        groups: Dict[tuple, Dict[Tuple[int, int], List[FileInfo]]] = {}
+        for info in files:
+            groups.setdefault(info.group, {}).setdefault(info.identity, []).append(info)
+        candidates = {key: inodes for key, inodes in groups.items() if len(inodes) > 1}
+
+        digests: Dict[Tuple[int, int], str] = {}
+        to_hash: List[FileInfo] = []
+        for inodes in candidates.values():
+            for identity, links in inodes.items():
+                cached = next((
+                    known[info.path][4] for info in links
+                    if known.get(info.path, ())[:4]
+                    == (info.device, info.inode, info.size, info.mtime_ns)
+                ), None)
+                if cached is not None:
+                    digests[identity] = cached
+                else:
+                    to_hash.append(links[0])
+        hashed_bytes = sum(info.size for info in to_hash)
+        errors: List[str] = []
+        if to_hash:
+            with ThreadPoolExecutor(max_workers=self.max_workers,
+                                    thread_name_prefix="sdkman-dedup") as executor:
+                for info, digest in zip(to_hash, executor.map(self._digest, to_hash)):
+                    if isinstance(digest, str):
+                        digests[info.identity] = digest
+                    else:
+                        errors.append(f"{info.path}: {digest}")
+        hash_seconds = round(time.perf_counter() - started, 3)
+
+        duplicate_groups = replaced = 0
+        reclaimed = 0
+        used: Dict[str, int] = {"reflink": 0, "hardlink": 0}
+        for inodes in candidates.values():
+            by_digest: Dict[str, List[List[FileInfo]]] = {}
+            for identity, links in inodes.items():
+                if identity in digests:
+                    by_digest.setdefault(digests[identity], []).append(links)
+            for same in by_digest.values():
+                if len(same) < 2:
+                    continue
+                duplicate_groups += 1
+                # 保留链接最多的 inode，其余文件都指向它
+                same.sort(key=lambda links: (-links[0].nlink, links[0].path))
+                keep, others = same[0][0], same[1:]
+                for links in others:
+                    done = 0
+                    for info in links:
+                        if dry_run:
+                            done += 1
+                            continue
+                        if self._replace(keep, info, method, errors):
+                            used[method] += 1
+                            done += 1
+                    replaced += done
+                    # 只有 inode 的全部链接都被替换后，它的空间才真正释放
+                    if done == len(links) and done >= links[0].nlink:
+                        reclaimed += links[0].blocks
+
+        if self.index is not None:
+            # 替换后文件的 inode 和 mtime 变了，但内容不变，按路径沿用哈希
+            by_path = {
+                info.path: digests[info.identity] for info in files if info.identity in digests
+            }
+            current = _walk_files(directory, self.min_size) if replaced and not dry_run else files
+            entries = {}
+            for info in current:
+                entry = (info.device, info.inode, info.size, info.mtime_ns)
+                if info.path in by_path:
+                    entries[info.path] = entry + (by_path[info.path],)
+                elif known.get(info.path, ())[:4] == entry:
+                    # 这一轮无需比较的文件保留旧的哈希，供新安装的版本比对
+                    entries[info.path] = known[info.path]
+            self.index.save(directory, entries)
+
+        report = {
+            "directory": directory,
+            "method": method,
+            "dry_run": dry_run,
+            "files": len(files),
+            "hashed_files": len(to_hash),
+            "hashed_bytes": hashed_bytes,
+            "duplicate_groups": duplicate_groups,
+            "replaced_files": replaced,
+            "reflinks": used["reflink"],
+            "hardlinks": used["hardlink"],
+            "bytes_reclaimed": reclaimed,
+            "errors": errors,
+            "hash_seconds": hash_seconds,
+            "elapsed_seconds": round(time.perf_counter() - started, 3),
+        }
+        if note is not None:
+            report["note"] = note
+        return report
+
+    def _method_for(self, directory: str) -> Optional[str]:
+        """The method to use under directory; None when "auto" finds no reflink support."""
+        if self.method == "hardlink":
+            return "hardlink"
+        try:
+            device = os.stat(directory).st_dev
+        except OSError:
+            return "reflink"
+        supported = self._reflink_support.get(device)
+        if supported is None:
+            supported = self._reflink_support[device] = reflink_supported(directory)
+        if supported or self.method == "reflink":
+            # 明确要求 reflink 时，不支持的文件系统在替换时逐个报错
+            return "reflink"
+        return None
+
+    @staticmethod
+    def _digest(info: FileInfo) -> Any:
+        try:
+            return file_digest(info.path)
+        except OSError as e:
+            return e
+
+    @staticmethod
+    def _replace(keep: FileInfo, info: FileInfo, method: str, errors: List[str]) -> bool:
+        """Make info.path share keep's data with the method; False on failure."""
+        try:
+            current = os.stat(info.path, follow_symlinks=False)
+            if (current.st_ino, current.st_size, current.st_mtime_ns) != (
+                    info.inode, info.size, info.mtime_ns):
+                # 哈希之后文件被改动过，下一轮再处理
+                return False
+            if method == "reflink":
+                _reflink(keep.path, info.path)
+                return True
+            mode = stat.S_IMODE(os.stat(keep.path).st_mode)
+            if mode & 0o222:
+                # 共享的 inode 改为只读，防止普通用户修改一个版本时影响其他版本
+                os.chmod(keep.path, mode & ~0o222)
+            _hardlink(keep.path, info.path)
+            return True
+        except OSError as e:
+            errors.append(f"{info.path}: {e.strerror or str(e)}")
+            return False
@@ -0,0 +1,281 @@
+"""
+Disk Usage Module
+
+This module measures how much disk the installed SDK versions under
+`$SDKMAN_DIR/candidates` use. Version directories are walked in parallel with
+`os.scandir`; a file with several hard links is counted once, and a version's
+`unique_bytes` are the bytes that uninstalling it would free.
+
+What each directory contains is cached by its modification time, so a repeat scan
+only stats the directories and reads again the ones that changed. Files changed in
+place, without being replaced, are not noticed until their directory changes; nor are
+link counts changed from elsewhere, so callers that add or remove hard links
+invalidate the affected tree.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+# 硬链接文件的标识：(st_dev, st_ino)
+InodeKey = Tuple[int, int]
+
+
+class _DirRecord(NamedTuple):
+    mtime_ns: int
+    # 普通文件（包括符号链接本身）占用的字节数
+    plain_bytes: int
+    plain_files: int
+    # 链接数大于 1 的文件：(标识, 字节数, 链接数)
+    linked: Tuple[Tuple[InodeKey, int, int], ...]
+    subdirs: Tuple[str, ...]
+
+
+class TreeUsage(NamedTuple):
+    """Disk usage of one directory tree; hard-linked files are kept apart in `linked`."""
+
+    path: str
+    plain_bytes: int
+    files: int
+    linked: Dict[InodeKey, Tuple[int, int, int]]  # 标识 -> (字节数, 链接数, 本树中出现次数)
+    last_used: Optional[float]
+
+
+def _allocated(info: os.stat_result) -> int:
+    """Bytes a file occupies on disk, like `du`; its length where blocks are unknown."""
+    blocks = getattr(info, "st_blocks", None)
+    return blocks * 512 if blocks is not None else info.st_size
+
+
+class DiskUsageScanner:
+    """Measures candidate directories, caching each directory's contents by mtime."""
+
+    def __init__(self, max_workers: int = 8):
+        self.max_workers = max(1, max_workers)
+        self._dirs: Dict[str, _DirRecord] = {}
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def _read_dir(self, path: str) -> Optional[_DirRecord]:
+        try:
+            mtime_ns = os.stat(path, follow_symlinks=False).st_mtime_ns
+        except OSError:
+            return None
+        cached = self._dirs.get(path)
+        if cached is not None and cached.mtime_ns == mtime_ns:
+            with self._lock:
+                self._hits += 1
+            return cached
+
+        plain_bytes = plain_files = 0
+        linked: List[Tuple[InodeKey, int, int]] = []
+        subdirs: List[str] = []
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.name)
+                            continue
+                        info = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    if info.st_nlink > 1 and not entry.is_symlink():
+                        linked.append(((info.st_dev, info.st_ino), _allocated(info), info.st_nlink))
+                    else:
+                        plain_bytes += _allocated(info)
+                        plain_files += 1
+        except OSError:
+            return None
+        record = _DirRecord(mtime_ns, plain_bytes, plain_files, tuple(linked), tuple(subdirs))
+        with self._lock:
+            self._dirs[path] = record
+            self._misses += 1
+        return record
+
+    def tree(self, path: str, visited: Optional[Set[str]] = None) -> TreeUsage:
+        """Measure a directory tree without following symbolic links."""
+        # 在遍历读取目录之前记录使用时间
+        last_used = _last_used(path)
+        plain_bytes = files = 0
+        linked: Dict[InodeKey, Tuple[int, int, int]] = {}
+        stack = [path]
+        while stack:
+            directory = stack.pop()
+            record = self._read_dir(directory)
+            if record is None:
+                continue
+            if visited is not None:
+                visited.add(directory)
+            plain_bytes += record.plain_bytes
+            files += record.plain_files
+            for key, size, nlink in record.linked:
+                seen = linked.get(key)
+                if seen is None:
+                    linked[key] = (size, nlink, 1)
+                    files += 1
+                else:
+                    linked[key] = (size, nlink, seen[2] + 1)
+            stack.extend(os.path.join(directory, name) for name in record.subdirs)
+        return TreeUsage(path, plain_bytes, files, linked, last_used)
+
+    def scan(self, candidates_dir: str,
+             candidates: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """Measure every installed version of the given candidates (all by default).
+
+        Returns the total, and per candidate its total and each version's `bytes`,
+        `unique_bytes` (freed by removing only that version), file count, whether it
+        is the current version and when it was last used.
+        """
+        started = time.perf_counter()
+        names = sorted(candidates) if candidates is not None else _subdirs(candidates_dir)
+        targets: List[Tuple[str, str, str]] = []
+        currents: Dict[str, Optional[str]] = {}
+        for candidate in names:
+            candidate_dir = os.path.join(candidates_dir, candidate)
+            currents[candidate] = _current_version(candidate_dir)
+            for version in _subdirs(candidate_dir):
+                targets.append((candidate, version, os.path.join(candidate_dir, version)))
+
+        visited: Set[str] = set()
+        with ThreadPoolExecutor(max_workers=self.max_workers,
+                                thread_name_prefix="sdkman-du") as executor:
+            trees = list(executor.map(
+                lambda target: self.tree(target[2], visited), targets
+            ))
+        self._prune([os.path.join(candidates_dir, candidate) for candidate in names], visited)
+
+        # 同一 inode 在所有版本中出现的总次数，用于判断删除某个版本能否释放它
+        occurrences: Dict[InodeKey, int] = {}
+        for usage in trees:
+            for key, (_, _, count) in usage.linked.items():
+                occurrences[key] = occurrences.get(key, 0) + count
+
+        report: Dict[str, Dict[str, Any]] = {
+            candidate: {"candidate": candidate, "bytes": 0, "versions": []} for candidate in names
+        }
+        candidate_inodes: Dict[str, Dict[InodeKey, int]] = {candidate: {} for candidate in names}
+        all_inodes: Dict[InodeKey, int] = {}
+        now = time.time()
+        total = 0
+        for (candidate, version, _), usage in zip(targets, trees):
+            linked_bytes = sum(size for size, _, _ in usage.linked.values())
+            unique = usage.plain_bytes + sum(
+                size for key, (size, nlink, count) in usage.linked.items()
+                if occurrences[key] == count and count >= nlink
+            )
+            report[candidate]["versions"].append({
+                "version": version,
+                "bytes": usage.plain_bytes + linked_bytes,
+                "unique_bytes": unique,
+                "files": usage.files,
+                "current": version == currents[candidate],
+                "last_used": usage.last_used,
+                "idle_days": (
+                    round((now - usage.last_used) / 86400, 1) if usage.last_used else None
+                ),
+            })
+            report[candidate]["bytes"] += usage.plain_bytes
+            total += usage.plain_bytes
+            for key, (size, _, _) in usage.linked.items():
+                candidate_inodes[candidate][key] = size
+                all_inodes[key] = size
+        for candidate in names:
+            report[candidate]["bytes"] += sum(candidate_inodes[candidate].values())
+            report[candidate]["versions"].sort(key=lambda item: item["bytes"], reverse=True)
+        total += sum(all_inodes.values())
+
+        return {
+            "candidates_dir": candidates_dir,
+            "bytes": total,
+            "candidates": sorted(
+                (entry for entry in report.values() if entry["versions"]),
+                key=lambda entry: entry["bytes"], reverse=True,
+            ),
+            "elapsed_seconds": round(time.perf_counter() - started, 3),
+            "cache": self.stats(),
+        }
+
+    def invalidate(self, prefix: str) -> int:
+        """Forget the cached contents of prefix and every directory below it.
+
+        Needed after link counts change without the directories holding the links
+        changing, e.g. when dedup links a file to one elsewhere or another link to it
+        is removed. Returns how many directories were forgotten.
+        """
+        prefix = os.path.normpath(prefix)
+        with self._lock:
+            stale = [
+                path for path in self._dirs
+                if path == prefix or path.startswith(prefix + os.sep)
+            ]
+            for path in stale:
+                del self._dirs[path]
+        return len(stale)
+
+    def _prune(self, prefixes: List[str], visited: Set[str]) -> None:
+        """Forget cached directories under the scanned candidates that no longer exist."""
+        with self._lock:
+            stale = [
+                path for path in self._dirs
+                if path not in visited
+                and any(path.startswith(prefix + os.sep) for prefix in prefixes)
+            ]
+            for path in stale:
+                del self._dirs[path]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"directories": len(self._dirs), "hits": self._hits, "misses": self._misses}
+
+
+def _subdirs(path: str) -> List[str]:
+    """Names of the real subdirectories of path; `current` and symlinks are skipped."""
+    try:
+        with os.scandir(path) as entries:
+            return sorted(
+                entry.name for entry in entries
+                if entry.name != "current" and entry.is_dir(follow_symlinks=False)
+            )
+    except OSError:
+        return []
+
+
+def _current_version(candidate_dir: str) -> Optional[str]:
+    try:
+        return os.path.basename(os.path.normpath(
+            os.readlink(os.path.join(candidate_dir, "current"))
+        ))
+    except OSError:
+        return None
+
+
+def _last_used(path: str) -> Optional[float]:
+    """Latest access time of the programs in a version's `bin`, or when the version was
+    installed if it has none.
+
+    The access times of the directories themselves are not used: listing them, as the
+    scan does, updates them. Running a program reads it and so updates its access time,
+    but only as often as the mount allows; with `relatime` that is at most once a day,
+    which is enough to tell idle versions apart.
+    """
+    latest: Optional[float] = None
+    try:
+        with os.scandir(os.path.join(path, "bin")) as entries:
+            for entry in entries:
+                try:
+                    atime = entry.stat().st_atime
+                except OSError:
+                    continue
+                latest = atime if latest is None else max(latest, atime)
+    except OSError:
+        pass
+    if latest is None:
+        try:
+            latest = os.stat(path).st_mtime
+        except OSError:
+            pass
+    return latest
@@ -0,0 +1,169 @@
+"""
+Environment Module
+
+This module computes the environment `sdk use` would set up for a set of SDKs, such
+as `JAVA_HOME`, `GRADLE_HOME` and the `bin` directories to put first on `PATH`,
+directly from the `$SDKMAN_DIR/candidates` layout, so build steps can use it without
+sourcing `sdkman-init.sh`.
+
+Results are memoised and reused for as long as the modification times of the
+candidate directories involved are unchanged; installing, uninstalling or changing the
+default version of a candidate changes its directory and so invalidates them.
+"""
+
+import os
+import shlex
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .resolver import VersionResolver, parse_constraint
+from .version_index import VersionRecord
+
+# (候选, 版本约束或 None 表示当前版本)
+SdkSpec = Tuple[str, Optional[str]]
+
+
+class SdkEnvironmentError(Exception):
+    """Raised when an SDK of the requested set is not installed or its spec is invalid."""
+
+
+def home_variable(candidate: str) -> str:
+    """Name of the variable SDKMAN exports for a candidate, e.g. JAVA_HOME."""
+    return f"{candidate.upper()}_HOME"
+
+
+def bin_dir(home: str) -> str:
+    """Directory SDKMAN puts on PATH for an installation: its `bin`, else the home itself."""
+    path = os.path.join(home, "bin")
+    return path if os.path.isdir(path) else home
+
+
+def _installed(candidate_dir: str) -> List[str]:
+    try:
+        with os.scandir(candidate_dir) as entries:
+            # 本地安装的版本是指向其他目录的符号链接，同样可用
+            return sorted(
+                entry.name for entry in entries if entry.name != "current" and entry.is_dir()
+            )
+    except OSError:
+        return []
+
+
+def _current(candidate_dir: str) -> Optional[str]:
+    try:
+        target = os.readlink(os.path.join(candidate_dir, "current"))
+    except OSError:
+        return None
+    return os.path.basename(os.path.normpath(target)) or None
+
+
+def resolve_installed(candidate_dir: str, candidate: str, spec: Optional[str]) -> str:
+    """Pick the installed version of a candidate for spec: its current version when spec
+    is None or "current", the version directory of that name, or the best installed
+    match of a constraint such as `21` or `^8`. Raises SdkEnvironmentError when nothing
+    matches."""
+    if os.sep in candidate or candidate in ("", ".", "..") or not os.path.isdir(candidate_dir):
+        raise SdkEnvironmentError(f"{candidate} is not installed")
+    current = _current(candidate_dir)
+    if spec in (None, "current"):
+        if current is None or not os.path.isdir(os.path.join(candidate_dir, current)):
+            raise SdkEnvironmentError(f"{candidate} has no current version")
+        return current
+    if os.sep not in spec and spec not in (".", "..") and (
+            os.path.isdir(os.path.join(candidate_dir, spec))):
+        return spec
+    installed = _installed(candidate_dir)
+    records = []
+    for name in installed:
+        version, dist = name, ""
+        if candidate == "java" and "-" in name:
+            version, dist = name.rsplit("-", 1)
+        records.append(VersionRecord("", name == current, version, dist, "installed", name))
+    try:
+        best = VersionResolver(records).resolve(parse_constraint(f"{candidate}@{spec}"))
+    except ValueError as e:
+        raise SdkEnvironmentError(str(e))
+    if best is None:
+        raise SdkEnvironmentError(
+            f"No installed {candidate} version matches {spec!r} "
+            f"(installed: {', '.join(installed) or 'none'})"
+        )
+    return best.identifier
+
+
+class EnvironmentResolver:
+    """Memoising resolver of SDK environments for one or more SDKMAN installations."""
+
+    def __init__(self, maxsize: int = 128):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[tuple, Tuple[tuple, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    @staticmethod
+    def _stamp(candidates_dir: str, candidates: Sequence[str]) -> tuple:
+        stamp = []
+        for candidate in candidates:
+            try:
+                stamp.append(os.stat(os.path.join(candidates_dir, candidate)).st_mtime_ns)
+            except OSError:
+                stamp.append(None)
+        return tuple(stamp)
+
+    def resolve(self, sdkman_dir: str, candidates_dir: str,
+                sdks: Sequence[SdkSpec]) -> Dict[str, Any]:
+        """Return the SDKs chosen, their variables and the PATH entries to prepend.
+
+        A candidate listed twice takes its last spec. Raises SdkEnvironmentError when
+        one of the SDKs is not installed.
+        """
+        chosen: "OrderedDict[str, Optional[str]]" = OrderedDict()
+        for candidate, spec in sdks:
+            chosen.pop(candidate, None)
+            chosen[candidate] = spec
+        key = (candidates_dir, tuple(chosen.items()))
+        stamp = self._stamp(candidates_dir, list(chosen))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == stamp:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return dict(entry[1], cached=True)
+
+        resolved = []
+        variables = {"SDKMAN_DIR": sdkman_dir, "SDKMAN_CANDIDATES_DIR": candidates_dir}
+        path: List[str] = []
+        for candidate, spec in chosen.items():
+            candidate_dir = os.path.join(candidates_dir, candidate)
+            version = resolve_installed(candidate_dir, candidate, spec)
+            home = os.path.join(candidate_dir, version)
+            variables[home_variable(candidate)] = home
+            path.append(bin_dir(home))
+            resolved.append({"candidate": candidate, "version": version, "home": home})
+        result = {"sdks": resolved, "env": variables, "path": path}
+
+        with self._lock:
+            self._misses += 1
+            self._entries[key] = (stamp, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return dict(result, cached=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self._hits, "misses": self._misses}
+
+
+def export_lines(environment: Dict[str, Any]) -> str:
+    """Render a resolved environment as POSIX shell `export` lines; PATH keeps the
+    caller's entries after the SDKs' `bin` directories."""
+    lines = [
+        f"export {name}={shlex.quote(value)}" for name, value in environment["env"].items()
+    ]
+    if environment["path"]:
+        lines.append(f'export PATH={shlex.quote(os.pathsep.join(environment["path"]))}'
+                     f'{os.pathsep}"$PATH"')
+    return "\n".join(lines) + "\n"
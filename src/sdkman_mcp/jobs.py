@@ -0,0 +1,408 @@
+"""
+Job Queue Module
+
+This module runs long SDKMAN operations (install, upgrade, selfupdate) as background
+jobs. Every job is recorded in a SQLite journal together with its captured output and
+timings, so clients can poll for results after the submitting request has ended and
+unfinished jobs are picked up again after a server restart.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from .progress import OutputCallback, parse_progress
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = (SUCCEEDED, FAILED, CANCELLED)
+
+# 被重启中断超过此次数的任务不再重试
+MAX_ATTEMPTS = 3
+# 每个任务在日志中保留的输出上限（字符，保留末尾）
+OUTPUT_LIMIT = 64 * 1024
+# 运行中任务的输出与进度写入日志的最小间隔（秒）
+FLUSH_INTERVAL = 1.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    params TEXT NOT NULL,
+    state TEXT NOT NULL,
+    owner TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    submitted_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    progress REAL,
+    output TEXT NOT NULL DEFAULT '',
+    error TEXT
+)
+"""
+_COLUMNS = (
+    "id", "kind", "params", "state", "owner", "attempts", "submitted_at", "started_at",
+    "finished_at", "progress", "output", "error",
+)
+
+# 任务执行函数：(kind, params, on_output, handle) -> {"success": ..., "data"/"error": ...}
+JobRunner = Callable[[str, Dict[str, Any], OutputCallback, "JobHandle"], Dict[str, Any]]
+
+
+def _start_time(pid: int) -> Optional[str]:
+    """Start time of a process in clock ticks since boot, where /proc provides it."""
+    try:
+        with open(f"/proc/{pid}/stat", encoding="ascii", errors="replace") as f:
+            # 进程名可能含空格与括号，从最后一个 ")" 之后开始数字段，starttime 是第 22 个字段
+            return f.read().rpartition(")")[2].split()[19]
+    except (OSError, IndexError):
+        return None
+
+
+_owner_tokens: Dict[int, str] = {}
+
+
+def _owner_token() -> str:
+    """Identify this process in the journal: "<pid>:<start time>:<random>".
+
+    The random part tells this process apart from an earlier one that had the same
+    PID, e.g. the server running as PID 1 in a restarted container.
+    """
+    pid = os.getpid()
+    token = _owner_tokens.get(pid)
+    if token is None:
+        token = f"{pid}:{_start_time(pid) or '-'}:{uuid.uuid4().hex[:8]}"
+        _owner_tokens[pid] = token
+    return token
+
+
+def _owner_alive(owner: Any) -> bool:
+    """Whether the process that journalled a job as its owner is still running."""
+    if owner is None or owner == "":
+        return False
+    if owner == _owner_token():
+        return True
+    pid_text, _, rest = str(owner).partition(":")
+    try:
+        pid = int(pid_text)
+    except ValueError:
+        return False
+    # 与本进程 PID 相同但标识不同，说明是之前的进程（包括旧版本写入的纯 PID）
+    if pid <= 0 or pid == os.getpid():
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        # 进程存在但属于其他用户
+        pass
+    started = rest.partition(":")[0]
+    if started and started != "-":
+        # PID 已被其他进程复用
+        return _start_time(pid) in (None, started)
+    return True
+
+
+class JobHandle:
+    """Lets a running job react to cancellation, e.g. by killing its process."""
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self._lock = threading.Lock()
+        self._cancelled = False
+        self._callbacks: List[Callable[[], Any]] = []
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled
+
+    def on_cancel(self, callback: Callable[[], Any]) -> None:
+        """Run callback when the job is cancelled; immediately if it already was."""
+        with self._lock:
+            if not self._cancelled:
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def cancel(self) -> None:
+        with self._lock:
+            self._cancelled = True
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.debug(f"Cancel callback of job {self.job_id} failed: {str(e)}")
+
+
+class _Capture:
+    """Collects a job's output lines and progress, writing them to the journal now
+    and then while the job runs."""
+
+    def __init__(self, queue: "JobQueue", job_id: str):
+        self._queue = queue
+        self._job_id = job_id
+        self._lines: Deque[str] = deque()
+        self._size = 0
+        self._progress: Optional[float] = None
+        self._flushed = time.monotonic()
+
+    def __call__(self, stream: str, line: str) -> None:
+        percent = parse_progress(line)
+        if percent is not None:
+            self._progress = percent
+        else:
+            line = line.rstrip("\n") + "\n"
+            self._lines.append(line)
+            self._size += len(line)
+            while self._size > OUTPUT_LIMIT and len(self._lines) > 1:
+                self._size -= len(self._lines.popleft())
+        if time.monotonic() - self._flushed >= FLUSH_INTERVAL:
+            self.flush()
+
+    @property
+    def output(self) -> str:
+        return "".join(self._lines)[-OUTPUT_LIMIT:]
+
+    @property
+    def progress(self) -> Optional[float]:
+        return self._progress
+
+    def flush(self) -> None:
+        self._flushed = time.monotonic()
+        self._queue._update(self._job_id, output=self.output, progress=self._progress)
+
+
+class JobQueue:
+    """Runs jobs on a thread pool and journals them in SQLite.
+
+    `path` is the journal file; None keeps the journal in memory, so jobs do not
+    survive a restart. Jobs found queued or running in the journal, whose owning
+    process is gone, are resumed when the queue starts.
+    """
+
+    def __init__(self, runner: JobRunner, path: Optional[str] = None, workers: int = 2,
+                 retention: float = 7 * 86400):
+        self.path = os.path.expanduser(path) if path else None
+        self._runner = runner
+        self._retention = retention
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers),
+                                            thread_name_prefix="sdkman-job")
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+        self._handles: Dict[str, JobHandle] = {}
+        self._done: Dict[str, threading.Event] = {}
+        self._started = False
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            if self.path is None:
+                connection = sqlite3.connect(":memory:", check_same_thread=False)
+            else:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                connection = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+                connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(_SCHEMA)
+            connection.commit()
+            self._connection = connection
+        return self._connection
+
+    def _query(self, statement: str, parameters: tuple = ()) -> List[tuple]:
+        with self._lock:
+            return self._connect().execute(statement, parameters).fetchall()
+
+    def _execute(self, statement: str, parameters: tuple = ()) -> int:
+        with self._lock:
+            connection = self._connect()
+            cursor = connection.execute(statement, parameters)
+            connection.commit()
+            return cursor.rowcount
+
+    def _update(self, job_id: str, **fields: Any) -> None:
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        try:
+            self._execute(f"UPDATE jobs SET {assignments} WHERE id = ?",
+                          tuple(fields.values()) + (job_id,))
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"Failed to update job {job_id} in {self.path}: {str(e)}")
+
+    def start(self) -> None:
+        """Prune old finished jobs and resume the unfinished jobs of dead processes."""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        try:
+            self._execute("DELETE FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?",
+                          (time.time() - self._retention,))
+            rows = self._query(
+                "SELECT id, state, owner, attempts FROM jobs WHERE state IN (?, ?) "
+                "ORDER BY submitted_at",
+                (QUEUED, RUNNING),
+            )
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"Failed to open job journal {self.path}: {str(e)}")
+            return
+        for job_id, state, owner, attempts in rows:
+            if _owner_alive(owner):
+                continue
+            if attempts >= MAX_ATTEMPTS:
+                self._update(job_id, state=FAILED, finished_at=time.time(),
+                             error=f"Interrupted {attempts} times by server restarts")
+                continue
+            # 认领任务：只有一个进程能把 owner 从已退出的进程改成自己
+            claimed = self._execute(
+                "UPDATE jobs SET state = ?, owner = ? WHERE id = ? AND state = ? "
+                "AND owner IS ?",
+                (QUEUED, _owner_token(), job_id, state, owner),
+            )
+            if claimed:
+                logger.info(f"Resuming job {job_id} after a restart")
+                self._schedule(job_id)
+
+    def _schedule(self, job_id: str) -> None:
+        self._handles[job_id] = JobHandle(job_id)
+        self._done[job_id] = threading.Event()
+        self._executor.submit(self._run, job_id)
+
+    def submit(self, kind: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Journal a new job and queue it; returns the job record."""
+        self.start()
+        job_id = uuid.uuid4().hex[:12]
+        self._execute(
+            "INSERT INTO jobs (id, kind, params, state, owner, submitted_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (job_id, kind, json.dumps(params), QUEUED, _owner_token(), time.time()),
+        )
+        self._schedule(job_id)
+        return self.get(job_id)  # type: ignore[return-value]
+
+    def _run(self, job_id: str) -> None:
+        handle = self._handles[job_id]
+        try:
+            started = self._execute(
+                "UPDATE jobs SET state = ?, started_at = ?, attempts = attempts + 1 "
+                "WHERE id = ? AND state = ?",
+                (RUNNING, time.time(), job_id, QUEUED),
+            )
+            if not started:
+                # 排队期间已被取消
+                return
+            kind, params = self._query("SELECT kind, params FROM jobs WHERE id = ?", (job_id,))[0]
+            capture = _Capture(self, job_id)
+            try:
+                result = self._runner(kind, json.loads(params), capture, handle)
+            except Exception as e:
+                logger.error(f"Job {job_id} raised: {str(e)}")
+                result = {"success": False, "error": str(e)}
+            if result.get("success"):
+                # 取消请求到达前命令已经完成
+                state, error = SUCCEEDED, None
+            elif handle.cancelled:
+                state, error = CANCELLED, "Cancelled while running"
+            else:
+                state, error = FAILED, result.get("error") or "Job failed"
+            self._update(job_id, state=state, error=error, finished_at=time.time(),
+                         output=capture.output, progress=capture.progress)
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"Job {job_id} could not be journalled: {str(e)}")
+        finally:
+            self._handles.pop(job_id, None)
+            self._done.pop(job_id, threading.Event()).set()
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return a job record with its timings, or None if the id is unknown."""
+        self.start()
+        rows = self._query(f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE id = ?", (job_id,))
+        return self._record(rows[0]) if rows else None
+
+    def list(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Return the most recently submitted jobs, without their output."""
+        self.start()
+        rows = self._query(
+            f"SELECT {', '.join(_COLUMNS)} FROM jobs ORDER BY submitted_at DESC LIMIT ?",
+            (max(1, limit),),
+        )
+        records = [self._record(row) for row in rows]
+        for record in records:
+            del record["output"]
+        return records
+
+    @staticmethod
+    def _record(row: tuple) -> Dict[str, Any]:
+        record = dict(zip(_COLUMNS, row))
+        record["params"] = json.loads(record["params"])
+        del record["owner"]
+        submitted, started, finished = (
+            record["submitted_at"], record["started_at"], record["finished_at"]
+        )
+        record["queue_seconds"] = round((started or finished or time.time()) - submitted, 3)
+        record["run_seconds"] = (
+            round((finished or time.time()) - started, 3) if started else None
+        )
+        return record
+
+    def wait(self, job_id: str, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Block until the job finishes or timeout passes, then return its record."""
+        done = self._done.get(job_id)
+        if done is not None:
+            done.wait(timeout)
+        else:
+            # 由其他进程执行的任务只能轮询日志
+            deadline = time.monotonic() + timeout if timeout is not None else None
+            while True:
+                record = self.get(job_id)
+                if record is None or record["state"] in FINISHED_STATES:
+                    return record
+                if deadline is not None and time.monotonic() >= deadline:
+                    return record
+                time.sleep(0.5)
+        return self.get(job_id)
+
+    def owns(self, job_id: str) -> bool:
+        """Whether the job is queued or running in this process."""
+        return job_id in self._handles
+
+    def pending(self) -> int:
+        """Number of jobs queued or running in this process."""
+        return len(self._handles)
+
+    def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Cancel a queued job, or stop a running one; finished jobs are left alone."""
+        self.start()
+        if self._execute(
+            "UPDATE jobs SET state = ?, finished_at = ?, error = ? WHERE id = ? AND state = ?",
+            (CANCELLED, time.time(), "Cancelled before it started", job_id, QUEUED),
+        ):
+            return self.get(job_id)
+        handle = self._handles.get(job_id)
+        if handle is not None:
+            handle.cancel()
+        return self.get(job_id)
+
+    def stats(self) -> Dict[str, Any]:
+        try:
+            rows = self._query("SELECT state, COUNT(*) FROM jobs GROUP BY state")
+        except (sqlite3.Error, OSError) as e:
+            return {"path": self.path, "error": str(e)}
+        return {"path": self.path, "persistent": self.path is not None, "states": dict(rows)}
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
@@ -0,0 +1,230 @@
+"""
+Lock Manager Module
+
+This module orders SDKMAN commands that touch the same state. Each candidate has a
+read/write lock, and a global lock sits above them: normal commands hold it shared,
+commands that rewrite SDKMAN as a whole (selfupdate, flush, update) hold it exclusive.
+
+Within a process the locks are fair: writers are served in arrival order and new
+readers wait behind a queued writer. Across processes the same locks are taken with
+flock(2) on files in a lock directory, so several servers sharing one SDKMAN_DIR
+stay coordinated.
+"""
+
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+from contextlib import ExitStack, contextmanager
+from typing import Any, Deque, Dict, Iterator, Optional
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - 非 POSIX 平台只做进程内加锁
+    fcntl = None  # type: ignore[assignment]
+
+logger = logging.getLogger(__name__)
+
+GLOBAL_LOCK = ""
+_SAFE_NAME = re.compile(r"[A-Za-z0-9_.-]+")
+_FLOCK_POLL_INTERVAL = 0.05
+
+
+class LockTimeout(Exception):
+    """Raised when a lock cannot be acquired before the deadline."""
+
+
+def _remaining(deadline: Optional[float]) -> Optional[float]:
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.monotonic())
+
+
+class ReadWriteLock:
+    """A writer-preferring read/write lock that grants writers in FIFO order."""
+
+    def __init__(self) -> None:
+        self._condition = threading.Condition()
+        self._readers = 0
+        self._writer = False
+        self._writers: Deque[int] = deque()
+        self._next_ticket = 0
+
+    def acquire_read(self, deadline: Optional[float] = None) -> bool:
+        with self._condition:
+            while self._writer or self._writers:
+                if not self._wait(deadline):
+                    return False
+            self._readers += 1
+            return True
+
+    def release_read(self) -> None:
+        with self._condition:
+            self._readers -= 1
+            if not self._readers:
+                self._condition.notify_all()
+
+    def acquire_write(self, deadline: Optional[float] = None) -> bool:
+        with self._condition:
+            ticket = self._next_ticket
+            self._next_ticket += 1
+            self._writers.append(ticket)
+            granted = False
+            try:
+                while self._writer or self._readers or self._writers[0] != ticket:
+                    if not self._wait(deadline):
+                        return False
+                granted = True
+            finally:
+                self._writers.remove(ticket)
+                if granted:
+                    self._writer = True
+                else:
+                    # 放弃排队后唤醒后面的写者和被挡住的读者
+                    self._condition.notify_all()
+            return True
+
+    def release_write(self) -> None:
+        with self._condition:
+            self._writer = False
+            self._condition.notify_all()
+
+    def _wait(self, deadline: Optional[float]) -> bool:
+        remaining = _remaining(deadline)
+        if remaining == 0.0:
+            return False
+        self._condition.wait(remaining)
+        return True
+
+    @property
+    def idle(self) -> bool:
+        with self._condition:
+            return not (self._readers or self._writer or self._writers)
+
+
+class LockManager:
+    """Hands out the global and per-candidate locks for a command.
+
+    `directory` holds the cross-process lock files; when it is None, or cannot be
+    created, locking only applies within this process.
+    """
+
+    def __init__(self, directory: Optional[str] = None, timeout: Optional[float] = None):
+        self.directory = directory
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._locks: Dict[str, ReadWriteLock] = {}
+        self._stats = {"acquired": 0, "contended": 0, "timeouts": 0, "wait_seconds": 0.0}
+        if directory is not None and fcntl is not None:
+            try:
+                os.makedirs(directory, exist_ok=True)
+            except OSError as e:
+                logger.warning(f"Cannot create lock directory {directory}: {str(e)}")
+                self.directory = None
+        elif fcntl is None:
+            self.directory = None
+
+    def _rwlock(self, name: str) -> ReadWriteLock:
+        with self._lock:
+            lock = self._locks.get(name)
+            if lock is None:
+                lock = self._locks[name] = ReadWriteLock()
+            return lock
+
+    def _lock_path(self, name: str) -> str:
+        if not name:
+            filename = "global"
+        elif _SAFE_NAME.fullmatch(name):
+            filename = f"candidate-{name}"
+        else:
+            filename = "candidate-" + hashlib.sha256(name.encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.directory, f"{filename}.lock")
+
+    @contextmanager
+    def _hold_one(self, name: str, exclusive: bool, deadline: Optional[float]) -> Iterator[None]:
+        rwlock = self._rwlock(name)
+        label = name or "global"
+        acquired = rwlock.acquire_write(deadline) if exclusive else rwlock.acquire_read(deadline)
+        if not acquired:
+            raise LockTimeout(f"Timed out waiting for the {label} lock")
+        try:
+            if self.directory is None:
+                yield
+                return
+            with self._flock(self._lock_path(name), exclusive, deadline, label):
+                yield
+        finally:
+            if exclusive:
+                rwlock.release_write()
+            else:
+                rwlock.release_read()
+
+    @contextmanager
+    def _flock(self, path: str, exclusive: bool, deadline: Optional[float], label: str
+               ) -> Iterator[None]:
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            operation = fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH
+            while True:
+                try:
+                    fcntl.flock(fd, operation | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    remaining = _remaining(deadline)
+                    if remaining == 0.0:
+                        raise LockTimeout(
+                            f"Timed out waiting for the {label} lock held by another process"
+                        )
+                    time.sleep(min(_FLOCK_POLL_INTERVAL, remaining or _FLOCK_POLL_INTERVAL))
+            try:
+                yield
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+        finally:
+            os.close(fd)
+
+    @contextmanager
+    def hold(
+        self,
+        candidate: Optional[str] = None,
+        exclusive: bool = False,
+        global_exclusive: bool = False,
+        timeout: Optional[float] = None,
+    ) -> Iterator[float]:
+        """Hold the global lock (shared unless `global_exclusive`) and, if given, the
+        candidate's lock (shared unless `exclusive`). Yields the seconds spent waiting.
+
+        The global lock is always taken first, so the ordering is deadlock-free.
+        Raises LockTimeout when the locks are not granted within the timeout.
+        """
+        timeout = timeout if timeout is not None else self.timeout
+        deadline = time.monotonic() + timeout if timeout else None
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            try:
+                stack.enter_context(self._hold_one(GLOBAL_LOCK, global_exclusive, deadline))
+                if candidate and not global_exclusive:
+                    stack.enter_context(self._hold_one(candidate, exclusive, deadline))
+            except LockTimeout:
+                with self._lock:
+                    self._stats["timeouts"] += 1
+                raise
+            waited = time.perf_counter() - started
+            with self._lock:
+                self._stats["acquired"] += 1
+                self._stats["wait_seconds"] += waited
+                # 超过 1 毫秒视为发生了争用
+                self._stats["contended"] += int(waited > 0.001)
+            yield waited
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            held = [name or "global" for name, lock in self._locks.items() if not lock.idle]
+        stats["wait_seconds"] = round(stats["wait_seconds"], 3)
+        stats["busy"] = sorted(held)
+        stats["cross_process"] = self.directory is not None
+        return stats
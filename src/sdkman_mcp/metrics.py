@@ -0,0 +1,317 @@
+"""
+Metrics Module
+
+This module records call counts, errors, latency histograms and output sizes of MCP
+tools and SDKMAN commands, and renders them as JSON or Prometheus text format.
+
+Histograms use fixed buckets, so recording a sample is a bisect and a few additions
+under a lock; percentiles are estimated from the buckets.
+"""
+
+import bisect
+import functools
+import os
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
+
+# SDKMAN_MCP_METRICS=0 时不记录任何指标
+METRICS_ENABLED = os.environ.get("SDKMAN_MCP_METRICS", "1") != "0"
+
+# 桶上限（秒），覆盖从 native 读取的亚毫秒级到安装的数十分钟
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0, 1800.0,
+)
+
+# 命令耗时的各阶段：等待调度锁、排队等待 worker、启动 bash、source 初始化脚本、执行命令
+COMMAND_PHASES = ("lock", "wait", "spawn", "init", "exec")
+
+F = TypeVar("F", bound=Callable[..., Awaitable[Any]])
+
+
+class Histogram:
+    """Latency histogram with fixed bucket bounds in seconds."""
+
+    __slots__ = ("bounds", "counts", "count", "total", "minimum", "maximum")
+
+    def __init__(self, bounds: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.minimum = float("inf")
+        self.maximum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        if value < self.minimum:
+            self.minimum = value
+        if value > self.maximum:
+            self.maximum = value
+
+    def percentile(self, q: float) -> float:
+        """Estimate the q-quantile (0..1) by interpolating inside its bucket, clamped to
+        the observed minimum and maximum."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for position, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower = max(self.bounds[position - 1] if position else 0.0, self.minimum)
+                upper = min(self.bounds[position] if position < len(self.bounds) else self.maximum,
+                            self.maximum)
+                return lower + (upper - lower) * max(0.0, rank - seen) / count
+            seen += count
+        return self.maximum
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            "p50_ms": round(self.percentile(0.50) * 1000, 3),
+            "p95_ms": round(self.percentile(0.95) * 1000, 3),
+            "p99_ms": round(self.percentile(0.99) * 1000, 3),
+            "max_ms": round(self.maximum * 1000, 3),
+        }
+
+
+class _ToolStats:
+    __slots__ = ("calls", "errors", "latency")
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.errors = 0
+        self.latency = Histogram()
+
+
+class _CommandStats:
+    __slots__ = ("calls", "errors", "timeouts", "coalesced", "modes", "latency", "phases",
+                 "stdout_bytes", "stderr_bytes")
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.modes: Dict[str, int] = {}
+        self.latency = Histogram()
+        self.phases = {phase: Histogram() for phase in COMMAND_PHASES}
+        self.stdout_bytes = 0
+        self.stderr_bytes = 0
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class MetricsRegistry:
+    """Thread-safe collection of tool and command metrics."""
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._tools: Dict[str, _ToolStats] = {}
+        self._commands: Dict[str, _CommandStats] = {}
+        self._started = time.time()
+
+    def record_tool(self, name: str, seconds: float, error: bool) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            stats = self._tools.get(name)
+            if stats is None:
+                stats = self._tools[name] = _ToolStats()
+            stats.calls += 1
+            stats.errors += int(error)
+            stats.latency.observe(seconds)
+
+    def record_command(
+        self,
+        name: str,
+        mode: str,
+        returncode: int,
+        seconds: float,
+        timings: Dict[str, float],
+        stdout_bytes: int,
+        stderr_bytes: int,
+    ) -> None:
+        """Record one SDKMAN command; only the phases present in `timings` are observed."""
+        if not self.enabled:
+            return
+        with self._lock:
+            stats = self._commands.get(name)
+            if stats is None:
+                stats = self._commands[name] = _CommandStats()
+            stats.calls += 1
+            stats.errors += int(returncode != 0)
+            stats.timeouts += int(returncode == 124)
+            stats.modes[mode] = stats.modes.get(mode, 0) + 1
+            stats.latency.observe(seconds)
+            for phase, value in timings.items():
+                histogram = stats.phases.get(phase)
+                if histogram is not None:
+                    histogram.observe(value)
+            stats.stdout_bytes += stdout_bytes
+            stats.stderr_bytes += stderr_bytes
+
+    def record_coalesced(self, name: str) -> None:
+        """Count a call that shared another caller's run of the same command."""
+        if not self.enabled:
+            return
+        with self._lock:
+            stats = self._commands.get(name)
+            if stats is None:
+                stats = self._commands[name] = _CommandStats()
+            stats.coalesced += 1
+
+    def reset(self) -> None:
+        with self._lock:
+            self._tools.clear()
+            self._commands.clear()
+            self._started = time.time()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return the metrics as a JSON-serialisable dict."""
+        with self._lock:
+            tools = {
+                name: dict(calls=stats.calls, errors=stats.errors, latency=stats.latency.summary())
+                for name, stats in sorted(self._tools.items())
+            }
+            commands = {}
+            for name, stats in sorted(self._commands.items()):
+                commands[name] = {
+                    "calls": stats.calls,
+                    "errors": stats.errors,
+                    "timeouts": stats.timeouts,
+                    "coalesced": stats.coalesced,
+                    "modes": dict(stats.modes),
+                    "latency": stats.latency.summary(),
+                    "phases": {
+                        phase: histogram.summary()
+                        for phase, histogram in stats.phases.items() if histogram.count
+                    },
+                    "stdout_bytes": stats.stdout_bytes,
+                    "stderr_bytes": stats.stderr_bytes,
+                }
+            return {
+                "enabled": self.enabled,
+                "uptime_seconds": round(time.time() - self._started, 1),
+                "tools": tools,
+                "commands": commands,
+            }
+
+    def prometheus(self, prefix: str = "sdkman_mcp") -> str:
+        """Render the metrics in the Prometheus text exposition format."""
+        lines: List[str] = []
+
+        def histogram(name: str, labels: str, data: Histogram) -> None:
+            cumulative = 0
+            for bound, count in zip(data.bounds, data.counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {data.count}')
+            lines.append(f"{name}_sum{{{labels}}} {data.total:.6f}")
+            lines.append(f"{name}_count{{{labels}}} {data.count}")
+
+        with self._lock:
+            lines += [
+                f"# HELP {prefix}_tool_calls_total MCP tool calls.",
+                f"# TYPE {prefix}_tool_calls_total counter",
+            ]
+            for name, stats in sorted(self._tools.items()):
+                label = f'tool="{_escape_label(name)}"'
+                lines.append(f"{prefix}_tool_calls_total{{{label}}} {stats.calls}")
+            lines += [
+                f"# HELP {prefix}_tool_errors_total MCP tool calls that reported a failure.",
+                f"# TYPE {prefix}_tool_errors_total counter",
+            ]
+            for name, stats in sorted(self._tools.items()):
+                label = f'tool="{_escape_label(name)}"'
+                lines.append(f"{prefix}_tool_errors_total{{{label}}} {stats.errors}")
+            lines += [
+                f"# HELP {prefix}_tool_duration_seconds MCP tool call latency.",
+                f"# TYPE {prefix}_tool_duration_seconds histogram",
+            ]
+            for name, stats in sorted(self._tools.items()):
+                histogram(f"{prefix}_tool_duration_seconds", f'tool="{_escape_label(name)}"',
+                          stats.latency)
+
+            lines += [
+                f"# HELP {prefix}_command_calls_total SDKMAN commands run, by execution mode.",
+                f"# TYPE {prefix}_command_calls_total counter",
+            ]
+            for name, stats in sorted(self._commands.items()):
+                for mode, count in sorted(stats.modes.items()):
+                    lines.append(
+                        f'{prefix}_command_calls_total{{command="{_escape_label(name)}",'
+                        f'mode="{mode}"}} {count}'
+                    )
+            lines += [
+                f"# HELP {prefix}_command_errors_total SDKMAN commands with a non-zero exit code.",
+                f"# TYPE {prefix}_command_errors_total counter",
+            ]
+            for name, stats in sorted(self._commands.items()):
+                label = f'command="{_escape_label(name)}"'
+                lines.append(f"{prefix}_command_errors_total{{{label}}} {stats.errors}")
+            lines += [
+                f"# HELP {prefix}_command_coalesced_total Calls that shared a concurrent run "
+                "of the same command.",
+                f"# TYPE {prefix}_command_coalesced_total counter",
+            ]
+            for name, stats in sorted(self._commands.items()):
+                label = f'command="{_escape_label(name)}"'
+                lines.append(f"{prefix}_command_coalesced_total{{{label}}} {stats.coalesced}")
+            lines += [
+                f"# HELP {prefix}_command_duration_seconds SDKMAN command latency by phase.",
+                f"# TYPE {prefix}_command_duration_seconds histogram",
+            ]
+            for name, stats in sorted(self._commands.items()):
+                label = f'command="{_escape_label(name)}"'
+                histogram(f"{prefix}_command_duration_seconds", f'{label},phase="total"',
+                          stats.latency)
+                for phase, data in stats.phases.items():
+                    if data.count:
+                        histogram(f"{prefix}_command_duration_seconds",
+                                  f'{label},phase="{phase}"', data)
+            lines += [
+                f"# HELP {prefix}_command_output_bytes_total Bytes SDKMAN commands printed.",
+                f"# TYPE {prefix}_command_output_bytes_total counter",
+            ]
+            for name, stats in sorted(self._commands.items()):
+                label = f'command="{_escape_label(name)}"'
+                lines.append(
+                    f'{prefix}_command_output_bytes_total{{{label},stream="stdout"}} '
+                    f"{stats.stdout_bytes}"
+                )
+                lines.append(
+                    f'{prefix}_command_output_bytes_total{{{label},stream="stderr"}} '
+                    f"{stats.stderr_bytes}"
+                )
+        return "\n".join(lines) + "\n"
+
+
+# 进程内共享的指标注册表
+metrics = MetricsRegistry(enabled=METRICS_ENABLED)
+
+
+def instrument_tool(name: str, func: F, registry: Optional[MetricsRegistry] = None) -> F:
+    """Wrap an async tool so each call is recorded; a {"success": False} result counts
+    as an error, as does an exception."""
+    registry = registry or metrics
+
+    @functools.wraps(func)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        started = time.perf_counter()
+        error = True
+        try:
+            result = await func(*args, **kwargs)
+            error = isinstance(result, dict) and result.get("success") is False
+            return result
+        finally:
+            registry.record_tool(name, time.perf_counter() - started, error)
+
+    return wrapper  # type: ignore[return-value]
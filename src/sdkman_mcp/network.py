@@ -0,0 +1,214 @@
+"""
+Network Transport Module
+
+This module serves the MCP server over HTTP, so that many clients share one long-lived
+process with its warm workers, caches, locks and job queue: SSE (`GET /sse` with
+`POST /messages/`) and, with an MCP SDK that provides it (mcp>=1.8), streamable HTTP
+(`/mcp`).
+
+The number of open connections is limited, and the first SIGINT or SIGTERM drains the
+server: new sessions are refused, and it exits once the tool calls and background jobs
+in progress have finished or the drain timeout has passed. A second signal exits at once.
+"""
+
+import asyncio
+import logging
+import signal
+from types import FrameType
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+import anyio
+import uvicorn
+
+logger = logging.getLogger(__name__)
+
+# 排空完成后留给已打开的流和连接关闭的时间（秒）
+CLOSE_TIMEOUT = 5.0
+# 排空期间检查工具调用与后台任务的间隔（秒）
+DRAIN_POLL_INTERVAL = 0.2
+
+ASGIApp = Callable[[Dict[str, Any], Callable, Callable], Awaitable[None]]
+
+
+class _Gate:
+    """ASGI middleware that limits open connections and refuses new sessions while the
+    server drains. Messages posted to existing SSE sessions are always let through."""
+
+    def __init__(self, app: ASGIApp, transport: str, settings: Any, max_connections: int):
+        self.app = app
+        self.transport = transport
+        self.sse_path = settings.sse_path
+        self.message_path = settings.message_path
+        self.max_connections = max_connections
+        self.connections = 0
+        self.draining = False
+        self._sessions: Set[anyio.CancelScope] = set()
+
+    def _opens_session(self, scope: Dict[str, Any]) -> bool:
+        if self.transport == "sse":
+            return scope["method"] == "GET" and scope["path"] == self.sse_path
+        # 可流式 HTTP：不带 mcp-session-id 的 POST 是 initialize 请求
+        headers = dict(scope.get("headers") or ())
+        return scope["method"] == "POST" and b"mcp-session-id" not in headers
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        if scope["path"].startswith(self.message_path) and self.transport == "sse":
+            await self.app(scope, receive, send)
+            return
+        if self.draining and self._opens_session(scope):
+            await self._refuse(send, "Server is shutting down")
+            return
+        if self.max_connections and self.connections >= self.max_connections:
+            await self._refuse(send, "Too many connections")
+            return
+        self.connections += 1
+        try:
+            if self.transport == "sse" and self._opens_session(scope):
+                await self._run_session(scope, receive, send)
+            else:
+                await self.app(scope, receive, send)
+        finally:
+            self.connections -= 1
+
+    async def _run_session(self, scope: Dict[str, Any], receive: Callable,
+                           send: Callable) -> None:
+        """Run an SSE session until the client disconnects or the server closes it.
+
+        The MCP SDK keeps a session's message loop waiting after its client has gone,
+        which would hold the connection slot forever; it is cancelled here instead.
+        """
+        disconnected = anyio.Event()
+
+        async def watch_receive() -> Dict[str, Any]:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                disconnected.set()
+            return message
+
+        async with anyio.create_task_group() as group:
+            self._sessions.add(group.cancel_scope)
+
+            async def run() -> None:
+                await self.app(scope, watch_receive, send)
+                group.cancel_scope.cancel()
+
+            group.start_soon(run)
+            try:
+                await disconnected.wait()
+                group.cancel_scope.cancel()
+            finally:
+                self._sessions.discard(group.cancel_scope)
+
+    def close_sessions(self) -> None:
+        """End every open SSE session."""
+        for scope in list(self._sessions):
+            scope.cancel()
+
+    @staticmethod
+    async def _refuse(send: Callable, reason: str) -> None:
+        body = reason.encode()
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"text/plain; charset=utf-8"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", b"5"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+class _DrainingServer(uvicorn.Server):
+    """uvicorn server whose first exit signal drains the MCP server before stopping."""
+
+    def __init__(self, config: uvicorn.Config, gate: _Gate, mcp_server: Any,
+                 drain_timeout: float):
+        super().__init__(config)
+        self._gate = gate
+        self._mcp_server = mcp_server
+        self._drain_timeout = drain_timeout
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._drain_task: Optional["asyncio.Task[None]"] = None
+
+    async def serve(self, sockets: Any = None) -> None:
+        self._loop = asyncio.get_running_loop()
+        await super().serve(sockets)
+
+    def handle_exit(self, sig: int, frame: Optional[FrameType]) -> None:
+        if self._loop is None or self._gate.draining:
+            # 第二个信号：不再等待，立即退出
+            logger.warning("Exiting without waiting for tool calls and jobs")
+            self.should_exit = True
+            self.force_exit = True
+            if self._loop is not None:
+                self._loop.call_soon_threadsafe(self._gate.close_sessions)
+            return
+        self._gate.draining = True
+        self._loop.call_soon_threadsafe(self._start_drain, signal.Signals(sig).name)
+
+    def _start_drain(self, reason: str) -> None:
+        self._drain_task = asyncio.ensure_future(self._drain(reason))
+
+    async def _drain(self, reason: str) -> None:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self._drain_timeout
+        busy = self._mcp_server.busy()
+        logger.warning(
+            f"{reason} received, refusing new sessions and waiting up to "
+            f"{self._drain_timeout:.0f}s for {busy['tool_calls']} tool call(s) and "
+            f"{busy['jobs']} job(s); send it again to exit at once"
+        )
+        while any(busy.values()):
+            if loop.time() >= deadline:
+                logger.warning(
+                    f"Drain timeout passed with {busy['tool_calls']} tool call(s) and "
+                    f"{busy['jobs']} job(s) unfinished; unfinished jobs resume on restart"
+                )
+                break
+            await asyncio.sleep(DRAIN_POLL_INTERVAL)
+            busy = self._mcp_server.busy()
+        self.should_exit = True
+        self._gate.close_sessions()
+
+
+def build_app(mcp_server: Any, transport: str) -> ASGIApp:
+    """Return the ASGI app of the server for the transport; raises ValueError when the
+    installed MCP SDK does not provide it."""
+    if transport == "sse":
+        return mcp_server.sse_app()
+    if transport == "http":
+        streamable_http_app = getattr(mcp_server, "streamable_http_app", None)
+        if streamable_http_app is None:
+            raise ValueError("The streamable HTTP transport requires mcp>=1.8; use sse")
+        return streamable_http_app()
+    raise ValueError(f"Unknown transport {transport!r}")
+
+
+def serve(mcp_server: Any, transport: str, host: str, port: int,
+          max_connections: int = 0, drain_timeout: float = 600.0) -> None:
+    """Serve the MCP server over HTTP until it is stopped by a signal.
+
+    Args:
+        mcp_server: Server returned by create_server()
+        transport: "sse" or "http" (streamable HTTP)
+        host: Address to listen on
+        port: Port to listen on
+        max_connections: Open connections accepted at once, not counting messages posted to
+            existing SSE sessions; further ones get 503 (0 means no limit)
+        drain_timeout: Seconds to wait for tool calls and background jobs on shutdown
+    """
+    gate = _Gate(build_app(mcp_server, transport), transport, mcp_server.settings,
+                 max_connections)
+    config = uvicorn.Config(
+        gate,
+        host=host,
+        port=port,
+        log_level=mcp_server.settings.log_level.lower(),
+        timeout_graceful_shutdown=int(CLOSE_TIMEOUT),
+    )
+    server = _DrainingServer(config, gate, mcp_server, drain_timeout)
+    asyncio.run(server.serve())
@@ -0,0 +1,312 @@
+"""
+Command Output Module
+
+This module bounds the output captured from SDKMAN commands and makes it cheaper to
+return to MCP clients. Output passes through a streaming filter that drops ANSI escape
+sequences, trailing whitespace and repeated blank lines as it is read; beyond a size
+limit only its head and tail are kept in memory, and the whole output is spilled to a
+file whose path is given in place of the omitted middle.
+
+It also renders `sdk list` and `sdk current` output in the compact and JSON formats the
+list and current tools offer besides the raw text.
+"""
+
+import logging
+import os
+import re
+import tempfile
+import time
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from .version_index import VersionIndex
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ("raw", "compact", "json")
+
+# CSI（颜色、光标移动）、以 BEL 或 ST 结束的 OSC（标题、超链接）以及其余两字节序列
+_ANSI = re.compile(rb"\x1b(?:\[[0-?]*[ -/]*[@-~]|\][^\x07\x1b]*(?:\x07|\x1b\\)|[@-Z\\-_])")
+# 块末尾尚未结束的转义序列，留到下一块再处理
+_PARTIAL_ANSI = re.compile(rb"\x1b(?:\[[0-?]*[ -/]*|\][^\x07\x1b]*\x1b?)?\Z")
+_TRAILING_SPACE = re.compile(rb"[ \t]+(?=\r?\n)")
+_PENDING_SPACE = re.compile(rb"[ \t]*\r?\Z")
+_BLANK_RUN = re.compile(rb"\n{3,}")
+# 待定的不完整序列或行尾空白超过此长度时不再等待，原样输出
+MAX_PENDING = 4096
+# 溢出文件保留的秒数，写新的溢出文件时清理更早的
+SPILL_RETENTION = 86400.0
+
+
+class OutputLimits(NamedTuple):
+    """How command output is captured."""
+
+    # 每个流保留在内存中的最大字节数，0 表示不限
+    max_bytes: int = 0
+    # 超出上限时完整输出写入的目录，None 表示直接丢弃中间部分
+    spill_dir: Optional[str] = None
+    # 是否过滤 ANSI 转义序列、行尾空白与连续空行
+    strip: bool = True
+
+
+class OutputFilter:
+    """Streaming filter that removes ANSI escape sequences and trailing whitespace, and
+    keeps at most one blank line in a row, across arbitrary chunk boundaries."""
+
+    def __init__(self) -> None:
+        self._pending = b""
+        # 已输出内容末尾连续换行的个数；从 2 开始，输出开头的空行也被去掉
+        self._newlines = 2
+
+    def feed(self, data: bytes) -> bytes:
+        data = self._pending + data
+        self._pending = b""
+        partial = _PARTIAL_ANSI.search(data)
+        if partial is not None and len(data) - partial.start() <= MAX_PENDING:
+            data, self._pending = data[:partial.start()], data[partial.start():]
+        data = _ANSI.sub(b"", data)
+        pending = _PENDING_SPACE.search(data)
+        if pending.start() < len(data) and len(data) - pending.start() <= MAX_PENDING:
+            data, self._pending = data[:pending.start()], data[pending.start():] + self._pending
+        return self._collapse(_TRAILING_SPACE.sub(b"", data))
+
+    def flush(self) -> bytes:
+        rest = _ANSI.sub(b"", self._pending).rstrip(b" \t")
+        self._pending = b""
+        return self._collapse(rest)
+
+    def _collapse(self, data: bytes) -> bytes:
+        if not data:
+            return data
+        stripped = data.lstrip(b"\n")
+        leading = min(len(data) - len(stripped), max(0, 2 - self._newlines))
+        if not stripped:
+            self._newlines += leading
+            return b"\n" * leading
+        data = b"\n" * leading + _BLANK_RUN.sub(b"\n\n", stripped)
+        self._newlines = len(data) - len(data.rstrip(b"\n"))
+        return data
+
+
+class BoundedOutput:
+    """Captures one output stream within OutputLimits.
+
+    Up to `max_bytes` of (filtered) output are kept whole. Beyond that the first and
+    last halves are kept, and with a spill directory the complete output is written
+    to a file there.
+    """
+
+    def __init__(self, name: str, limits: Optional[OutputLimits] = None):
+        self.name = name
+        self.limits = limits or OutputLimits(strip=False)
+        self.total_bytes = 0
+        self.spill_path: Optional[str] = None
+        self._filter = OutputFilter() if self.limits.strip else None
+        self._head = bytearray()
+        self._tail = bytearray()
+        self._spill: Optional[Any] = None
+        self._truncated = False
+
+    @property
+    def truncated(self) -> bool:
+        return self._truncated
+
+    def write(self, data: bytes) -> bytes:
+        """Capture a chunk of raw output and return it as filtered."""
+        if self._filter is not None:
+            data = self._filter.feed(data)
+        self._capture(data)
+        return data
+
+    def close(self) -> bytes:
+        """Flush the filter and the spill file; returns the output the filter held back."""
+        data = self._filter.flush() if self._filter is not None else b""
+        self._capture(data)
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
+        return data
+
+    def getvalue(self) -> str:
+        """The captured output, with a marker in place of anything omitted."""
+        if not self._truncated:
+            return _decode(bytes(self._head))
+        keep = self.limits.max_bytes - self.limits.max_bytes // 2
+        head, tail = bytes(self._head), bytes(self._tail[max(0, len(self._tail) - keep):])
+        # 截断处对齐到整行
+        cut = head.rfind(b"\n")
+        if cut >= len(head) // 2:
+            head = head[:cut + 1]
+        cut = tail.find(b"\n")
+        if 0 <= cut < len(tail) // 2:
+            tail = tail[cut + 1:]
+        omitted = self.total_bytes - len(head) - len(tail)
+        where = f"; full output in {self.spill_path}" if self.spill_path else ""
+        marker = f"\n[... {omitted} bytes of {self.name} omitted{where} ...]\n"
+        return _decode(head) + marker + _decode(tail)
+
+    def _capture(self, data: bytes) -> None:
+        if not data:
+            return
+        self.total_bytes += len(data)
+        limit = self.limits.max_bytes
+        if self._spill is not None:
+            self._spill.write(data)
+        if not self._truncated:
+            self._head.extend(data)
+            if not limit or len(self._head) <= limit:
+                return
+            # 首次超出上限：保留前一半作为开头，其余转入结尾
+            self._truncated = True
+            self._open_spill()
+            half = limit // 2
+            self._tail = self._head[half:]
+            del self._head[half:]
+        else:
+            self._tail.extend(data)
+        keep = limit - limit // 2
+        if len(self._tail) > 2 * keep:
+            del self._tail[:len(self._tail) - keep]
+
+    def _open_spill(self) -> None:
+        spill_dir = self.limits.spill_dir
+        if not spill_dir:
+            return
+        try:
+            os.makedirs(spill_dir, exist_ok=True)
+            prune_spills(spill_dir)
+            fd, path = tempfile.mkstemp(
+                prefix=time.strftime("%Y%m%d-%H%M%S-"), suffix=f"-{self.name}.log", dir=spill_dir
+            )
+            self._spill = os.fdopen(fd, "wb")
+            self._spill.write(self._head)
+            self.spill_path = path
+        except OSError as e:
+            logger.warning(f"Cannot spill {self.name} to {spill_dir}: {str(e)}")
+            self._spill = None
+
+
+def prune_spills(spill_dir: str, max_age: float = SPILL_RETENTION) -> int:
+    """Remove spill files older than max_age seconds; returns how many were removed."""
+    removed = 0
+    cutoff = time.time() - max_age
+    try:
+        with os.scandir(spill_dir) as entries:
+            for entry in entries:
+                try:
+                    if entry.name.endswith(".log") and entry.stat().st_mtime < cutoff:
+                        os.unlink(entry.path)
+                        removed += 1
+                except OSError:
+                    continue
+    except OSError:
+        pass
+    return removed
+
+
+def _decode(data: bytes) -> str:
+    return data.decode("utf-8", errors="replace")
+
+
+# `sdk list` 的候选概览："Apache ActiveMQ (Classic) (5.17.1)      https://activemq.apache.org/"
+_CANDIDATE_HEADER = re.compile(r"^(?P<name>.+?)\s+\((?P<version>[^()]*)\)\s+(?P<url>\S+://\S+)$")
+_CANDIDATE_INSTALL = re.compile(r"^\$ sdk install (?P<candidate>\S+)$")
+# `sdk current` 的各种输出
+_CURRENT_ALL = re.compile(r"^(?P<candidate>[\w.-]+): (?P<version>\S+)$")
+_CURRENT_ONE = re.compile(r"^Using (?P<candidate>\S+) version (?P<version>\S+)$")
+
+
+def compact_text(text: str) -> str:
+    """Strip padding, blank lines and separator lines from command output."""
+    lines = []
+    for line in text.splitlines():
+        line = " ".join(line.split())
+        if line and line.strip("=-") and not line.startswith("Hit Q "):
+            lines.append(line)
+    return "\n".join(lines)
+
+
+def parse_candidates(text: str) -> List[Dict[str, str]]:
+    """Parse the `sdk list` candidate overview into name, version and URL per candidate."""
+    candidates = []
+    header: Optional[Dict[str, str]] = None
+    for line in text.splitlines():
+        line = line.strip()
+        match = _CANDIDATE_HEADER.match(line)
+        if match:
+            header = match.groupdict()
+            continue
+        match = _CANDIDATE_INSTALL.match(line)
+        if match and header is not None:
+            candidates.append({"candidate": match.group("candidate"), **header})
+            header = None
+    return candidates
+
+
+def render_candidates(text: str, format: str) -> Any:
+    """Render `sdk list` output as "compact" lines of candidate and latest version, or
+    as "json" records."""
+    candidates = parse_candidates(text)
+    if format == "json":
+        return candidates
+    if not candidates:
+        return compact_text(text)
+    return "\n".join(f"{item['candidate']} {item['version']}" for item in candidates)
+
+
+def render_versions(candidate: str, index: VersionIndex, text: str, format: str) -> Any:
+    """Render `sdk list <candidate>` output from its index.
+
+    "json" gives the current version, the installed identifiers and every identifier in
+    list order. "compact" gives one line per vendor and dist (a single line for candidates
+    without vendors) with ">" marking the current version and "*" installed ones; the
+    identifiers of such a line are its versions followed by the dist suffix in its name.
+    """
+    records = index.records
+    if format == "json":
+        return {
+            "candidate": candidate,
+            "current": index.current.identifier if index.current else None,
+            "installed": [record.identifier for record in records if record.installed],
+            "versions": [record.identifier for record in records],
+        }
+    if not records:
+        return compact_text(text)
+    groups: Dict[Tuple[str, str], List[str]] = {}
+    for record in records:
+        # 标识符为 "<版本>-<dist>" 时，dist 已写在组名中，只列出版本
+        shown = record.version if record.identifier == f"{record.version}-{record.dist}" else (
+            record.identifier
+        )
+        mark = (">" if record.use else "") + shown + ("*" if record.installed else "")
+        groups.setdefault((record.vendor, record.dist), []).append(mark)
+    lines = ["> current, * installed"]
+    for (vendor, dist), identifiers in groups.items():
+        name = f"{vendor} (-{dist})" if vendor and dist else vendor or candidate
+        lines.append(f"{name}: {' '.join(identifiers)}")
+    return "\n".join(lines)
+
+
+def parse_current(text: str) -> Dict[str, str]:
+    """Parse `sdk current` or `sdk current <candidate>` output into candidate -> version."""
+    versions = {}
+    for line in text.splitlines():
+        line = line.strip()
+        match = _CURRENT_ALL.match(line) or _CURRENT_ONE.match(line)
+        if match:
+            versions[match.group("candidate")] = match.group("version")
+    return versions
+
+
+def render_current(text: str, format: str, candidate: Optional[str] = None) -> Any:
+    """Render `sdk current [candidate]` output: "json" maps candidates to versions (or is
+    the candidate and its version, None when not in use), "compact" has a line per
+    candidate (or just the version)."""
+    versions = parse_current(text)
+    if candidate is not None:
+        version = versions.get(candidate)
+        if format == "json":
+            return {"candidate": candidate, "version": version}
+        return version or "none"
+    if format == "json":
+        return versions
+    return "\n".join(f"{name} {version}" for name, version in versions.items()) or "none"
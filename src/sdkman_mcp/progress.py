@@ -0,0 +1,114 @@
+"""
+Command Progress Module
+
+This module streams command output line by line and extracts download progress from
+the curl progress bar SDKMAN prints while fetching archives.
+"""
+
+import logging
+import os
+import re
+import selectors
+import subprocess
+import time
+from typing import Callable, List, Optional, Tuple
+
+from .output import BoundedOutput, OutputLimits
+
+logger = logging.getLogger(__name__)
+
+# 流式回调：(stream, line)，stream 为 "stdout" 或 "stderr"
+OutputCallback = Callable[[str, str], None]
+
+# curl --progress-bar 输出形如 "########              23.4%"
+_PERCENT_PATTERN = re.compile(r"(\d{1,3}(?:[.,]\d+)?)\s*%")
+_LINE_BREAK = re.compile(rb"[\r\n]")
+
+
+def parse_progress(line: str) -> Optional[float]:
+    """Return the download percentage in a progress line, or None if there is none."""
+    matches = _PERCENT_PATTERN.findall(line)
+    if not matches:
+        return None
+    percent = float(matches[-1].replace(",", "."))
+    return percent if 0.0 <= percent <= 100.0 else None
+
+
+class LineBuffer:
+    """Accumulates raw output and hands back complete lines.
+
+    Both "\\n" and "\\r" end a line, since curl redraws its progress bar with "\\r".
+    """
+
+    def __init__(self) -> None:
+        self._pending = bytearray()
+
+    def feed(self, data: bytes) -> List[str]:
+        self._pending.extend(data)
+        parts = _LINE_BREAK.split(bytes(self._pending))
+        self._pending = bytearray(parts.pop())
+        return [part.decode("utf-8", errors="replace") for part in parts if part.strip()]
+
+    def flush(self) -> List[str]:
+        rest = bytes(self._pending)
+        self._pending = bytearray()
+        return [rest.decode("utf-8", errors="replace")] if rest.strip() else []
+
+
+def emit_lines(on_output: OutputCallback, stream: str, lines: List[str]) -> None:
+    """Pass lines to a streaming callback; a failing callback never breaks the command."""
+    for line in lines:
+        try:
+            on_output(stream, line)
+        except Exception as e:
+            logger.debug(f"Output callback failed: {str(e)}")
+
+
+def stream_process_output(
+    process: subprocess.Popen,
+    on_output: Optional[OutputCallback] = None,
+    timeout: Optional[float] = None,
+    limits: Optional[OutputLimits] = None,
+) -> Tuple[str, str]:
+    """Read a process's stdout/stderr pipes until EOF, emitting lines as they arrive when
+    `on_output` is given.
+
+    Returns stdout and stderr as captured within `limits`. Raises
+    subprocess.TimeoutExpired, carrying the output read so far, when the deadline
+    passes; the caller is responsible for killing the process.
+    """
+    names = {process.stdout.fileno(): "stdout", process.stderr.fileno(): "stderr"}
+    outputs = {fd: BoundedOutput(name, limits) for fd, name in names.items()}
+    line_buffers = {fd: LineBuffer() for fd in names}
+    deadline = time.monotonic() + timeout if timeout else None
+    stdout_fd, stderr_fd = process.stdout.fileno(), process.stderr.fileno()
+
+    with selectors.DefaultSelector() as selector:
+        for fd in names:
+            selector.register(fd, selectors.EVENT_READ)
+        while selector.get_map():
+            remaining = None
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    for output in outputs.values():
+                        output.close()
+                    raise subprocess.TimeoutExpired(
+                        process.args, timeout,
+                        output=outputs[stdout_fd].getvalue(),
+                        stderr=outputs[stderr_fd].getvalue(),
+                    )
+            for key, _ in selector.select(remaining):
+                chunk = os.read(key.fd, 65536)
+                if not chunk:
+                    selector.unregister(key.fd)
+                    data = outputs[key.fd].close()
+                    if on_output is not None:
+                        lines = line_buffers[key.fd].feed(data) + line_buffers[key.fd].flush()
+                        emit_lines(on_output, names[key.fd], lines)
+                    continue
+                data = outputs[key.fd].write(chunk)
+                if on_output is not None:
+                    emit_lines(on_output, names[key.fd], line_buffers[key.fd].feed(data))
+
+    return outputs[stdout_fd].getvalue(), outputs[stderr_fd].getvalue()
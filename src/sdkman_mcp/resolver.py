@@ -0,0 +1,275 @@
+"""
+Version Resolver Module
+
+This module parses SDKMAN version identifiers (`21.0.2-tem`, `17.0.10-graal`, `8.6`)
+into comparable keys and resolves constraints such as `java@21 vendor=tem`,
+`gradle@^8` or `latest-lts` to the best matching version in one step.
+
+Versions are kept sorted by key, overall and per dist, so a constraint is answered by
+a binary search for its upper bound followed by a short walk down to the first
+version that passes the remaining filters.
+"""
+
+import bisect
+import re
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from .version_index import VersionRecord
+
+# 比较时版本号至少补齐到三段，使 21 与 21.0.0 相等
+_MIN_PARTS = 3
+_TOKEN = re.compile(r"\d+|[A-Za-z]+")
+_NUMERIC = re.compile(r"\d+(?:\.\d+)*")
+_COMPARISON = re.compile(r"(>=|<=|>|<|=)?\s*(\d+(?:\.\d+)*)")
+
+# 出现这些标记的版本视为预发布版本，默认不参与解析
+PRERELEASE_TAGS = {
+    "ea", "alpha", "a", "beta", "b", "rc", "cr", "m", "milestone", "snapshot", "dev",
+    "preview", "pre",
+}
+# 同一版本号有多个供应商时优先选择 SDKMAN 的默认 Java 发行版
+PREFERRED_DIST = "tem"
+
+Numbers = Tuple[int, ...]
+
+
+def _pad(numbers: Iterable[int]) -> Numbers:
+    numbers = tuple(numbers)
+    return numbers + (0,) * (_MIN_PARTS - len(numbers))
+
+
+class VersionKey(NamedTuple):
+    """Sortable form of a version: numeric release parts, then whether it is a final
+    release, then whether it is the plain build rather than a variant (e.g. `.fx`)."""
+
+    numbers: Numbers
+    final: bool
+    plain: bool
+    qualifiers: Tuple[Tuple[int, int, str], ...]
+
+
+def version_key(version: str) -> VersionKey:
+    """Parse a version or identifier such as `21.0.2`, `23.ea.10` or `8.6-rc-1`."""
+    tokens = _TOKEN.findall(version)
+    position = 0
+    numbers = []
+    while position < len(tokens) and tokens[position].isdigit():
+        numbers.append(int(tokens[position]))
+        position += 1
+    rest = tokens[position:]
+    prerelease = any(token.lower() in PRERELEASE_TAGS for token in rest if not token.isdigit())
+    qualifiers = tuple(
+        (0, int(token), "") if token.isdigit() else (1, 0, token.lower()) for token in rest
+    )
+    return VersionKey(_pad(numbers), not prerelease, prerelease or not rest, qualifiers)
+
+
+def is_java_lts(major: int) -> bool:
+    """Whether a Java feature release is LTS: 8, 11, then every fourth from 17."""
+    return major in (8, 11) or (major >= 17 and (major - 17) % 4 == 0)
+
+
+class Constraint(NamedTuple):
+    """A parsed version constraint; `low` is inclusive and `high` exclusive."""
+
+    candidate: Optional[str]
+    low: Optional[Numbers] = None
+    high: Optional[Numbers] = None
+    exact: Optional[str] = None
+    vendor: Optional[str] = None
+    installed: Optional[bool] = None
+    prerelease: bool = False
+    lts: bool = False
+
+
+def _numbers(text: str) -> Numbers:
+    return tuple(int(part) for part in text.split("."))
+
+
+def _bump(numbers: Numbers, position: int) -> Numbers:
+    """The first version after every version starting with numbers[:position + 1]."""
+    return numbers[:position] + (numbers[position] + 1,)
+
+
+def _parse_range(text: str) -> Dict[str, object]:
+    text = text.strip()
+    if text in ("", "*", "latest"):
+        return {}
+    if text in ("lts", "latest-lts"):
+        return {"lts": True}
+    if text[0] in "^~" and _NUMERIC.fullmatch(text[1:]):
+        numbers = _numbers(text[1:])
+        if text[0] == "^":
+            # ^8 -> >=8 <9；^0.9 -> >=0.9 <0.10
+            position = next((i for i, n in enumerate(numbers) if n), len(numbers) - 1)
+        else:
+            # ~21.0 -> >=21.0 <21.1；~21 -> >=21 <22
+            position = min(1, len(numbers) - 1)
+        return {"low": _pad(numbers), "high": _pad(_bump(numbers, position))}
+    if _NUMERIC.fullmatch(text):
+        # 21 -> 21.x；21.0.2 -> 21.0.2 本身（及其变体）
+        numbers = _numbers(text)
+        return {"low": _pad(numbers), "high": _pad(_bump(numbers, len(numbers) - 1))}
+    parts = [part for part in re.split(r"[,\s]+", text) if part]
+    if parts and all(_COMPARISON.fullmatch(part) for part in parts):
+        low: Optional[Numbers] = None
+        high: Optional[Numbers] = None
+        for part in parts:
+            operator, value = _COMPARISON.fullmatch(part).groups()  # type: ignore[union-attr]
+            numbers = _numbers(value)
+            if operator in (None, "="):
+                bound_low, bound_high = _pad(numbers), _pad(_bump(numbers, len(numbers) - 1))
+            elif operator == ">=":
+                bound_low, bound_high = _pad(numbers), None
+            elif operator == ">":
+                bound_low, bound_high = _pad(_bump(numbers, len(numbers) - 1)), None
+            elif operator == "<":
+                bound_low, bound_high = None, _pad(numbers)
+            else:
+                bound_low, bound_high = None, _pad(_bump(numbers, len(numbers) - 1))
+            if bound_low is not None and (low is None or bound_low > low):
+                low = bound_low
+            if bound_high is not None and (high is None or bound_high < high):
+                high = bound_high
+        return {"low": low, "high": high}
+    # 其余写法视为完整标识符，例如 21.0.2-tem
+    return {"exact": text}
+
+
+def parse_constraint(spec: str) -> Constraint:
+    """Parse a constraint such as `java@21 vendor=tem`, `gradle@^8`, `kotlin`,
+    `java@>=17,<22 installed=true` or `latest-lts`.
+
+    The first word is `candidate[@range]`; the range is `latest`, `latest-lts`, a version
+    prefix (`21`, `21.0`), `^X`, `~X.Y`, comparisons (`>=17,<22`) or an exact
+    identifier. Further words are `vendor=` (or `dist=`), `installed=` and
+    `prerelease=` filters. `latest-lts` on its own means Java.
+    Raises ValueError for a malformed constraint.
+    """
+    words = spec.split()
+    if not words:
+        raise ValueError("Empty version constraint")
+    fields: Dict[str, object] = {}
+    candidate: Optional[str] = None
+    head = words[0]
+    if "=" not in head or "@" in head:
+        words = words[1:]
+        name, _, version_range = head.partition("@")
+        if name in ("latest-lts", "lts") and not version_range:
+            name, version_range = "java", name
+        candidate = name.lower() or None
+        fields.update(_parse_range(version_range))
+
+    for word in words:
+        key, sep, value = word.partition("=")
+        key = key.lower()
+        if not sep or not value:
+            raise ValueError(f"Expected key=value, got {word!r}")
+        if key in ("vendor", "dist"):
+            fields["vendor"] = value
+        elif key in ("installed", "prerelease"):
+            if value.lower() not in ("true", "false", "yes", "no", "1", "0"):
+                raise ValueError(f"{key} must be true or false, got {value!r}")
+            fields[key] = value.lower() in ("true", "yes", "1")
+        elif key == "version":
+            fields.update(_parse_range(value))
+        else:
+            raise ValueError(f"Unknown constraint {key!r}")
+
+    if candidate is None:
+        raise ValueError("The constraint does not name a candidate, e.g. java@21")
+    if fields.get("lts") and candidate != "java":
+        raise ValueError("latest-lts is only defined for java")
+    return Constraint(candidate=candidate, **fields)  # type: ignore[arg-type]
+
+
+class _SortedVersions:
+    __slots__ = ("keys", "numbers", "records")
+
+    def __init__(self, entries: List[Tuple[tuple, VersionRecord]]):
+        entries.sort(key=lambda entry: entry[0])
+        self.keys: List[tuple] = [entry[0] for entry in entries]
+        self.numbers: List[Numbers] = [key[0] for key in self.keys]
+        self.records: List[VersionRecord] = [entry[1] for entry in entries]
+
+
+class VersionResolver:
+    """Resolves constraints against the versions of one candidate."""
+
+    def __init__(self, records: Iterable[VersionRecord]):
+        everything: List[Tuple[tuple, VersionRecord]] = []
+        by_dist: Dict[str, List[Tuple[tuple, VersionRecord]]] = {}
+        self._dists_of_vendor: Dict[str, set] = {}
+        self._records: List[VersionRecord] = []
+        for position, record in enumerate(records):
+            self._records.append(record)
+            if record.status == "local only":
+                # 本地版本的名称由用户随意指定，只参与精确匹配
+                continue
+            key = version_key(record.version or record.identifier)
+            # 版本相同时：正式版 > 非变体 > 已安装 > 默认发行版 > 列表中靠前
+            sort_key = (key.numbers, key.final, key.plain, record.installed,
+                        record.dist == PREFERRED_DIST, -position)
+            everything.append((sort_key, record))
+            by_dist.setdefault(record.dist.lower(), []).append((sort_key, record))
+            if record.vendor:
+                self._dists_of_vendor.setdefault(record.vendor.lower(), set()).add(
+                    record.dist.lower()
+                )
+        self._all = _SortedVersions(everything)
+        self._by_dist = {dist: _SortedVersions(entries) for dist, entries in by_dist.items()}
+
+    def _lists(self, vendor: Optional[str]) -> List[_SortedVersions]:
+        if not vendor:
+            return [self._all]
+        vendor = vendor.lower()
+        dists = {vendor} | self._dists_of_vendor.get(vendor, set())
+        return [self._by_dist[dist] for dist in sorted(dists) if dist in self._by_dist]
+
+    @staticmethod
+    def _accepts(constraint: Constraint, sort_key: tuple, record: VersionRecord) -> bool:
+        numbers, final = sort_key[0], sort_key[1]
+        if not constraint.prerelease and not final:
+            return False
+        if constraint.installed is not None and record.installed != constraint.installed:
+            return False
+        if constraint.lts and not is_java_lts(numbers[0]):
+            return False
+        return True
+
+    def matches(self, constraint: Constraint, limit: int = 5) -> List[VersionRecord]:
+        """Return up to `limit` versions satisfying the constraint, best first."""
+        if constraint.exact is not None:
+            exact = [
+                record for record in self._records
+                if constraint.exact in (record.identifier, record.version)
+                and (not constraint.vendor
+                     or constraint.vendor.lower() in (record.dist.lower(), record.vendor.lower()))
+            ]
+            return exact[:limit]
+
+        found: List[Tuple[tuple, VersionRecord]] = []
+        for versions in self._lists(constraint.vendor):
+            # 二分定位上界，再向下找到满足其余条件的版本
+            position = (
+                bisect.bisect_left(versions.numbers, constraint.high)
+                if constraint.high is not None else len(versions.numbers)
+            )
+            taken = 0
+            while position > 0 and taken < limit:
+                position -= 1
+                numbers = versions.numbers[position]
+                if constraint.low is not None and numbers < constraint.low:
+                    break
+                record = versions.records[position]
+                sort_key = versions.keys[position]
+                if self._accepts(constraint, sort_key, record):
+                    found.append((sort_key, record))
+                    taken += 1
+        found.sort(key=lambda entry: entry[0], reverse=True)
+        return [record for _, record in found[:limit]]
+
+    def resolve(self, constraint: Constraint) -> Optional[VersionRecord]:
+        """Return the best version satisfying the constraint, or None."""
+        matches = self.matches(constraint, limit=1)
+        return matches[0] if matches else None
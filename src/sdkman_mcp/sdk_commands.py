@@ -4,11 +4,46 @@ SDK Command Executor Module
 This module provides functions to execute various SDKMAN commands through subprocess.
 """
 
+import atexit
+import contextvars
+import functools
+import hashlib
+import io
+import shlex
 import subprocess
 import logging
 import json
 import os
-from typing import Dict, List, Optional, Any, Union, Tuple
+import platform
+import signal
+import threading
+import time
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing, contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Any, Set, Union, Tuple
+
+from .archive_cache import ArchiveCache, ArchiveCacheError, archive_key
+from .jobs import JobHandle, JobQueue
+from .cache import TTLCache
+from .dedup import DEFAULT_MIN_SIZE, METHODS as DEDUP_METHODS, DedupIndex, Deduplicator
+from .disk_usage import DiskUsageScanner
+from .environment import EnvironmentResolver, SdkEnvironmentError, export_lines
+from .locks import LockManager, LockTimeout
+from .metrics import metrics
+from .output import (
+    FORMATS as OUTPUT_FORMATS, OutputFilter, OutputLimits, render_candidates, render_current,
+    render_versions
+)
+from .progress import OutputCallback, stream_process_output
+from .resolver import VersionResolver, parse_constraint, version_key
+from .singleflight import SingleFlight
+from .sdkmanrc import SDKMANRC, iter_sdkmanrc, read_sdkmanrc
+from .snapshot import MetadataSnapshot, SnapshotEntry
+from .version_index import VersionIndex
+from .watcher import ChangeCallback, SdkmanWatcher
+from .worker_pool import BashWorkerPool, WorkerStartupError
 
 logger = logging.getLogger(__name__)
 
@@ -18,55 +53,1093 @@ logger = logging.getLogger(__name__)
 SDKMAN_DIR = os.environ.get("SDKMAN_DIR", os.path.expanduser("~/.sdkman"))
 SDK_INIT_PATH = os.path.join(SDKMAN_DIR, "bin/sdkman-init.sh")
 SDK_COMMAND = SDK_INIT_PATH
+SDKMAN_CANDIDATES_DIR = os.path.join(SDKMAN_DIR, "candidates")
+
+# current/home 等只读查询直接读取 candidates 目录，SDKMAN_MCP_NATIVE_READS=0 时总是走 shell
+NATIVE_READS = os.environ.get("SDKMAN_MCP_NATIVE_READS", "1") != "0"
+
+# 常驻 bash worker 池配置，SDKMAN_MCP_POOL_SIZE=0 时退回每次启动新 shell
+WORKER_POOL_SIZE = int(os.environ.get("SDKMAN_MCP_POOL_SIZE", "2"))
+WORKER_MAX_COMMANDS = int(os.environ.get("SDKMAN_MCP_WORKER_MAX_COMMANDS", "200"))
+WORKER_HEALTH_CHECK_INTERVAL = float(os.environ.get("SDKMAN_MCP_HEALTH_CHECK_INTERVAL", "30"))
+COMMAND_TIMEOUT = float(os.environ.get("SDKMAN_MCP_COMMAND_TIMEOUT", "1800")) or None
+
+# 下载/安装类命令耗时以分钟计，shell 启动开销可以忽略；让它们使用独立 shell，
+# 避免长时间占住常驻 worker 导致查询排队
+LONG_RUNNING_COMMANDS = {"install", "upgrade", "selfupdate", "update", "env"}
+
+# 只读命令在并发调用参数相同时共享同一次执行，SDKMAN_MCP_COALESCE=0 时关闭；
+# 修改状态的命令（install、uninstall、default、flush、selfupdate 等）永不合并
+COALESCE_COMMANDS = os.environ.get("SDKMAN_MCP_COALESCE", "1") != "0"
+READ_ONLY_COMMANDS = {"list", "current", "version", "home", "help"}
+
+# 命令调度锁：每个候选一把读写锁，外加一把全局锁；锁文件让共享 SDKMAN_DIR 的多个进程协同。
+# SDKMAN_MCP_LOCK_DIR 设为空字符串时只在进程内加锁
+LOCK_DIR = os.environ.get("SDKMAN_MCP_LOCK_DIR", os.path.join(SDKMAN_DIR, "var", "mcp-locks"))
+LOCK_TIMEOUT = float(os.environ.get("SDKMAN_MCP_LOCK_TIMEOUT", "1800")) or None
+# 改写整个 SDKMAN 的命令独占全局锁；安装类命令独占所属候选的锁。
+# 读命令不取候选锁：它们在查询并发额度内执行，若排在持续数分钟的安装之后，
+# 几个这样的读就会占满额度，拖住其他候选上的所有查询
+GLOBAL_EXCLUSIVE_COMMANDS = {"selfupdate", "flush", "update", "config"}
+CANDIDATE_WRITE_COMMANDS = {"install", "uninstall", "default", "upgrade"}
+
+# SDK 归档缓存，SDKMAN_MCP_ARCHIVE_CACHE_DIR 设为空字符串时关闭
+ARCHIVE_CACHE_DIR = os.environ.get(
+    "SDKMAN_MCP_ARCHIVE_CACHE_DIR", os.path.expanduser("~/.cache/sdkman-mcp/archives")
+)
+ARCHIVE_CACHE_MAX_BYTES = int(
+    os.environ.get("SDKMAN_MCP_ARCHIVE_CACHE_MAX_BYTES", str(10 * 1024 ** 3))
+)
+SDKMAN_CANDIDATES_API = os.environ.get("SDKMAN_CANDIDATES_API", "https://api.sdkman.io/2")
+
+# sdk list 结果缓存，SDKMAN_MCP_LIST_CACHE_TTL=0 时关闭
+LIST_CACHE_TTL = float(os.environ.get("SDKMAN_MCP_LIST_CACHE_TTL", "300"))
+LIST_CACHE_SIZE = int(os.environ.get("SDKMAN_MCP_LIST_CACHE_SIZE", "64"))
+
+# sdk list 输出的磁盘快照，SDKMAN_MCP_SNAPSHOT_PATH 设为空字符串时关闭
+SNAPSHOT_PATH = os.environ.get(
+    "SDKMAN_MCP_SNAPSHOT_PATH", os.path.expanduser("~/.cache/sdkman-mcp/metadata.sqlite")
+)
+# 超过此时长未确认的快照不再直接使用，先尝试重新获取
+SNAPSHOT_MAX_AGE = float(os.environ.get("SDKMAN_MCP_SNAPSHOT_MAX_AGE", "86400"))
+# 后台增量刷新间隔，0 表示不在后台刷新
+SNAPSHOT_REFRESH_INTERVAL = float(os.environ.get("SDKMAN_MCP_SNAPSHOT_REFRESH_INTERVAL", "3600"))
+METADATA_FETCH_TIMEOUT = 10
+
+# 监视 SDKMAN 目录，在服务器之外执行的 sdk 命令改变安装状态时清除缓存：
+# auto（优先 inotify，否则轮询）、inotify、poll 或 off
+WATCH_MODE = os.environ.get("SDKMAN_MCP_WATCH", "auto").lower()
+WATCH_INTERVAL = float(os.environ.get("SDKMAN_MCP_WATCH_INTERVAL", "2"))
+
+# 后台任务日志，SDKMAN_MCP_JOB_JOURNAL 设为空字符串时只保存在内存中，重启后丢失
+JOB_JOURNAL_PATH = os.environ.get(
+    "SDKMAN_MCP_JOB_JOURNAL", os.path.expanduser("~/.cache/sdkman-mcp/jobs.sqlite")
+)
+JOB_WORKERS = int(os.environ.get("SDKMAN_MCP_JOB_WORKERS", "2"))
+# 已结束的任务在日志中保留的秒数
+JOB_RETENTION = float(os.environ.get("SDKMAN_MCP_JOB_RETENTION", str(7 * 86400)))
+
+# 已安装版本间相同文件的去重：哈希索引路径（为空时每次都重新哈希）、方式与最小文件大小
+DEDUP_INDEX_PATH = os.environ.get(
+    "SDKMAN_MCP_DEDUP_INDEX", os.path.expanduser("~/.cache/sdkman-mcp/dedup.sqlite")
+)
+DEDUP_METHOD = os.environ.get("SDKMAN_MCP_DEDUP_METHOD", "auto").lower()
+DEDUP_MIN_SIZE = int(os.environ.get("SDKMAN_MCP_DEDUP_MIN_SIZE", str(DEFAULT_MIN_SIZE)))
+# 为 1 时每次安装成功后对该候选去重
+DEDUP_AFTER_INSTALL = os.environ.get("SDKMAN_MCP_DEDUP_AFTER_INSTALL", "0") != "0"
+
+# 命令输出：每个流保留的最大字节数（0 不限）、超出时完整输出的溢出目录（为空时丢弃中间部分），
+# 以及是否流式过滤 ANSI 转义序列、行尾空白与连续空行
+OUTPUT_MAX_BYTES = int(os.environ.get("SDKMAN_MCP_OUTPUT_MAX_BYTES", str(1024 ** 2)))
+OUTPUT_SPILL_DIR = os.environ.get(
+    "SDKMAN_MCP_OUTPUT_SPILL_DIR", os.path.expanduser("~/.cache/sdkman-mcp/output")
+)
+OUTPUT_STRIP = os.environ.get("SDKMAN_MCP_OUTPUT_STRIP", "1") != "0"
+OUTPUT_LIMITS = OutputLimits(OUTPUT_MAX_BYTES, OUTPUT_SPILL_DIR or None, OUTPUT_STRIP)
 
-# 检查SDKMAN初始化脚本是否存在
-if not os.path.isfile(os.path.expanduser(SDK_COMMAND)):
-    logger.warning(f"SDKMAN initialization script not found at {SDK_COMMAND}")
+# 多租户：工具的 root 参数可选的命名根目录，格式 "name=/path/to/.sdkman,other=/path"
+ROOTS: Dict[str, str] = {
+    name.strip(): os.path.expanduser(path.strip())
+    for name, sep, path in (
+        item.partition("=") for item in os.environ.get("SDKMAN_MCP_ROOTS", "").split(",")
+    )
+    if sep and name.strip() and path.strip()
+}
+# 默认 root 参数只接受 SDKMAN_MCP_ROOTS 中的名称；任意目录中的 sdkman-init.sh 会被
+# source 执行，为 1 时才允许客户端传入目录
+ALLOW_ROOT_PATHS = os.environ.get("SDKMAN_MCP_ALLOW_ROOT_PATHS", "0") == "1"
 
-def _run_command(cmd: List[str]) -> Tuple[int, str, str]:
-    """Run a command and return stdout, stderr and exit code."""
+# 当前线程启动一次性 shell 时的回调，后台任务借此在取消时结束进程
+_process_hooks = threading.local()
+
+
+def _root_path(path: str, key: str) -> str:
+    """Derive a per-root file name from a default one, e.g. jobs.sqlite -> jobs-<hash>.sqlite."""
+    base, ext = os.path.splitext(path)
+    return f"{base}-{hashlib.sha256(key.encode('utf-8')).hexdigest()[:12]}{ext}"
+
+
+class SdkmanRoot:
+    """One SDKMAN installation and everything the server keeps for it.
+
+    Each root has its own list caches, warm worker pool, command locks, metadata
+    snapshot, job queue and watcher, so commands for one root never queue behind
+    another root's workers or see its cached listings. Only the paths are set up
+    front; the rest is created on first use.
+    """
+
+    def __init__(self, name: str, sdkman_dir: str, default: bool = False):
+        self.name = name
+        self.sdkman_dir = sdkman_dir
+        self.default = default
+        self.key = sdkman_dir if default else os.path.realpath(sdkman_dir)
+        self.sdk_command = (
+            SDK_COMMAND if default else os.path.join(sdkman_dir, "bin", "sdkman-init.sh")
+        )
+        self.candidates_dir = SDKMAN_CANDIDATES_DIR if default else os.path.join(
+            sdkman_dir, "candidates"
+        )
+        # shell 会继承服务器的 SDKMAN_DIR，其他根目录需要覆盖
+        self.env: Optional[Dict[str, str]] = None if default else dict(
+            os.environ, SDKMAN_DIR=sdkman_dir, SDKMAN_CANDIDATES_DIR=self.candidates_dir
+        )
+        # 键为候选名称，"" 表示 `sdk list` 本身
+        self.list_cache: TTLCache[Dict[str, Any]] = TTLCache(
+            maxsize=LIST_CACHE_SIZE, ttl=LIST_CACHE_TTL
+        )
+        # 每个候选的版本索引，连同构建它的原始输出一起缓存
+        self.index_cache: TTLCache[Tuple[str, VersionIndex]] = TTLCache(
+            maxsize=LIST_CACHE_SIZE, ttl=LIST_CACHE_TTL
+        )
+        # 每个候选的版本解析器，连同构建它的版本索引一起缓存
+        self.resolver_cache: TTLCache[Tuple[VersionIndex, VersionResolver]] = TTLCache(
+            maxsize=LIST_CACHE_SIZE, ttl=LIST_CACHE_TTL
+        )
+        self.inflight: SingleFlight[Tuple[int, str, str]] = SingleFlight()
+        # 每次缓存失效后递增，失效前发起的只读命令不会再被新的调用者共享
+        self.generation = 0
+        # 导入时不访问文件系统，首次执行命令时才检查 SDKMAN 是否安装
+        self.checked = False
+        self.snapshot: Optional[MetadataSnapshot] = None
+        if SNAPSHOT_PATH:
+            self.snapshot = MetadataSnapshot(
+                SNAPSHOT_PATH if default else _root_path(SNAPSHOT_PATH, self.key)
+            )
+        self.worker_pool: Optional[BashWorkerPool] = None
+        self.lock_manager: Optional[LockManager] = None
+        self.job_queue: Optional[JobQueue] = None
+        self.watcher: Optional[SdkmanWatcher] = None
+        self._lock = threading.Lock()
+
+    def get_lock_manager(self) -> LockManager:
+        """Return the root's lock manager, creating the lock directory on first use."""
+        with self._lock:
+            if self.lock_manager is None:
+                lock_dir = LOCK_DIR or None
+                if lock_dir and not self.default:
+                    # 默认锁目录在 SDKMAN_DIR 内；显式配置的锁目录按根目录分开
+                    lock_dir = (
+                        _root_path(LOCK_DIR, self.key) if "SDKMAN_MCP_LOCK_DIR" in os.environ
+                        else os.path.join(self.sdkman_dir, "var", "mcp-locks")
+                    )
+                self.lock_manager = LockManager(lock_dir, LOCK_TIMEOUT)
+            return self.lock_manager
+
+    def get_worker_pool(self) -> Optional[BashWorkerPool]:
+        """Return the root's worker pool, creating it on first use."""
+        if WORKER_POOL_SIZE <= 0:
+            return None
+        with self._lock:
+            if self.worker_pool is None:
+                self.worker_pool = BashWorkerPool(
+                    self.sdk_command,
+                    size=WORKER_POOL_SIZE,
+                    max_commands=WORKER_MAX_COMMANDS,
+                    command_timeout=COMMAND_TIMEOUT,
+                    health_check_interval=WORKER_HEALTH_CHECK_INTERVAL,
+                    env=self.env,
+                    limits=OUTPUT_LIMITS,
+                )
+                atexit.register(self.worker_pool.close)
+            return self.worker_pool
+
+    def get_job_queue(self) -> JobQueue:
+        """Return the root's job queue, resuming unfinished journalled jobs on first use."""
+        with self._lock:
+            if self.job_queue is None:
+                path = JOB_JOURNAL_PATH
+                if path and not self.default:
+                    path = _root_path(path, self.key)
+                self.job_queue = JobQueue(
+                    functools.partial(_run_job, self), path or None, JOB_WORKERS, JOB_RETENTION
+                )
+                atexit.register(self.job_queue.close)
+        self.job_queue.start()
+        return self.job_queue
+
+    def close(self) -> None:
+        """Stop the root's watcher, job queue and workers."""
+        if self.watcher is not None:
+            self.watcher.stop()
+        if self.job_queue is not None:
+            self.job_queue.close()
+        if self.worker_pool is not None:
+            self.worker_pool.close()
+
+
+_default_root = SdkmanRoot("default", SDKMAN_DIR, default=True)
+# 其他根目录，键为真实路径
+_roots: Dict[str, SdkmanRoot] = {}
+_roots_lock = threading.Lock()
+_current_root: "contextvars.ContextVar[Optional[SdkmanRoot]]" = contextvars.ContextVar(
+    "sdkman_root", default=None
+)
+# 后台工作启动后，新出现的根目录也随之启动各自的任务队列与监视
+_background: Set[str] = set()
+
+
+def get_root(root: Optional[str] = None) -> SdkmanRoot:
+    """Return the SDKMAN root for a profile name from SDKMAN_MCP_ROOTS or a directory.
+
+    None, "" and "default" mean SDKMAN_DIR. Directories are accepted only with
+    SDKMAN_MCP_ALLOW_ROOT_PATHS=1, since their init script is run. Raises ValueError for
+    an unknown profile, for a directory when they are not accepted, or for a directory
+    that is not an SDKMAN installation.
+    """
+    if not root or root == "default":
+        return _default_root
+    if root in ROOTS:
+        path = ROOTS[root]
+    elif ALLOW_ROOT_PATHS and os.path.isabs(os.path.expanduser(root)):
+        path = os.path.expanduser(root)
+    else:
+        configured = ", ".join(sorted(ROOTS)) or "none"
+        raise ValueError(f"Unknown SDKMAN root {root!r} (configured roots: {configured})")
+
+    key = os.path.realpath(path)
+    with _roots_lock:
+        selected = _roots.get(key)
+        if selected is None:
+            if key == os.path.realpath(SDKMAN_DIR):
+                selected = _default_root
+            elif not os.path.isfile(os.path.join(key, "bin", "sdkman-init.sh")):
+                raise ValueError(f"{path} is not an SDKMAN installation (no bin/sdkman-init.sh)")
+            else:
+                selected = SdkmanRoot(root, path)
+            _roots[key] = selected
+            created = selected is not _default_root
+        else:
+            created = False
+    if created:
+        if "jobs" in _background:
+            _start_job_queue(selected)
+        if "watcher" in _background:
+            _start_watcher(selected)
+    return selected
+
+
+def current_root() -> SdkmanRoot:
+    """Return the root selected with use_root, or the default root."""
+    return _current_root.get() or _default_root
+
+
+@contextmanager
+def use_root(root: Union[None, str, SdkmanRoot]) -> Iterator[SdkmanRoot]:
+    """Run the sdk_* functions called inside the block against another SDKMAN root.
+
+    The selection follows the context, so it applies to the calling thread or task only.
+    """
+    selected = root if isinstance(root, SdkmanRoot) else get_root(root)
+    token = _current_root.set(selected)
+    try:
+        yield selected
+    finally:
+        _current_root.reset(token)
+
+
+def active_roots() -> List[SdkmanRoot]:
+    """Return the default root followed by every other root used so far."""
+    with _roots_lock:
+        others = [root for root in _roots.values() if root is not _default_root]
+    return [_default_root] + others
+
+
+def _configured_roots() -> List[SdkmanRoot]:
+    """Return the default root and the roots named in SDKMAN_MCP_ROOTS."""
+    roots = [_default_root]
+    for name in ROOTS:
+        try:
+            root = get_root(name)
+        except ValueError as e:
+            logger.warning(f"Skipping SDKMAN root {name}: {str(e)}")
+            continue
+        if root not in roots:
+            roots.append(root)
+    return roots
+
+
+def _bind_root(func: Callable[..., Any]) -> Callable[..., Any]:
+    """Bind func to the current root, for running it on another thread."""
+    root = current_root()
+
+    def run(*args: Any, **kwargs: Any) -> Any:
+        with use_root(root):
+            return func(*args, **kwargs)
+
+    return run
+
+
+def _check_sdkman_installation() -> None:
+    """Warn once per root, on its first command, when the SDKMAN init script is missing."""
+    root = current_root()
+    if root.checked:
+        return
+    root.checked = True
+    # 检查SDKMAN初始化脚本是否存在
+    if not os.path.isfile(os.path.expanduser(root.sdk_command)):
+        logger.warning(f"SDKMAN initialization script not found at {root.sdk_command}")
+
+
+def _get_lock_manager() -> LockManager:
+    """Return the lock manager of the current root."""
+    return current_root().get_lock_manager()
+
+
+def _get_worker_pool() -> Optional[BashWorkerPool]:
+    """Return the worker pool of the current root."""
+    return current_root().get_worker_pool()
+
+
+@contextmanager
+def _on_process_start(callback: Callable[[subprocess.Popen], Any]) -> Iterator[None]:
+    """Call callback with each one-shot shell this thread starts inside the block."""
+    previous = getattr(_process_hooks, "callback", None)
+    _process_hooks.callback = callback
+    try:
+        yield
+    finally:
+        _process_hooks.callback = previous
+
+
+def _kill_process_group(process: subprocess.Popen) -> None:
+    """Kill a one-shot shell together with the curl/unzip children it started."""
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except OSError:
+        process.kill()
+
+
+def _run_command_oneshot(
+    cmd: List[str],
+    timeout: Optional[float] = None,
+    on_output: Optional[OutputCallback] = None,
+    timings: Optional[Dict[str, float]] = None,
+) -> Tuple[int, str, str]:
+    """Run a command in a fresh shell that sources the init script first.
+
+    `timings` receives the seconds spent starting the shell ("spawn") and running the
+    rest, sourcing the init script included ("exec").
+    """
+    started = time.perf_counter()
     try:
         # 构建一个shell命令，先source初始化脚本，然后执行SDK命令
-        shell_cmd = f"source {SDK_COMMAND} && sdk {' '.join(cmd)}"
+        root = current_root()
+        args = " ".join(shlex.quote(arg) for arg in cmd)
+        shell_cmd = f"source {shlex.quote(root.sdk_command)} && sdk {args}"
         logger.debug(f"Running shell command: {shell_cmd}")
-        
+
         process = subprocess.Popen(
             shell_cmd,
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
-            text=True,
             shell=True,
-            executable="/bin/bash"  # 确保使用bash执行命令
+            executable="/bin/bash",  # 确保使用bash执行命令
+            env=root.env,
+            start_new_session=True  # 独立进程组，超时或取消时连同子进程一起结束
         )
-        stdout, stderr = process.communicate()
+        callback = getattr(_process_hooks, "callback", None)
+        if callback is not None:
+            callback(process)
+        if timings is not None:
+            timings["spawn"] = time.perf_counter() - started
+            started = time.perf_counter()
+        try:
+            stdout, stderr = stream_process_output(process, on_output, timeout, OUTPUT_LIMITS)
+            process.wait()
+        except subprocess.TimeoutExpired as e:
+            _kill_process_group(process)
+            process.wait()
+            return 124, e.output or "", e.stderr or f"Command timed out after {timeout}s"
+        finally:
+            process.stdout.close()
+            process.stderr.close()
         return process.returncode, stdout, stderr
     except Exception as e:
         logger.error(f"Error running command {cmd}: {str(e)}")
         return 1, "", str(e)
+    finally:
+        if timings is not None:
+            timings["exec"] = time.perf_counter() - started
 
-def sdk_list() -> Dict[str, Any]:
-    """List all available candidates in SDKMAN."""
-    returncode, stdout, stderr = _run_command(["list"])
-    
+
+def _run_command(
+    cmd: List[str], timeout: Optional[float] = None, on_output: Optional[OutputCallback] = None
+) -> Tuple[int, str, str]:
+    """Run a command and return stdout, stderr and exit code.
+
+    Commands go to a warm bash worker when the pool is enabled; long-running commands,
+    or any command when no worker can be started (e.g. the init script is missing),
+    use a one-shot shell instead. With `on_output`, output is also streamed line by
+    line (lines end at "\n" or "\r") while the command runs.
+
+    Concurrent calls of the same read-only command share a single execution.
+    """
+    _check_sdkman_installation()
+    timeout = timeout if timeout is not None else COMMAND_TIMEOUT
+    if COALESCE_COMMANDS and on_output is None and cmd and cmd[0] in READ_ONLY_COMMANDS:
+        root = current_root()
+        key = (root.generation, tuple(cmd), timeout)
+        result, shared = root.inflight.do(key, lambda: _execute_command(cmd, timeout, None))
+        if shared:
+            metrics.record_coalesced(cmd[0])
+        return result
+    return _execute_command(cmd, timeout, on_output)
+
+
+def _lock_scope(cmd: List[str]) -> Tuple[Optional[str], bool, bool]:
+    """Return (candidate, candidate exclusive, global exclusive) for a command.
+
+    Only mutating commands lock a candidate; every other command just shares the
+    global lock, so reads keep answering while an install holds its candidate.
+    """
+    name = cmd[0] if cmd else ""
+    candidate = cmd[1] if len(cmd) > 1 else None
+    if name in GLOBAL_EXCLUSIVE_COMMANDS:
+        return None, False, True
+    if name == "env":
+        # sdk env install 按 .sdkmanrc 安装任意候选
+        return None, False, candidate == "install"
+    if name in CANDIDATE_WRITE_COMMANDS:
+        # 不带候选的 upgrade 会升级所有候选
+        return (candidate, True, False) if candidate else (None, False, True)
+    return None, False, False
+
+
+def _execute_command(
+    cmd: List[str], timeout: Optional[float], on_output: Optional[OutputCallback]
+) -> Tuple[int, str, str]:
+    timings: Optional[Dict[str, float]] = {} if metrics.enabled else None
+    started = time.perf_counter()
+    result = None
+    mode = "pool"
+    candidate, exclusive, global_exclusive = _lock_scope(cmd)
+    try:
+        with _get_lock_manager().hold(candidate, exclusive, global_exclusive) as waited:
+            pool = _get_worker_pool() if cmd and cmd[0] not in LONG_RUNNING_COMMANDS else None
+            if pool is not None:
+                try:
+                    result = pool.run(cmd, timeout, on_output, timings)
+                except WorkerStartupError as e:
+                    logger.debug(f"Worker pool unavailable, using one-shot shell: {str(e)}")
+            if result is None:
+                mode = "oneshot"
+                if timings is not None:
+                    timings.clear()
+                result = _run_command_oneshot(cmd, timeout, on_output, timings)
+            if timings is not None:
+                timings["lock"] = waited
+    except LockTimeout as e:
+        logger.warning(f"Command {cmd} not run: {str(e)}")
+        result = (124, "", str(e))
+
+    if timings is not None:
+        returncode, stdout, stderr = result
+        metrics.record_command(
+            cmd[0] if cmd else "", mode, returncode, time.perf_counter() - started, timings,
+            len(stdout.encode("utf-8", "replace")), len(stderr.encode("utf-8", "replace"))
+        )
+    return result
+
+
+def _known_candidates() -> Optional[List[str]]:
+    """Read the candidate list SDKMAN caches in var/candidates, in SDKMAN's order."""
+    try:
+        with open(os.path.join(current_root().sdkman_dir, "var", "candidates"),
+                  encoding="utf-8") as f:
+            content = f.read().strip()
+    except OSError:
+        return None
+    return [name for name in content.split(",") if name] or None
+
+
+def _native_current_version(candidate: str) -> Optional[str]:
+    """Resolve candidates/<candidate>/current without starting a shell.
+
+    Returns the version name, "" when the candidate has no current version, or None
+    when the layout is not what SDKMAN normally creates and the shell should decide.
+    """
+    candidate_dir = os.path.join(current_root().candidates_dir, candidate)
+    try:
+        target = os.readlink(os.path.join(candidate_dir, "current"))
+    except FileNotFoundError:
+        # 候选目录不存在说明从未安装过
+        if os.path.isdir(candidate_dir) or not os.path.lexists(candidate_dir):
+            return ""
+        return None
+    except OSError:
+        # current 不是符号链接（例如被复制成了目录）
+        return None
+    version = os.path.basename(os.path.normpath(target))
+    if not version or not os.path.isdir(os.path.join(candidate_dir, version)):
+        return None
+    return version
+
+
+def _installed_versions(candidate: str) -> Optional[List[str]]:
+    """List the installed version directories of a candidate, or None if it has none."""
+    try:
+        with os.scandir(os.path.join(current_root().candidates_dir, candidate)) as entries:
+            return sorted(
+                entry.name for entry in entries
+                if entry.name != "current" and entry.is_dir(follow_symlinks=False)
+            )
+    except OSError:
+        return None
+
+
+def _native_current() -> Optional[str]:
+    """Build the `sdk current` output from the candidates directory."""
+    candidates = _known_candidates()
+    if candidates is None:
+        return None
+    lines = []
+    for candidate in candidates:
+        version = _native_current_version(candidate)
+        if version is None:
+            return None
+        if version:
+            lines.append(f"{candidate}: {version}")
+    if not lines:
+        return "\nNo candidates are in use\n"
+    return "\nUsing:\n\n" + "\n".join(lines) + "\n"
+
+
+def _native_current_candidate(candidate: str) -> Optional[str]:
+    """Build the `sdk current <candidate>` output from the candidates directory."""
+    candidates = _known_candidates()
+    if candidates is None or candidate not in candidates:
+        return None
+    version = _native_current_version(candidate)
+    if version is None:
+        return None
+    if not version:
+        return f"\nNot using any version of {candidate}\n"
+    return f"\nUsing {candidate} version {version}\n"
+
+
+def _native_home(candidate: str, version: str) -> Optional[str]:
+    """Return the installation directory when it exists; SDKMAN reports errors otherwise."""
+    if not version or os.sep in version or version in (".", ".."):
+        return None
+    home = os.path.join(current_root().candidates_dir, candidate, version)
+    return home if os.path.isdir(home) else None
+
+
+# 按目录 mtime 缓存的磁盘占用统计，以绝对路径为键，各根目录共用
+_disk_usage = DiskUsageScanner()
+
+# 按候选目录 mtime 记忆的环境变量计算结果，以候选目录路径为键，各根目录共用
+_environments = EnvironmentResolver()
+
+# 哈希索引以绝对路径为键，各根目录共用
+_dedup_index: Optional[DedupIndex] = DedupIndex(DEDUP_INDEX_PATH) if DEDUP_INDEX_PATH else None
+
+_archive_cache: Optional[ArchiveCache] = (
+    ArchiveCache(ARCHIVE_CACHE_DIR, ARCHIVE_CACHE_MAX_BYTES) if ARCHIVE_CACHE_DIR else None
+)
+
+
+def _sdkman_platform() -> str:
+    """Return the platform identifier SDKMAN uses in download URLs (e.g. linuxx64)."""
+    try:
+        with open(os.path.join(current_root().sdkman_dir, "var", "platform"),
+                  encoding="utf-8") as f:
+            value = f.read().strip()
+        if value:
+            return value
+    except OSError:
+        pass
+    system = platform.system().lower()
+    machine = platform.machine().lower()
+    arches = {"x86_64": "x64", "amd64": "x64", "aarch64": "arm64", "arm64": "arm64"}
+    arch = arches.get(machine, machine)
+    if system in ("linux", "darwin"):
+        return f"{system}{arch}"
+    return "exotic"
+
+
+def _sdkman_archive_path(candidate: str, version: str) -> str:
+    # SDKMAN 安装前若发现此文件已存在则不再下载
+    return os.path.join(current_root().sdkman_dir, "tmp", f"{candidate}-{version}.zip")
+
+
+def _stage_cached_archive(candidate: str, version: str) -> bool:
+    """Put a cached archive where `sdk install` looks before downloading."""
+    if _archive_cache is None:
+        return False
+    target = _sdkman_archive_path(candidate, version)
+    if os.path.exists(target):
+        return False
+    return _archive_cache.stage(archive_key(candidate, version, _sdkman_platform()), target)
+
+
+def _store_installed_archive(candidate: str, version: str) -> None:
+    """Add the archive SDKMAN just installed from to the cache."""
+    if _archive_cache is None:
+        return
+    source = _sdkman_archive_path(candidate, version)
+    if not os.path.isfile(source):
+        return
+    try:
+        _archive_cache.store(archive_key(candidate, version, _sdkman_platform()), source)
+    except OSError as e:
+        logger.warning(f"Failed to cache archive for {candidate} {version}: {str(e)}")
+
+
+def archive_cache_stats() -> Dict[str, Any]:
+    """Return usage statistics of the archive cache."""
+    if _archive_cache is None:
+        return {"enabled": False}
+    return dict(_archive_cache.stats(), enabled=True)
+
+
+_snapshot_refresher: Optional[threading.Thread] = None
+_snapshot_refresher_lock = threading.Lock()
+_snapshot_stop = threading.Event()
+
+# SDKMAN 离线（或无法访问 API）时 `sdk list` 只显示已安装版本，这样的输出不能写入快照
+_OFFLINE_MARKERS = ("Offline: only showing installed", "not available while offline")
+
+
+def _invalidate_list_cache(candidate: Optional[str] = None) -> None:
+    """Drop cached list output after a command that changes installed/default markers."""
+    root = current_root()
+    root.generation += 1
+    if candidate:
+        root.list_cache.invalidate(candidate)
+        root.index_cache.invalidate(candidate)
+        root.resolver_cache.invalidate(candidate)
+    else:
+        root.list_cache.clear()
+        root.index_cache.clear()
+        root.resolver_cache.clear()
+        # update/flush 等可能改变候选元数据，快照需要重新确认
+        if root.snapshot is not None:
+            root.snapshot.mark_dirty()
+
+
+def list_cache_stats() -> Dict[str, Any]:
+    """Return hit/miss counters of the `sdk list` cache."""
+    return current_root().list_cache.stats()
+
+
+def disk_usage_stats() -> Dict[str, Any]:
+    """Return the size and hit/miss counters of the disk usage cache."""
+    return _disk_usage.stats()
+
+
+def lock_stats() -> Dict[str, Any]:
+    """Return acquisition, contention and timeout counts of the command locks."""
+    return _get_lock_manager().stats()
+
+
+def coalescing_stats() -> Dict[str, Any]:
+    """Return how many read-only commands were executed and how many shared a run."""
+    return dict(current_root().inflight.stats(), enabled=COALESCE_COMMANDS)
+
+
+def _is_offline_listing(output: str) -> bool:
+    return any(marker in output for marker in _OFFLINE_MARKERS)
+
+
+def _local_state(candidate: str) -> str:
+    """Summarise the installed versions and current version of a candidate, the local
+    state `sdk list <candidate>` marks in its output ("" for the candidate list)."""
+    if not candidate:
+        return ""
+    installed = _installed_versions(candidate) or []
+    current = _native_current_version(candidate) or ""
+    return hashlib.sha256("\n".join(installed + [">" + current]).encode("utf-8")).hexdigest()[:16]
+
+
+def _remote_state(candidate: str) -> Optional[str]:
+    """Hash the version list SDKMAN's API publishes for a candidate ("" for the list of
+    candidates); None when the API cannot be reached."""
+    if candidate:
+        name = urllib.parse.quote(candidate, safe="")
+        url = f"{SDKMAN_CANDIDATES_API}/candidates/{name}/{_sdkman_platform()}/versions/all"
+    else:
+        url = f"{SDKMAN_CANDIDATES_API}/candidates/all"
+    try:
+        request = urllib.request.Request(url, headers={"User-Agent": "sdkman-mcp"})
+        with urllib.request.urlopen(request, timeout=METADATA_FETCH_TIMEOUT) as response:
+            body = response.read()
+    except (OSError, ValueError) as e:
+        logger.debug(f"Failed to fetch {url}: {str(e)}")
+        return None
+    return hashlib.sha256(body).hexdigest()[:16]
+
+
+def _snapshot_result(entry: SnapshotEntry, stale: bool) -> Dict[str, Any]:
+    return {
+        "success": True,
+        "data": entry.output,
+        "snapshot": {
+            "age_seconds": round(entry.age, 1),
+            "stale": stale
+        }
+    }
+
+
+def _list_output(candidate: str, error: str) -> Dict[str, Any]:
+    """Return `sdk list [candidate]` output from the list cache, a current snapshot
+    entry, or the shell, in that order.
+
+    A snapshot entry is current when it is younger than SNAPSHOT_MAX_AGE and was taken
+    with the same installed/current versions. When the shell cannot produce a full
+    listing, an outdated entry is returned with "stale" set instead of an error.
+    """
+    root = current_root()
+    cached = root.list_cache.get(candidate)
+    if cached is not None:
+        return dict(cached)
+
+    entry = root.snapshot.get(candidate) if root.snapshot is not None else None
+    local = _local_state(candidate)
+    if (entry is not None and not entry.dirty and entry.age <= SNAPSHOT_MAX_AGE
+            and entry.fingerprint.partition(":")[2] == local):
+        return _snapshot_result(entry, stale=False)
+
+    returncode, stdout, stderr = _run_command(["list", candidate] if candidate else ["list"])
+    if returncode == 0 and not _is_offline_listing(stdout):
+        if root.snapshot is not None:
+            # API 摘要留空，下次后台刷新时补上
+            root.snapshot.put(candidate, stdout, f":{local}")
+        result = {
+            "success": True,
+            "data": stdout
+        }
+        root.list_cache.set(candidate, result)
+        return dict(result)
+
+    if entry is not None:
+        logger.info(f"SDKMAN listing unavailable, serving snapshot of {candidate or 'candidates'}")
+        return _snapshot_result(entry, stale=True)
     if returncode != 0:
         return {
             "success": False,
-            "error": stderr or "Failed to list candidates"
+            "error": stderr or error
         }
-    
     return {
         "success": True,
         "data": stdout
     }
 
-def sdk_list_candidate(candidate: str) -> Dict[str, Any]:
-    """List versions of a specific candidate."""
-    returncode, stdout, stderr = _run_command(["list", candidate])
+
+def refresh_metadata_snapshot(candidates: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Bring snapshot entries up to date, re-listing only the candidates that changed.
+
+    Each candidate costs one small request for the version list SDKMAN's API publishes;
+    `sdk list` runs only when that list or the local install state differs from the
+    snapshot. Without `candidates`, every candidate in the snapshot is checked.
+    """
+    root = current_root()
+    snapshot = root.snapshot
+    if snapshot is None:
+        return {
+            "success": False,
+            "error": "Metadata snapshot is disabled (set SDKMAN_MCP_SNAPSHOT_PATH)"
+        }
+
+    started = time.perf_counter()
+    targets = list(dict.fromkeys(candidates)) if candidates else snapshot.candidates()
+    refreshed, unchanged, failed = [], [], []
+    for candidate in targets:
+        remote = _remote_state(candidate)
+        if remote is None:
+            failed.append(candidate)
+            continue
+        local = _local_state(candidate)
+        entry = snapshot.get(candidate)
+        if entry is not None and not entry.dirty:
+            entry_remote, _, entry_local = entry.fingerprint.partition(":")
+            # 摘要为空说明条目由 sdk list 刚写入，在一个刷新周期内直接采用当前摘要
+            adopt = not entry_remote and (
+                time.time() - entry.refreshed_at <= (SNAPSHOT_REFRESH_INTERVAL or 3600)
+            )
+            if entry_local == local and (entry_remote == remote or adopt):
+                snapshot.touch(candidate, f"{remote}:{local}")
+                unchanged.append(candidate)
+                continue
+
+        returncode, stdout, _ = _run_command(["list", candidate] if candidate else ["list"])
+        if returncode != 0 or _is_offline_listing(stdout):
+            failed.append(candidate)
+            continue
+        snapshot.put(candidate, stdout, f"{remote}:{local}")
+        root.list_cache.invalidate(candidate)
+        root.index_cache.invalidate(candidate)
+        refreshed.append(candidate)
+
+    summary = {
+        "checked": len(targets),
+        "refreshed": refreshed,
+        "unchanged": unchanged,
+        "failed": failed,
+        "elapsed_seconds": round(time.perf_counter() - started, 3)
+    }
+    if failed:
+        return {
+            "success": False,
+            "error": f"{len(failed)} of {len(targets)} snapshot entries could not be refreshed",
+            "data": summary
+        }
+
+    return {
+        "success": True,
+        "data": summary
+    }
+
+
+def _refresh_snapshot_loop() -> None:
+    # 启动后稍等片刻再刷新，先让服务器响应最初的请求
+    delay = min(SNAPSHOT_REFRESH_INTERVAL, 30)
+    while not _snapshot_stop.wait(delay):
+        delay = SNAPSHOT_REFRESH_INTERVAL
+        for root in active_roots():
+            if root.snapshot is None:
+                continue
+            try:
+                with use_root(root):
+                    result = refresh_metadata_snapshot()
+                logger.debug(f"Metadata snapshot refresh of {root.name}: {result.get('data')}")
+            except Exception as e:
+                logger.warning(f"Metadata snapshot refresh of {root.name} failed: {str(e)}")
+
+
+def start_snapshot_refresher() -> bool:
+    """Start refreshing the snapshot in the background every SNAPSHOT_REFRESH_INTERVAL
+    seconds; returns False when the snapshot or background refresh is disabled."""
+    global _snapshot_refresher
+    if not SNAPSHOT_PATH or SNAPSHOT_REFRESH_INTERVAL <= 0:
+        return False
+    with _snapshot_refresher_lock:
+        if _snapshot_refresher is None:
+            _snapshot_refresher = threading.Thread(
+                target=_refresh_snapshot_loop, name="sdkman-snapshot", daemon=True
+            )
+            _snapshot_refresher.start()
+            atexit.register(_snapshot_stop.set)
+    return True
+
+
+def snapshot_stats() -> Dict[str, Any]:
+    """Return the size and age of the metadata snapshot."""
+    snapshot = current_root().snapshot
+    if snapshot is None:
+        return {"enabled": False}
+    return dict(snapshot.stats(), enabled=True)
+
+
+_watcher_lock = threading.Lock()
+_change_listeners: List[ChangeCallback] = []
+
+
+def _on_sdkman_change(root: SdkmanRoot, candidates: Set[str], everything: bool) -> None:
+    """Invalidate a root's cached state after SDKMAN changed outside the server, then
+    notify the change listeners."""
+    scope = " and its configuration" if everything else ""
+    logger.debug(f"SDKMAN root {root.name} changed outside the server: {sorted(candidates)}{scope}")
+    with use_root(root):
+        if everything:
+            _invalidate_list_cache()
+        for candidate in candidates:
+            _invalidate_list_cache(candidate)
+    # 资源（sdkman://current 等）只反映默认根目录
+    if not root.default:
+        return
+    for listener in list(_change_listeners):
+        try:
+            listener(candidates, everything)
+        except Exception as e:
+            logger.warning(f"SDKMAN change listener failed: {str(e)}")
+
+
+def add_change_listener(listener: ChangeCallback) -> None:
+    """Call listener(candidates, everything) from the watcher thread whenever the default
+    root changes; `everything` is set when the configuration or candidate list changed."""
+    if listener not in _change_listeners:
+        _change_listeners.append(listener)
+
+
+def _start_watcher(root: SdkmanRoot) -> Optional[str]:
+    with _watcher_lock:
+        if root.watcher is None:
+            watcher = SdkmanWatcher(
+                root.sdkman_dir, functools.partial(_on_sdkman_change, root),
+                WATCH_MODE, WATCH_INTERVAL
+            )
+            try:
+                watcher.start()
+            except OSError as e:
+                logger.warning(f"Failed to watch {root.sdkman_dir}: {str(e)}")
+                return None
+            root.watcher = watcher
+            atexit.register(watcher.stop)
+    return root.watcher.backend
+
+
+def start_watcher() -> Optional[str]:
+    """Start watching SDKMAN_DIR and the configured roots for out-of-band changes, and
+    any other root when it is first used; returns the default root's backend, or None
+    when watching is disabled or failed."""
+    if WATCH_MODE in ("off", "0", ""):
+        return None
+    _background.add("watcher")
+    backends = [_start_watcher(root) for root in _configured_roots()]
+    return backends[0]
+
+
+def watcher_stats() -> Dict[str, Any]:
+    """Return the current root's watcher backend and how many changes it has reported."""
+    watcher = current_root().watcher
+    if watcher is None:
+        return {"enabled": False}
+    return dict(watcher.stats(), enabled=True)
+
+
+def _render(result: Dict[str, Any], render: Callable[[str], Any]) -> Dict[str, Any]:
+    """Replace the text of a successful result with what render makes of it."""
+    if result["success"]:
+        result = dict(result, data=render(result["data"]))
+    return result
+
+
+def _format_error(format: str) -> Optional[Dict[str, Any]]:
+    if format in OUTPUT_FORMATS:
+        return None
+    return {
+        "success": False,
+        "error": f"format must be one of {', '.join(OUTPUT_FORMATS)}"
+    }
+
+
+def sdk_list(format: str = "raw") -> Dict[str, Any]:
+    """List all available candidates in SDKMAN.
+
+    `format` is "raw" (the `sdk list` text), "compact" (a line of candidate and latest
+    version per candidate) or "json" (name, version and URL per candidate).
+    """
+    error = _format_error(format)
+    if error is not None:
+        return error
+    result = _list_output("", "Failed to list candidates")
+    if format == "raw":
+        return result
+    return _render(result, lambda text: render_candidates(text, format))
+
+
+def sdk_list_candidate(candidate: str, format: str = "raw") -> Dict[str, Any]:
+    """List versions of a specific candidate.
+
+    `format` is "raw" (the `sdk list <candidate>` table), "compact" (identifiers per
+    vendor, marking the current and installed ones) or "json" (current version,
+    installed identifiers and all identifiers).
+    """
+    error = _format_error(format)
+    if error is not None:
+        return error
+    result = _list_output(candidate, f"Failed to list versions for {candidate}")
+    if format == "raw":
+        return result
+    return _render(result, lambda text: render_versions(
+        candidate, _version_index_of(candidate, text), text, format
+    ))
+
+
+def sdk_current(format: str = "raw") -> Dict[str, Any]:
+    """Show the current version of all installed candidates.
+
+    `format` is "raw" (the `sdk current` text), "compact" (a line of candidate and
+    version per candidate in use) or "json" (candidate -> version).
+    """
+    error = _format_error(format)
+    if error is not None:
+        return error
+    output = _native_current() if NATIVE_READS else None
+    if output is not None:
+        result = {
+            "success": True,
+            "data": output
+        }
+    else:
+        returncode, stdout, stderr = _run_command(["current"])
+        if returncode != 0:
+            return {
+                "success": False,
+                "error": stderr or "Failed to get current versions"
+            }
+        result = {
+            "success": True,
+            "data": stdout
+        }
+    if format == "raw":
+        return result
+    return _render(result, lambda text: render_current(text, format))
+
+
+def sdk_current_candidate(candidate: str, format: str = "raw") -> Dict[str, Any]:
+    """Show the current version of a specific candidate.
+
+    `format` is "raw" (the `sdk current <candidate>` text), "compact" (the version, or
+    "none") or "json" (candidate and version, null when none is in use).
+    """
+    error = _format_error(format)
+    if error is not None:
+        return error
+    output = _native_current_candidate(candidate) if NATIVE_READS else None
+    if output is not None:
+        result = {
+            "success": True,
+            "data": output
+        }
+    else:
+        returncode, stdout, stderr = _run_command(["current", candidate])
+        if returncode != 0:
+            return {
+                "success": False,
+                "error": stderr or f"Failed to get current version of {candidate}"
+            }
+        result = {
+            "success": True,
+            "data": stdout
+        }
+    if format == "raw":
+        return result
+    return _render(result, lambda text: render_current(text, format, candidate))
+
+
+def sdk_install(candidate: str, version: Optional[str] = None, path: Optional[str] = None,
+                on_output: Optional[OutputCallback] = None) -> Dict[str, Any]:
+    """Install a candidate with the specified version or from a specific path.
+
+    `on_output` receives (stream, line) for each line of output while downloading.
+    """
+    cmd = ["install", candidate]
+    if version:
+        cmd.append(version)
+    if path:
+        cmd.append(path)
+
+    # 本地路径安装不需要归档
+    cached_archive = bool(version and not path) and _stage_cached_archive(candidate, version)
+    
+    returncode, stdout, stderr = _run_command(cmd, on_output=on_output)
+    _invalidate_list_cache(candidate)
+    if returncode == 0 and version and not path:
+        _store_installed_archive(candidate, version)
+    if cached_archive:
+        logger.info(f"Installed {candidate} {version} from the archive cache")
+    if returncode == 0 and DEDUP_AFTER_INSTALL:
+        dedup = sdk_dedup(candidate)
+        if dedup.get("data"):
+            logger.info(f"Deduplicated {candidate}: "
+                        f"{dedup['data']['bytes_reclaimed']} bytes reclaimed")
     
     if returncode != 0:
         return {
             "success": False,
-            "error": stderr or f"Failed to list versions for {candidate}"
+            "error": stderr or f"Failed to install {candidate}"
         }
     
     return {
@@ -74,14 +1147,138 @@ def sdk_list_candidate(candidate: str) -> Dict[str, Any]:
         "data": stdout
     }
 
-def sdk_current() -> Dict[str, Any]:
-    """Show the current version of all installed candidates."""
-    returncode, stdout, stderr = _run_command(["current"])
+
+def sdk_install_many(items: List[Tuple[str, Optional[str]]], max_parallel: int = 4) -> Dict[str, Any]:
+    """Install several (candidate, version) pairs in parallel.
+
+    Different candidates are installed concurrently, at most `max_parallel` at a time;
+    versions of the same candidate are installed one after another so SDKMAN never
+    writes to the same candidate directory twice at once.
+    """
+    # 去重并按候选分组，同一候选内保持提交顺序
+    order: Dict[Tuple[str, Optional[str]], int] = {}
+    groups: Dict[str, List[Optional[str]]] = {}
+    for candidate, version in items:
+        if (candidate, version) in order:
+            continue
+        order[(candidate, version)] = len(order)
+        groups.setdefault(candidate, []).append(version)
+
+    if not groups:
+        return {
+            "success": False,
+            "error": "No candidates to install"
+        }
+
+    def install_group(candidate: str, versions: List[Optional[str]]) -> List[Dict[str, Any]]:
+        results = []
+        for version in versions:
+            started = time.perf_counter()
+            result = sdk_install(candidate, version)
+            results.append({
+                "candidate": candidate,
+                "version": version,
+                "success": result["success"],
+                "output": result["data"] if result["success"] else result["error"],
+                "seconds": round(time.perf_counter() - started, 3)
+            })
+        return results
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, min(max_parallel, len(groups)))) as executor:
+        install = _bind_root(install_group)
+        futures = [executor.submit(install, c, v) for c, v in groups.items()]
+        results = [result for future in futures for result in future.result()]
+    elapsed = round(time.perf_counter() - started, 3)
+
+    # 按提交顺序返回结果
+    results.sort(key=lambda r: order[(r["candidate"], r["version"])])
+    failed = sum(1 for result in results if not result["success"])
+    summary = {
+        "results": results,
+        "installed": len(results) - failed,
+        "failed": failed,
+        "elapsed_seconds": elapsed
+    }
+    if failed:
+        return {
+            "success": False,
+            "error": f"{failed} of {len(results)} installs failed",
+            "data": summary
+        }
+
+    return {
+        "success": True,
+        "data": summary
+    }
+
+
+def sdk_prefetch(items: List[Tuple[str, str]], max_parallel: int = 4) -> Dict[str, Any]:
+    """Download archives for (candidate, version) pairs into the archive cache without
+    installing them, so a later `sdk install` skips the download.
+    """
+    if _archive_cache is None:
+        return {
+            "success": False,
+            "error": "Archive cache is disabled (set SDKMAN_MCP_ARCHIVE_CACHE_DIR)"
+        }
+
+    platform_id = _sdkman_platform()
+    pairs = list(dict.fromkeys((candidate, version) for candidate, version in items))
+    if not pairs:
+        return {
+            "success": False,
+            "error": "No archives to prefetch"
+        }
+
+    def prefetch(candidate: str, version: str) -> Dict[str, Any]:
+        key = archive_key(candidate, version, platform_id)
+        started = time.perf_counter()
+        entry: Dict[str, Any] = {"candidate": candidate, "version": version}
+        if _archive_cache.lookup(key) is not None:
+            entry.update(success=True, status="cached")
+        else:
+            url = f"{SDKMAN_CANDIDATES_API}/broker/download/{candidate}/{version}/{platform_id}"
+            try:
+                entry.update(_archive_cache.download(key, url), success=True, status="downloaded")
+            except ArchiveCacheError as e:
+                entry.update(success=False, status="failed", error=str(e))
+        entry["seconds"] = round(time.perf_counter() - started, 3)
+        return entry
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, min(max_parallel, len(pairs)))) as executor:
+        results = list(executor.map(lambda pair: prefetch(*pair), pairs))
+    failed = sum(1 for result in results if not result["success"])
+    summary = {
+        "results": results,
+        "failed": failed,
+        "elapsed_seconds": round(time.perf_counter() - started, 3)
+    }
+    if failed:
+        return {
+            "success": False,
+            "error": f"{failed} of {len(results)} prefetches failed",
+            "data": summary
+        }
+
+    return {
+        "success": True,
+        "data": summary
+    }
+
+
+def sdk_uninstall(candidate: str, version: str) -> Dict[str, Any]:
+    """Uninstall a candidate with the specified version."""
+    returncode, stdout, stderr = _run_command(["uninstall", candidate, version])
+    _invalidate_list_cache(candidate)
+    # 被删除版本与其他版本共享的文件链接数变了，而其他版本的目录 mtime 不变
+    _disk_usage.invalidate(os.path.join(current_root().candidates_dir, candidate))
     
     if returncode != 0:
         return {
             "success": False,
-            "error": stderr or "Failed to get current versions"
+            "error": stderr or f"Failed to uninstall {candidate} {version}"
         }
     
     return {
@@ -89,14 +1286,15 @@ def sdk_current() -> Dict[str, Any]:
         "data": stdout
     }
 
-def sdk_current_candidate(candidate: str) -> Dict[str, Any]:
-    """Show the current version of a specific candidate."""
-    returncode, stdout, stderr = _run_command(["current", candidate])
+
+def sdk_use(candidate: str, version: str) -> Dict[str, Any]:
+    """Use a specific version of a candidate in the current shell."""
+    returncode, stdout, stderr = _run_command(["use", candidate, version])
     
     if returncode != 0:
         return {
             "success": False,
-            "error": stderr or f"Failed to get current version of {candidate}"
+            "error": stderr or f"Failed to use {candidate} {version}"
         }
     
     return {
@@ -104,20 +1302,16 @@ def sdk_current_candidate(candidate: str) -> Dict[str, Any]:
         "data": stdout
     }
 
-def sdk_install(candidate: str, version: Optional[str] = None, path: Optional[str] = None) -> Dict[str, Any]:
-    """Install a candidate with the specified version or from a specific path."""
-    cmd = ["install", candidate]
-    if version:
-        cmd.append(version)
-    if path:
-        cmd.append(path)
-    
-    returncode, stdout, stderr = _run_command(cmd)
+
+def sdk_default(candidate: str, version: str) -> Dict[str, Any]:
+    """Set the default version of a candidate."""
+    returncode, stdout, stderr = _run_command(["default", candidate, version])
+    _invalidate_list_cache(candidate)
     
     if returncode != 0:
         return {
             "success": False,
-            "error": stderr or f"Failed to install {candidate}"
+            "error": stderr or f"Failed to set {candidate} {version} as default"
         }
     
     return {
@@ -125,29 +1319,45 @@ def sdk_install(candidate: str, version: Optional[str] = None, path: Optional[st
         "data": stdout
     }
 
-def sdk_uninstall(candidate: str, version: str) -> Dict[str, Any]:
-    """Uninstall a candidate with the specified version."""
-    returncode, stdout, stderr = _run_command(["uninstall", candidate, version])
+
+def sdk_home(candidate: str, version: str) -> Dict[str, Any]:
+    """Get the home directory of a specific version of a candidate."""
+    if NATIVE_READS:
+        home = _native_home(candidate, version)
+        if home is not None:
+            return {
+                "success": True,
+                "data": home
+            }
+
+    returncode, stdout, stderr = _run_command(["home", candidate, version])
     
     if returncode != 0:
         return {
             "success": False,
-            "error": stderr or f"Failed to uninstall {candidate} {version}"
+            "error": stderr or f"Failed to get home directory of {candidate} {version}"
         }
     
     return {
         "success": True,
-        "data": stdout
+        "data": stdout.strip()  # Remove trailing newline
     }
 
-def sdk_use(candidate: str, version: str) -> Dict[str, Any]:
-    """Use a specific version of a candidate in the current shell."""
-    returncode, stdout, stderr = _run_command(["use", candidate, version])
+
+def sdk_env(action: Optional[str] = None, on_output: Optional[OutputCallback] = None) -> Dict[str, Any]:
+    """Manage the .sdkmanrc file. Action can be 'init', 'install', or 'clear'."""
+    cmd = ["env"]
+    if action:
+        cmd.append(action)
+    
+    returncode, stdout, stderr = _run_command(cmd, on_output=on_output)
+    if action == "install":
+        _invalidate_list_cache()
     
     if returncode != 0:
         return {
             "success": False,
-            "error": stderr or f"Failed to use {candidate} {version}"
+            "error": stderr or f"Failed to execute env {action or ''}"
         }
     
     return {
@@ -155,62 +1365,371 @@ def sdk_use(candidate: str, version: str) -> Dict[str, Any]:
         "data": stdout
     }
 
-def sdk_default(candidate: str, version: str) -> Dict[str, Any]:
-    """Set the default version of a candidate."""
-    returncode, stdout, stderr = _run_command(["default", candidate, version])
-    
-    if returncode != 0:
+
+def sdk_env_scan(root: str, install: bool = True, max_parallel: int = 4,
+                 max_depth: Optional[int] = None) -> Dict[str, Any]:
+    """Resolve every `.sdkmanrc` under root and install the SDKs they need.
+
+    The tree is walked lazily and each file is parsed natively; the required
+    (candidate, version) pairs are deduplicated and compared with the installed
+    versions, and the missing ones are installed with sdk_install_many unless
+    `install` is False. Each directory's entries are reported as "present",
+    "installed", "missing" or "failed".
+    """
+    root = os.path.abspath(os.path.expanduser(root))
+    if not os.path.isdir(root):
+        return {
+            "success": False,
+            "error": f"Not a directory: {root}"
+        }
+
+    started = time.perf_counter()
+    directories = []
+    required: Dict[Tuple[str, str], str] = {}
+    installed: Dict[str, Set[str]] = {}
+    for rc in iter_sdkmanrc(root, max_depth):
+        for candidate, version in rc.sdks:
+            if (candidate, version) not in required:
+                if candidate not in installed:
+                    installed[candidate] = set(_installed_versions(candidate) or ())
+                present = version in installed[candidate]
+                required[(candidate, version)] = "present" if present else "missing"
+        directories.append({
+            "directory": os.path.relpath(os.path.dirname(rc.path), root),
+            "sdks": rc.sdks,
+            "errors": rc.errors
+        })
+    scanned = round(time.perf_counter() - started, 3)
+
+    missing = [pair for pair, status in required.items() if status == "missing"]
+    failures: Dict[Tuple[str, str], str] = {}
+    if install and missing:
+        result = sdk_install_many(missing, max_parallel)
+        for item in result.get("data", {}).get("results", []):
+            pair = (item["candidate"], item["version"])
+            required[pair] = "installed" if item["success"] else "failed"
+            if not item["success"]:
+                failures[pair] = item["output"]
+
+    for report in directories:
+        report["sdks"] = [
+            {"candidate": c, "version": v, "status": required[(c, v)]} for c, v in report["sdks"]
+        ]
+    summary = {
+        "root": root,
+        "directories": directories,
+        "required": len(required),
+        "present": sum(1 for status in required.values() if status == "present"),
+        "installed": sum(1 for status in required.values() if status == "installed"),
+        "missing": sum(1 for status in required.values() if status == "missing"),
+        "failed": [
+            {"candidate": c, "version": v, "error": error} for (c, v), error in failures.items()
+        ],
+        "scan_seconds": scanned,
+        "elapsed_seconds": round(time.perf_counter() - started, 3)
+    }
+    if failures:
+        return {
+            "success": False,
+            "error": f"{len(failures)} of {len(missing)} installs failed",
+            "data": summary
+        }
+
+    return {
+        "success": True,
+        "data": summary
+    }
+
+
+def sdk_disk_usage(candidate: Optional[str] = None) -> Dict[str, Any]:
+    """Report the disk space used by each installed version, per candidate.
+
+    Hard-linked files are counted once; `unique_bytes` is what uninstalling only that
+    version would free. Directory contents are cached by mtime, so repeat calls are cheap.
+    """
+    candidates_dir = current_root().candidates_dir
+    if candidate is not None and not os.path.isdir(os.path.join(candidates_dir, candidate)):
+        return {
+            "success": False,
+            "error": f"{candidate} is not installed"
+        }
+    return {
+        "success": True,
+        "data": _disk_usage.scan(candidates_dir, [candidate] if candidate else None)
+    }
+
+
+def _gc_group(candidate: str, version: str) -> str:
+    """Versions compete for the keep-N-latest slots within a group: the Java
+    distribution (`21.0.2-tem` -> tem), or the whole candidate otherwise."""
+    if candidate == "java" and "-" in version:
+        return version.rsplit("-", 1)[1]
+    return ""
+
+
+def _sdkmanrc_references(paths: Iterable[str]) -> Tuple[Set[Tuple[str, str]], List[str]]:
+    """Read the (candidate, version) pairs of .sdkmanrc files; a directory stands for
+    every .sdkmanrc below it. Returns the pairs and the paths that could not be read."""
+    referenced: Set[Tuple[str, str]] = set()
+    unreadable = []
+    for path in paths:
+        path = os.path.abspath(os.path.expanduser(path))
+        if os.path.isdir(path):
+            files = iter_sdkmanrc(path)
+        elif os.path.isfile(path):
+            files = iter([read_sdkmanrc(path)])
+        else:
+            unreadable.append(path)
+            continue
+        for rc in files:
+            referenced.update(rc.sdks)
+    return referenced, unreadable
+
+
+def sdk_gc(keep: int = 1, sdkmanrc: Optional[List[str]] = None,
+           candidate: Optional[str] = None, dry_run: bool = True) -> Dict[str, Any]:
+    """Uninstall installed versions nobody needs, or with dry_run only list them.
+
+    A version is kept when it is the candidate's current version, is named by one of
+    the given .sdkmanrc files (or the .sdkmanrc files under given directories), or is
+    among the `keep` latest of its group (per Java distribution, else per candidate).
+    """
+    if keep < 0:
+        return {
+            "success": False,
+            "error": "keep must not be negative"
+        }
+    referenced, unreadable = _sdkmanrc_references(sdkmanrc or ())
+    if unreadable:
+        return {
+            "success": False,
+            "error": f"No {SDKMANRC} file or directory at {', '.join(unreadable)}"
+        }
+    usage = sdk_disk_usage(candidate)
+    if not usage["success"]:
+        return usage
+
+    kept: List[Dict[str, Any]] = []
+    removable: List[Dict[str, Any]] = []
+    for entry in usage["data"]["candidates"]:
+        name = entry["candidate"]
+        groups: Dict[str, List[Dict[str, Any]]] = {}
+        for version in entry["versions"]:
+            groups.setdefault(_gc_group(name, version["version"]), []).append(version)
+        for versions in groups.values():
+            versions.sort(key=lambda item: version_key(item["version"]), reverse=True)
+            for rank, version in enumerate(versions):
+                if version["current"]:
+                    reason = "current"
+                elif (name, version["version"]) in referenced:
+                    reason = SDKMANRC
+                elif rank < keep:
+                    reason = "latest"
+                else:
+                    reason = None
+                item = {
+                    "candidate": name,
+                    "version": version["version"],
+                    "bytes": version["unique_bytes"],
+                    "idle_days": version["idle_days"],
+                }
+                if reason is None:
+                    removable.append(item)
+                else:
+                    kept.append(dict(item, reason=reason))
+
+    failed = 0
+    if not dry_run:
+        for item in removable:
+            result = sdk_uninstall(item["candidate"], item["version"])
+            item["removed"] = result["success"]
+            if not result["success"]:
+                item["error"] = result["error"]
+                failed += 1
+
+    summary = {
+        "dry_run": dry_run,
+        "keep": keep,
+        "remove": removable,
+        "kept": kept,
+        "reclaimable_bytes": sum(item["bytes"] for item in removable),
+        "reclaimed_bytes": 0 if dry_run else sum(
+            item["bytes"] for item in removable if item.get("removed")
+        ),
+    }
+    if failed:
+        return {
+            "success": False,
+            "error": f"{failed} of {len(removable)} versions could not be uninstalled",
+            "data": summary
+        }
+
+    return {
+        "success": True,
+        "data": summary
+    }
+
+
+def sdk_dedup(candidate: Optional[str] = None, method: Optional[str] = None,
+              dry_run: bool = False) -> Dict[str, Any]:
+    """Make identical files in the installed versions of each candidate share storage.
+
+    Files are merged within one candidate at a time, holding its write lock so that no
+    install or uninstall runs meanwhile. `method` is "auto" (reflinks where the file
+    system supports them, otherwise a report of what could be merged), "reflink" or
+    "hardlink" (read-only hard links, which root can still edit through);
+    SDKMAN_MCP_DEDUP_METHOD by default. Hashes are kept in the index at
+    SDKMAN_MCP_DEDUP_INDEX, so later passes only read new or changed files.
+    """
+    method = (method or DEDUP_METHOD).lower()
+    if method not in DEDUP_METHODS:
+        return {
+            "success": False,
+            "error": f"method must be one of {', '.join(DEDUP_METHODS)}"
+        }
+    candidates_dir = current_root().candidates_dir
+    if candidate is not None:
+        if not os.path.isdir(os.path.join(candidates_dir, candidate)):
+            return {
+                "success": False,
+                "error": f"{candidate} is not installed"
+            }
+        names = [candidate]
+    else:
+        try:
+            names = sorted(
+                entry.name for entry in os.scandir(candidates_dir)
+                if entry.is_dir(follow_symlinks=False)
+            )
+        except OSError as e:
+            return {
+                "success": False,
+                "error": f"Cannot read {candidates_dir}: {e.strerror or str(e)}"
+            }
+
+    started = time.perf_counter()
+    deduplicator = Deduplicator(_dedup_index, method, DEDUP_MIN_SIZE)
+    reports = []
+    errors = 0
+    for name in names:
+        try:
+            with _get_lock_manager().hold(name, True, False):
+                report = deduplicator.run(os.path.join(candidates_dir, name), dry_run)
+        except LockTimeout as e:
+            report = {"errors": [str(e)]}
+        if report.get("replaced_files"):
+            # 保留的文件链接数增加，但它所在目录的 mtime 不变，缓存的占用不再准确
+            _disk_usage.invalidate(os.path.join(candidates_dir, name))
+        report = dict(report, candidate=name)
+        report.pop("directory", None)
+        errors += len(report["errors"])
+        reports.append(report)
+
+    summary = {
+        "dry_run": dry_run,
+        "method": method,
+        "candidates": reports,
+        "replaced_files": sum(report.get("replaced_files", 0) for report in reports),
+        "bytes_reclaimed": sum(report.get("bytes_reclaimed", 0) for report in reports),
+        "elapsed_seconds": round(time.perf_counter() - started, 3)
+    }
+    if errors:
         return {
             "success": False,
-            "error": stderr or f"Failed to set {candidate} {version} as default"
+            "error": f"{errors} files could not be deduplicated",
+            "data": summary
         }
-    
+
     return {
         "success": True,
-        "data": stdout
+        "data": summary
     }
 
-def sdk_home(candidate: str, version: str) -> Dict[str, Any]:
-    """Get the home directory of a specific version of a candidate."""
-    returncode, stdout, stderr = _run_command(["home", candidate, version])
-    
-    if returncode != 0:
+
+def sdk_resolve_env(sdks: Optional[List[str]] = None, sdkmanrc: Optional[str] = None,
+                    format: str = "json") -> Dict[str, Any]:
+    """Compute JAVA_HOME-style variables and PATH entries for a set of installed SDKs
+    from the candidates directory, without starting a shell.
+
+    `sdks` items are `candidate`, `candidate@version` or `candidate=version`, where the
+    version may be an installed identifier, `current` or a constraint such as `21`;
+    `sdkmanrc` is a `.sdkmanrc` file or a directory containing one, whose entries come
+    first. With neither, every candidate that has a current version is used, as
+    `sdkman-init.sh` does. `format` is "json" or "export" (POSIX shell lines).
+    """
+    if format not in ("json", "export"):
         return {
             "success": False,
-            "error": stderr or f"Failed to get home directory of {candidate} {version}"
+            "error": "format must be json or export"
         }
-    
-    return {
-        "success": True,
-        "data": stdout.strip()  # Remove trailing newline
-    }
+    specs: List[Tuple[str, Optional[str]]] = []
+    errors: List[str] = []
+    if sdkmanrc:
+        path = os.path.abspath(os.path.expanduser(sdkmanrc))
+        if os.path.isdir(path):
+            path = os.path.join(path, SDKMANRC)
+        rc = read_sdkmanrc(path)
+        if not rc.sdks and rc.errors:
+            return {
+                "success": False,
+                "error": f"{path}: {'; '.join(rc.errors)}"
+            }
+        specs.extend(rc.sdks)
+        errors.extend(f"{path}: {error}" for error in rc.errors)
+    for item in sdks or ():
+        name, _, version = item.strip().replace("=", "@", 1).partition("@")
+        specs.append((name.strip().lower(), version.strip() or None))
 
-def sdk_env(action: Optional[str] = None) -> Dict[str, Any]:
-    """Manage the .sdkmanrc file. Action can be 'init', 'install', or 'clear'."""
-    cmd = ["env"]
-    if action:
-        cmd.append(action)
-    
-    returncode, stdout, stderr = _run_command(cmd)
-    
-    if returncode != 0:
+    root = current_root()
+    if not specs:
+        for name in _installed_candidates(root.candidates_dir):
+            if _native_current_version(name):
+                specs.append((name, None))
+    try:
+        environment = _environments.resolve(root.sdkman_dir, root.candidates_dir, specs)
+    except SdkEnvironmentError as e:
         return {
             "success": False,
-            "error": stderr or f"Failed to execute env {action or ''}"
+            "error": str(e)
         }
-    
+    if errors:
+        environment["errors"] = errors
+
     return {
         "success": True,
-        "data": stdout
+        "data": export_lines(environment) if format == "export" else environment
     }
 
-def sdk_upgrade(candidate: Optional[str] = None) -> Dict[str, Any]:
+
+def _installed_candidates(candidates_dir: str) -> List[str]:
+    try:
+        with os.scandir(candidates_dir) as entries:
+            return sorted(entry.name for entry in entries if entry.is_dir(follow_symlinks=False))
+    except OSError:
+        return []
+
+
+def environment_stats() -> Dict[str, Any]:
+    """Return the size and hit/miss counters of the memoised SDK environments."""
+    return _environments.stats()
+
+
+def dedup_stats() -> Dict[str, Any]:
+    """Return the size of the deduplication hash index."""
+    if _dedup_index is None:
+        return {"enabled": False}
+    return dict(_dedup_index.stats(), enabled=True)
+
+
+def sdk_upgrade(candidate: Optional[str] = None,
+                on_output: Optional[OutputCallback] = None) -> Dict[str, Any]:
     """Check available upgrades or upgrade a specific candidate."""
     cmd = ["upgrade"]
     if candidate:
         cmd.append(candidate)
     
-    returncode, stdout, stderr = _run_command(cmd)
+    returncode, stdout, stderr = _run_command(cmd, on_output=on_output)
+    _invalidate_list_cache(candidate)
     
     if returncode != 0:
         return {
@@ -223,6 +1742,7 @@ def sdk_upgrade(candidate: Optional[str] = None) -> Dict[str, Any]:
         "data": stdout
     }
 
+
 def sdk_version() -> Dict[str, Any]:
     """Display the SDKMAN version."""
     returncode, stdout, stderr = _run_command(["version"])
@@ -238,6 +1758,7 @@ def sdk_version() -> Dict[str, Any]:
         "data": stdout
     }
 
+
 def sdk_offline(mode: str) -> Dict[str, Any]:
     """Enable or disable offline mode."""
     if mode not in ["enable", "disable"]:
@@ -247,6 +1768,7 @@ def sdk_offline(mode: str) -> Dict[str, Any]:
         }
     
     returncode, stdout, stderr = _run_command(["offline", mode])
+    _invalidate_list_cache()
     
     if returncode != 0:
         return {
@@ -259,13 +1781,20 @@ def sdk_offline(mode: str) -> Dict[str, Any]:
         "data": stdout
     }
 
-def sdk_selfupdate(force: bool = False) -> Dict[str, Any]:
+
+def sdk_selfupdate(force: bool = False, on_output: Optional[OutputCallback] = None) -> Dict[str, Any]:
     """Update SDKMAN itself."""
     cmd = ["selfupdate"]
     if force:
         cmd.append("force")
     
-    returncode, stdout, stderr = _run_command(cmd)
+    returncode, stdout, stderr = _run_command(cmd, on_output=on_output)
+    _invalidate_list_cache()
+
+    # selfupdate 会替换 SDKMAN 脚本，常驻 worker 需要重新 source
+    pool = current_root().worker_pool
+    if pool is not None:
+        pool.recycle()
     
     if returncode != 0:
         return {
@@ -278,9 +1807,11 @@ def sdk_selfupdate(force: bool = False) -> Dict[str, Any]:
         "data": stdout
     }
 
+
 def sdk_update() -> Dict[str, Any]:
     """Update SDKMAN candidates."""
     returncode, stdout, stderr = _run_command(["update"])
+    _invalidate_list_cache()
     
     if returncode != 0:
         return {
@@ -293,6 +1824,7 @@ def sdk_update() -> Dict[str, Any]:
         "data": stdout
     }
 
+
 def sdk_flush(mode: Optional[str] = None) -> Dict[str, Any]:
     """Flush SDKMAN local state. Mode can be 'tmp', 'metadata', or 'version'."""
     cmd = ["flush"]
@@ -305,6 +1837,7 @@ def sdk_flush(mode: Optional[str] = None) -> Dict[str, Any]:
         cmd.append(mode)
     
     returncode, stdout, stderr = _run_command(cmd)
+    _invalidate_list_cache()
     
     if returncode != 0:
         return {
@@ -317,6 +1850,7 @@ def sdk_flush(mode: Optional[str] = None) -> Dict[str, Any]:
         "data": stdout
     }
 
+
 def sdk_help(command: Optional[str] = None) -> Dict[str, Any]:
     """Get help about SDKMAN or a specific command."""
     cmd = ["help"]
@@ -336,6 +1870,7 @@ def sdk_help(command: Optional[str] = None) -> Dict[str, Any]:
         "data": stdout
     }
 
+
 def sdk_config() -> Dict[str, Any]:
     """Edit the SDKMAN configuration."""
     returncode, stdout, stderr = _run_command(["config"])
@@ -351,21 +1886,196 @@ def sdk_config() -> Dict[str, Any]:
         "data": stdout
     }
 
-def parse_sdk_versions(output: str, search_version: Optional[str] = None) -> List[Dict[str, str]]:
+
+# 可以作为后台任务提交的命令
+JOB_KINDS = {"install": sdk_install, "upgrade": sdk_upgrade, "selfupdate": sdk_selfupdate}
+
+
+def _run_job(root: SdkmanRoot, kind: str, params: Dict[str, Any], on_output: OutputCallback,
+             handle: JobHandle) -> Dict[str, Any]:
+    def track(process: subprocess.Popen) -> None:
+        handle.on_cancel(lambda: _kill_process_group(process))
+
+    with use_root(root), _on_process_start(track):
+        return JOB_KINDS[kind](**params, on_output=on_output)
+
+
+def _get_job_queue() -> JobQueue:
+    """Return the job queue of the current root."""
+    return current_root().get_job_queue()
+
+
+def _start_job_queue(root: SdkmanRoot) -> None:
+    try:
+        root.get_job_queue()
+    except Exception as e:
+        logger.warning(f"Failed to start the job queue of {root.name}: {str(e)}")
+
+
+def start_job_queue() -> None:
+    """Open the job journals of SDKMAN_DIR and the configured roots, and of any other
+    root when it is first used, resuming jobs a previous server process left unfinished."""
+    _background.add("jobs")
+    for root in _configured_roots():
+        _start_job_queue(root)
+
+
+def submit_job(kind: str, **params: Any) -> Dict[str, Any]:
+    """Queue an install, upgrade or selfupdate as a background job and return its record.
+
+    The parameters are those of sdk_install, sdk_upgrade or sdk_selfupdate.
     """
-    解析SDK版本列表输出，转换成结构化数据
-    
+    if kind not in JOB_KINDS:
+        return {
+            "success": False,
+            "error": f"Unknown job kind: {kind}"
+        }
+    try:
+        job = _get_job_queue().submit(kind, params)
+    except Exception as e:
+        logger.error(f"Failed to submit {kind} job: {str(e)}")
+        return {
+            "success": False,
+            "error": f"Failed to submit {kind} job: {str(e)}"
+        }
+
+    return {
+        "success": True,
+        "data": job
+    }
+
+
+def job_status(job_id: Optional[str] = None, limit: int = 20) -> Dict[str, Any]:
+    """Return a job with its captured output, or the most recent jobs when no id is given."""
+    try:
+        if job_id is None:
+            return {
+                "success": True,
+                "data": {"jobs": _get_job_queue().list(limit)}
+            }
+        job = _get_job_queue().get(job_id)
+    except Exception as e:
+        return {
+            "success": False,
+            "error": f"Failed to read the job journal: {str(e)}"
+        }
+    if job is None:
+        return {
+            "success": False,
+            "error": f"Unknown job: {job_id}"
+        }
+
+    return {
+        "success": True,
+        "data": job
+    }
+
+
+def job_wait(job_id: str, timeout: Optional[float] = None) -> Dict[str, Any]:
+    """Wait up to timeout seconds for a job to finish and return its record."""
+    job = _get_job_queue().wait(job_id, timeout)
+    if job is None:
+        return {
+            "success": False,
+            "error": f"Unknown job: {job_id}"
+        }
+
+    return {
+        "success": True,
+        "data": job
+    }
+
+
+def job_cancel(job_id: str) -> Dict[str, Any]:
+    """Cancel a queued job or stop a running one."""
+    queue = _get_job_queue()
+    job = queue.cancel(job_id)
+    if job is None:
+        return {
+            "success": False,
+            "error": f"Unknown job: {job_id}"
+        }
+    if job["state"] == "running" and not queue.owns(job_id):
+        return {
+            "success": False,
+            "error": f"Job {job_id} is running in another server process",
+            "data": job
+        }
+    if job["state"] in ("succeeded", "failed"):
+        return {
+            "success": False,
+            "error": f"Job {job_id} already {job['state']}",
+            "data": job
+        }
+
+    return {
+        "success": True,
+        "data": job
+    }
+
+
+def pending_jobs() -> int:
+    """Return the number of jobs queued or running in this process, over all roots."""
+    return sum(
+        root.job_queue.pending() for root in active_roots() if root.job_queue is not None
+    )
+
+
+def job_stats() -> Dict[str, Any]:
+    """Return the number of journalled jobs in each state."""
+    queue = current_root().job_queue
+    if queue is None:
+        return {"started": False}
+    return dict(queue.stats(), started=True)
+
+
+def _parse_version_grid_line(line: str) -> List[Dict[str, Any]]:
+    """解析网格格式的一行，标记 > 当前使用、* 已安装、+ 本地版本"""
+    versions = []
+    markers = set()
+    for token in line.split():
+        if token in (">", "*", "+"):
+            markers.add(token)
+            continue
+        if "+" in markers:
+            status = "local only"
+        elif "*" in markers or ">" in markers:
+            status = "installed"
+        else:
+            status = ""
+        versions.append({
+            "vendor": "",
+            "use": ">" in markers,
+            "version": token,
+            "dist": "",
+            "status": status,
+            "identifier": token
+        })
+        markers = set()
+    return versions
+
+
+def iter_sdk_versions(
+    lines: Union[str, Iterable[str]], search_version: Optional[str] = None
+) -> Iterator[Dict[str, Any]]:
+    """
+    逐行解析SDK版本列表输出，每解析出一个版本就立即产出
+
+    输入可以是完整输出字符串，也可以是任意行迭代器（例如子进程的 stdout 管道），
+    内存占用与表格大小无关；调用方找到需要的版本后即可停止迭代。
+
     Args:
-        output: sdk list <candidate> 命令的输出
+        lines: sdk list <candidate> 命令的输出，或逐行产出该输出的迭代器
         search_version: 可选的版本搜索字符串 (例如 "21")
-    
-    Returns:
-        包含版本信息的字典列表
+
+    Yields:
+        版本信息字典，顺序与 SDKMAN 输出一致
     """
-    versions = []
-    lines = output.split('\n')
+    if isinstance(lines, str):
+        lines = io.StringIO(lines)
     vendor = None
     in_version_section = False
+    separators = 0
     
     for line in lines:
         line = line.strip()
@@ -378,46 +2088,328 @@ def parse_sdk_versions(output: str, search_version: Optional[str] = None) -> Lis
         if line.startswith('==') or line.startswith('--'):
             if "Version" in line and "Vendor" in line:
                 in_version_section = True
+            if line.startswith('=='):
+                separators += 1
             continue
             
         # 如果尚未进入版本区域，检查是否是版本表头
         if not in_version_section and "Vendor" in line and "Version" in line:
             in_version_section = True
             continue
+
+        # 非 java 候选的输出是多列网格（如 sdk list gradle），位于第二、三条 == 分隔线之间
+        if not in_version_section and separators == 2 and '|' not in line:
+            for version_info in _parse_version_grid_line(line):
+                if not search_version or search_version in version_info["version"]:
+                    yield version_info
+            continue
             
         # 如果已进入版本区域
         if in_version_section:
             # 检查是否是新的供应商部分（没有 | 符号的行）
             if '|' not in line:
-                vendor = line.strip()
+                vendor = line
                 continue
                 
             # 处理版本行
-            if '|' in line:
-                parts = [part.strip() for part in line.split('|')]
-                # 确保行包含足够的字段
-                if len(parts) >= 6:
-                    # 确定是否是当前使用的版本
-                    use_indicator = ">>>" in parts[1]
-                    
-                    # 提取版本信息
-                    version_info = {
-                        "vendor": vendor or "",
-                        "use": use_indicator,
-                        "version": parts[2],
-                        "dist": parts[3],
-                        "status": parts[4],
-                        "identifier": parts[5]
-                    }
-                    
-                    # 如果指定了搜索版本，检查版本号是否匹配
-                    if search_version:
-                        if search_version in version_info["version"]:
-                            versions.append(version_info)
-                    else:
-                        versions.append(version_info)
+            parts = [part.strip() for part in line.split('|')]
+            # 确保行包含足够的字段
+            if len(parts) < 6:
+                continue
+            # 供应商只出现在每组的第一行
+            if parts[0]:
+                vendor = parts[0]
+
+            # 如果指定了搜索版本，检查版本号是否匹配
+            if search_version and search_version not in parts[2]:
+                continue
+
+            yield {
+                "vendor": vendor or "",
+                "use": ">>>" in parts[1],
+                "version": parts[2],
+                "dist": parts[3],
+                "status": parts[4],
+                "identifier": parts[5]
+            }
+
+
+def parse_sdk_versions(output: str, search_version: Optional[str] = None) -> List[Dict[str, str]]:
+    """
+    解析SDK版本列表输出，转换成结构化数据
     
-    return versions
+    Args:
+        output: sdk list <candidate> 命令的输出
+        search_version: 可选的版本搜索字符串 (例如 "21")
+    
+    Returns:
+        包含版本信息的字典列表
+    """
+    return list(iter_sdk_versions(output, search_version))
+
+
+def _stream_command_lines(cmd: List[str], timeout: Optional[float] = None) -> Iterator[str]:
+    """Yield the stdout lines of a command from a one-shot shell as they are printed.
+
+    The command holds the locks it would hold under _run_command for as long as the
+    generator is open, is recorded in the command metrics (mode "stream"), and its
+    output goes through the same filter. Only the current line is kept in memory;
+    lines are cut at OUTPUT_MAX_BYTES. Closing the generator early kills the shell, so
+    the rest of the output is never produced or read. Nothing is yielded when the
+    locks cannot be acquired.
+    """
+    _check_sdkman_installation()
+    timeout = timeout if timeout is not None else COMMAND_TIMEOUT
+    candidate, exclusive, global_exclusive = _lock_scope(cmd)
+    started = time.perf_counter()
+    # 由 _stream_oneshot_lines 填写
+    result = {"returncode": 124, "bytes": 0}
+    timings: Dict[str, float] = {}
+    try:
+        with _get_lock_manager().hold(candidate, exclusive, global_exclusive) as waited:
+            timings["lock"] = waited
+            yield from _stream_oneshot_lines(cmd, timeout, result)
+    except LockTimeout as e:
+        logger.warning(f"Command {cmd} not run: {str(e)}")
+    finally:
+        metrics.record_command(
+            cmd[0], "stream", result["returncode"], time.perf_counter() - started, timings,
+            result["bytes"], 0
+        )
+
+
+def _stream_oneshot_lines(
+    cmd: List[str], timeout: Optional[float], result: Dict[str, int]
+) -> Iterator[str]:
+    root = current_root()
+    result["returncode"] = 1
+    limit = OUTPUT_MAX_BYTES or -1
+    output_filter = OutputFilter() if OUTPUT_STRIP else None
+    process = subprocess.Popen(
+        f"source {shlex.quote(root.sdk_command)} && sdk "
+        + " ".join(shlex.quote(arg) for arg in cmd),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        shell=True,
+        executable="/bin/bash",
+        env=root.env,
+        start_new_session=True
+    )
+    callback = getattr(_process_hooks, "callback", None)
+    if callback is not None:
+        callback(process)
+    timer = threading.Timer(timeout, _kill_process_group, (process,)) if timeout else None
+    if timer is not None:
+        timer.daemon = True
+        timer.start()
+    try:
+        pending = b""
+        for chunk in iter(lambda: process.stdout.readline(limit), b""):
+            result["bytes"] += len(chunk)
+            pending += output_filter.feed(chunk) if output_filter is not None else chunk
+            # 过滤器可能暂存行尾，凑齐整行再产出；超长的行在上限处截断
+            while b"\n" in pending or (limit > 0 and len(pending) >= limit):
+                cut = pending.find(b"\n") + 1 or limit
+                line, pending = pending[:cut], pending[cut:]
+                yield line.decode("utf-8", errors="replace")
+        if output_filter is not None:
+            pending += output_filter.flush()
+        if pending:
+            yield pending.decode("utf-8", errors="replace")
+        result["returncode"] = process.wait()
+    except GeneratorExit:
+        # 调用方提前停止读取不算失败
+        result["returncode"] = 0
+        raise
+    finally:
+        if timer is not None:
+            timer.cancel()
+        if process.poll() is None:
+            _kill_process_group(process)
+        process.stdout.close()
+        process.wait()
+
+
+def stream_sdk_versions(candidate: str, search_version: Optional[str] = None
+                        ) -> Iterator[Dict[str, Any]]:
+    """Yield the versions of a candidate in SDKMAN order as `sdk list` prints them.
+
+    A cached listing is parsed from memory; otherwise the records are parsed straight
+    from the shell's output pipe (see _stream_command_lines), so memory does not grow
+    with the table, and stopping early stops the command.
+    """
+    cached = current_root().list_cache.get(candidate)
+    if cached is not None and cached.get("success"):
+        yield from iter_sdk_versions(cached["data"], search_version)
+        return
+    with closing(_stream_command_lines(["list", candidate])) as lines:
+        yield from iter_sdk_versions(lines, search_version)
+
+
+def find_sdk_version(
+    candidate: str,
+    predicate: Callable[[Dict[str, Any]], bool],
+    search_version: Optional[str] = None,
+) -> Optional[Dict[str, Any]]:
+    """Return the first version of a candidate matching predicate, or None.
+
+    For example the first installed Temurin 21:
+
+        find_sdk_version("java", lambda v: v["dist"] == "tem" and v["status"] == "installed", "21")
+
+    Parsing, and the `sdk list` command when the listing is not cached, stop at the match.
+    """
+    with closing(stream_sdk_versions(candidate, search_version)) as versions:
+        return next((version for version in versions if predicate(version)), None)
+
+
+def get_version_index(candidate: str) -> Tuple[Optional[VersionIndex], Optional[str]]:
+    """Return the version index of a candidate and an error message if listing failed.
+
+    The index is rebuilt only when the underlying `sdk list` output changes.
+    """
+    list_result = sdk_list_candidate(candidate)
+    if not list_result["success"]:
+        return None, list_result["error"]
+    return _version_index_of(candidate, list_result["data"]), None
+
+
+def _version_index_of(candidate: str, output: str) -> VersionIndex:
+    index_cache = current_root().index_cache
+    cached = index_cache.get(candidate)
+    if cached is not None and (cached[0] is output or cached[0] == output):
+        return cached[1]
+
+    index = VersionIndex.from_parsed(iter_sdk_versions(output))
+    index_cache.set(candidate, (output, index))
+    return index
+
+
+def sdk_query_versions(
+    candidate: str,
+    vendor: Optional[str] = None,
+    major: Optional[str] = None,
+    installed: Optional[bool] = None,
+    dist: Optional[str] = None,
+    limit: int = 50
+) -> Dict[str, Any]:
+    """Filter the versions of a candidate and return them as structured records."""
+    list_result = sdk_list_candidate(candidate)
+    if not list_result["success"]:
+        return {
+            "success": False,
+            "error": list_result["error"] or f"Failed to list versions for {candidate}"
+        }
+
+    index = _version_index_of(candidate, list_result["data"])
+    matches = index.query(vendor=vendor, major=major, installed=installed, dist=dist)
+    result = {
+        "success": True,
+        "data": {
+            "candidate": candidate,
+            "current": index.current.identifier if index.current else None,
+            "total": len(matches),
+            "versions": [record.as_dict() for record in matches[:max(0, limit)]]
+        }
+    }
+    if "snapshot" in list_result:
+        result["snapshot"] = list_result["snapshot"]
+    return result
+
+
+def _resolver_of(candidate: str, index: VersionIndex) -> VersionResolver:
+    resolver_cache = current_root().resolver_cache
+    cached = resolver_cache.get(candidate)
+    if cached is not None and cached[0] is index:
+        return cached[1]
+
+    resolver = VersionResolver(index.records)
+    resolver_cache.set(candidate, (index, resolver))
+    return resolver
+
+
+def resolve_version(spec: str) -> Dict[str, Any]:
+    """Resolve a constraint such as `java@21 vendor=tem`, `gradle@^8` or `latest-lts`
+    to the best matching version; see resolver.parse_constraint for the syntax.
+
+    Among equal versions an installed one wins, then Temurin, then list order.
+    """
+    try:
+        constraint = parse_constraint(spec)
+    except ValueError as e:
+        return {
+            "success": False,
+            "error": f"Invalid version constraint {spec!r}: {str(e)}"
+        }
+
+    index, error = get_version_index(constraint.candidate)
+    if index is None:
+        return {
+            "success": False,
+            "error": error or f"Failed to list versions for {constraint.candidate}"
+        }
+
+    matches = _resolver_of(constraint.candidate, index).matches(constraint)
+    if not matches:
+        return {
+            "success": False,
+            "error": f"No {constraint.candidate} version matches {spec!r}"
+        }
+
+    best = matches[0]
+    return {
+        "success": True,
+        "data": {
+            "candidate": constraint.candidate,
+            "spec": spec,
+            "identifier": best.identifier,
+            "installed": best.installed,
+            "current": best.use,
+            "version": best.as_dict(),
+            "alternatives": [record.identifier for record in matches[1:]]
+        }
+    }
+
+
+def sdk_install_resolved(spec: str, background: bool = False,
+                         on_output: Optional[OutputCallback] = None) -> Dict[str, Any]:
+    """Resolve a version constraint and install the chosen version unless it is installed.
+
+    With `background` the install is queued as a job (see submit_job) and the job record
+    is returned under "job".
+    """
+    resolved = resolve_version(spec)
+    if not resolved["success"]:
+        return resolved
+
+    resolution = resolved["data"]
+    candidate, identifier = resolution["candidate"], resolution["identifier"]
+    if resolution["installed"]:
+        return {
+            "success": True,
+            "data": {
+                "resolution": resolution,
+                "message": f"{candidate} {identifier} is already installed"
+            }
+        }
+
+    if background:
+        submitted = submit_job("install", candidate=candidate, version=identifier)
+        if not submitted["success"]:
+            return submitted
+        return {
+            "success": True,
+            "data": {"resolution": resolution, "job": submitted["data"]}
+        }
+
+    installed = sdk_install(candidate, identifier, on_output=on_output)
+    if not installed["success"]:
+        return installed
+    return {
+        "success": True,
+        "data": {"resolution": resolution, "output": installed["data"]}
+    }
+
 
 def sdk_interactive_install(candidate: str, search_version: Optional[str] = None) -> Dict[str, Any]:
     """
@@ -496,6 +2488,7 @@ def sdk_interactive_install(candidate: str, search_version: Optional[str] = None
                 "error": "用户中断操作"
             }
 
+
 def main():
     """主函数入口，允许从命令行直接使用交互式安装功能"""
     import argparse
@@ -560,5 +2553,6 @@ def main():
             print(f"错误: {result['error']}")
             sys.exit(1)
 
+
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,95 @@
+"""
+Sdkmanrc Module
+
+This module reads `.sdkmanrc` files natively and walks directory trees for them. The
+walk is a generator over `os.scandir`, so only the directories still to be visited are
+held in memory, however large the tree is.
+"""
+
+import os
+import re
+from typing import Dict, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+SDKMANRC = ".sdkmanrc"
+
+# 扫描时跳过的目录：版本控制、依赖与构建缓存，它们体积大且不会包含项目自己的 .sdkmanrc
+SKIP_DIRS: Set[str] = {
+    ".git", ".hg", ".svn", "node_modules", ".gradle", ".m2", ".idea", ".vscode",
+    "__pycache__", ".venv", ".tox",
+}
+
+_CANDIDATE = re.compile(r"[a-z][a-z0-9]*")
+# 版本会作为参数传给 sdk 命令，只接受标识符中会出现的字符，拒绝 shell 元字符
+_VERSION = re.compile(r"[A-Za-z0-9._+-]+")
+
+
+class Sdkmanrc(NamedTuple):
+    """A parsed `.sdkmanrc`: (candidate, version) pairs in file order and invalid lines."""
+
+    path: str
+    sdks: List[Tuple[str, str]]
+    errors: List[str]
+
+
+def parse_sdkmanrc(text: str) -> Tuple[List[Tuple[str, str]], List[str]]:
+    """Parse `.sdkmanrc` content the way `sdk env` does.
+
+    Blank lines and `#` comments are ignored; every other line must be
+    `candidate=version`, where the version consists of letters, digits and `._+-` only.
+    A candidate listed twice keeps its last version.
+    Returns the pairs and a message for each line that could not be parsed.
+    """
+    sdks: Dict[str, str] = {}
+    errors = []
+    for number, line in enumerate(text.splitlines(), 1):
+        line = line.split("#", 1)[0].strip()
+        if not line:
+            continue
+        candidate, sep, version = (part.strip() for part in line.partition("="))
+        if not sep or not _CANDIDATE.fullmatch(candidate) or not _VERSION.fullmatch(version):
+            errors.append(f"line {number}: invalid entry {line!r}")
+            continue
+        sdks.pop(candidate, None)
+        sdks[candidate] = version
+    return list(sdks.items()), errors
+
+
+def read_sdkmanrc(path: str) -> Sdkmanrc:
+    """Read and parse one `.sdkmanrc` file; a read failure is reported as an error."""
+    try:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            sdks, errors = parse_sdkmanrc(f.read())
+    except OSError as e:
+        sdks, errors = [], [f"cannot read: {e.strerror or str(e)}"]
+    return Sdkmanrc(path, sdks, errors)
+
+
+def iter_sdkmanrc(root: str, max_depth: Optional[int] = None) -> Iterator[Sdkmanrc]:
+    """Yield every `.sdkmanrc` under root, parsed, in depth-first directory order.
+
+    Symlinked directories are not followed, directories in SKIP_DIRS are skipped and
+    unreadable directories are ignored. `max_depth` limits how deep below root to look
+    (0 means root only).
+    """
+    stack = [(os.path.abspath(root), 0)]
+    while stack:
+        directory, depth = stack.pop()
+        children = []
+        found = None
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.name == SDKMANRC:
+                        if entry.is_file():
+                            found = entry.path
+                    elif (entry.name not in SKIP_DIRS
+                          and (max_depth is None or depth < max_depth)
+                          and entry.is_dir(follow_symlinks=False)):
+                        children.append(entry.path)
+        except OSError:
+            continue
+        # 目录句柄关闭后再交给调用方，生成器挂起期间不占用文件描述符
+        if found is not None:
+            yield read_sdkmanrc(found)
+        # 逆序入栈，按名称顺序访问子目录
+        stack.extend((child, depth + 1) for child in sorted(children, reverse=True))
@@ -1,78 +1,361 @@
 """SDKMAN! MCP Server module."""
 
+import asyncio
+import functools
+import inspect
+import json
 import logging
 import os
-from typing import Optional, Dict, Any
+import weakref
+from types import ModuleType
+from typing import Optional, Dict, Any, List, Awaitable, Callable, Set, Tuple
 
 from mcp.server.fastmcp import FastMCP, Context
 
-from .sdk_commands import (
-    sdk_list, sdk_list_candidate, 
-    sdk_current, sdk_current_candidate,
-    sdk_install, sdk_uninstall,
-    sdk_use, sdk_default, sdk_home,
-    sdk_env, sdk_upgrade, 
-    sdk_version, sdk_offline,
-    sdk_selfupdate, sdk_update,
-    sdk_flush, sdk_help, sdk_config
-)
+from .metrics import instrument_tool, metrics
+from .progress import parse_progress
 
 logger = logging.getLogger(__name__)
 
 
+# 命令层（连同 sqlite3、urllib、worker 池等）在第一次调用工具时才导入
+_commands_module: Optional[ModuleType] = None
+
+
+def _commands() -> ModuleType:
+    """Import the async command layer on first use and start its background work."""
+    global _commands_module
+    if _commands_module is None:
+        from . import async_commands, sdk_commands
+        # 后台增量刷新离线元数据快照，恢复上次未完成的后台任务，并监视 SDKMAN 目录
+        sdk_commands.start_snapshot_refresher()
+        sdk_commands.start_job_queue()
+        sdk_commands.start_watcher()
+        _commands_module = async_commands
+    return _commands_module
+
+
+class _LazyToolServer(FastMCP):
+    """FastMCP server that registers its tools from a table on the first request.
+
+    FastMCP builds a pydantic argument model and JSON schema for every tool as it is
+    added; deferring that until a client lists or calls tools keeps it off startup.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.tool_table: List[Tuple[Callable, Optional[str]]] = []
+        # 资源 URI -> 订阅了它的会话；会话断开后自动移除
+        self._subscribers: Dict[str, "weakref.WeakSet[Any]"] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # 正在执行的工具调用数，网络模式关闭前等待其归零
+        self.calls_in_progress = 0
+        self._mcp_server.subscribe_resource()(self._subscribe)
+        self._mcp_server.unsubscribe_resource()(self._unsubscribe)
+        get_capabilities = self._mcp_server.get_capabilities
+
+        def capabilities(*args: Any, **kwargs: Any) -> Any:
+            # 低层服务器总是声明 subscribe=False，这里如实声明支持订阅
+            result = get_capabilities(*args, **kwargs)
+            if result.resources is not None:
+                result.resources.subscribe = True
+            return result
+
+        self._mcp_server.get_capabilities = capabilities  # type: ignore[method-assign]
+
+    def _register_tools(self) -> None:
+        table, self.tool_table = self.tool_table, []
+        for func, name in table:
+            self.add_tool(func, name=name)
+
+    async def list_tools(self) -> Any:
+        self._register_tools()
+        return await super().list_tools()
+
+    async def call_tool(self, name: str, arguments: Dict[str, Any]) -> Any:
+        self._register_tools()
+        self.calls_in_progress += 1
+        try:
+            return await super().call_tool(name, arguments)
+        finally:
+            self.calls_in_progress -= 1
+
+    def busy(self) -> Dict[str, int]:
+        """Tool calls in progress and background jobs queued or running in this process."""
+        jobs = 0
+        if _commands_module is not None:
+            from .sdk_commands import pending_jobs
+            jobs = pending_jobs()
+        return {"tool_calls": self.calls_in_progress, "jobs": jobs}
+
+    async def _subscribe(self, uri: Any) -> None:
+        session = self._mcp_server.request_context.session
+        self._subscribers.setdefault(str(uri), weakref.WeakSet()).add(session)
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+            _commands()
+            from .sdk_commands import add_change_listener
+            add_change_listener(self._sdkman_changed)
+
+    async def _unsubscribe(self, uri: Any) -> None:
+        sessions = self._subscribers.get(str(uri))
+        if sessions is not None:
+            sessions.discard(self._mcp_server.request_context.session)
+
+    def _sdkman_changed(self, candidates: Set[str], everything: bool) -> None:
+        """Called from the watcher thread; schedules resource-updated notifications."""
+        uris = {"sdkman://current"}
+        if everything:
+            uris.update(uri for uri in self._subscribers if uri.startswith("sdkman://candidates/"))
+        uris.update(f"sdkman://candidates/{candidate}" for candidate in candidates)
+        uris = {uri for uri in uris if self._subscribers.get(uri)}
+        if uris and self._loop is not None and not self._loop.is_closed():
+            asyncio.run_coroutine_threadsafe(self._notify_updated(uris), self._loop)
+
+    async def _notify_updated(self, uris: Set[str]) -> None:
+        for uri in sorted(uris):
+            for session in list(self._subscribers.get(uri, ())):
+                try:
+                    await session.send_resource_updated(uri)
+                except Exception as e:
+                    logger.debug(f"Dropping subscriber of {uri}: {str(e)}")
+                    self._subscribers[uri].discard(session)
+
+
+def _with_root(func: Callable) -> Callable:
+    """Give a tool an optional `root` argument selecting the SDKMAN installation it acts
+    on: a profile name from SDKMAN_MCP_ROOTS, or an SDKMAN directory when
+    SDKMAN_MCP_ALLOW_ROOT_PATHS=1."""
+    @functools.wraps(func)
+    async def wrapper(*args: Any, root: Optional[str] = None, **kwargs: Any) -> Any:
+        if root is None:
+            return await func(*args, **kwargs)
+        _commands()
+        from .sdk_commands import get_root, use_root
+        try:
+            selected = get_root(root)
+        except ValueError as e:
+            return {
+                "success": False,
+                "error": str(e)
+            }
+        with use_root(selected):
+            return await func(*args, **kwargs)
+
+    # FastMCP 按签名生成参数模型，把 root 作为关键字参数补进去
+    signature = inspect.signature(func)
+    wrapper.__signature__ = signature.replace(parameters=[  # type: ignore[attr-defined]
+        *signature.parameters.values(),
+        inspect.Parameter(
+            "root", inspect.Parameter.KEYWORD_ONLY, default=None, annotation=Optional[str]
+        ),
+    ])
+    return wrapper
+
+
+def _progress_reporter(ctx: Context) -> Callable[[str, str], Awaitable[None]]:
+    """Forward streamed command output to the client as progress and log notifications."""
+    last_percent = -1
+
+    async def report(stream: str, line: str) -> None:
+        nonlocal last_percent
+        percent = parse_progress(line)
+        if percent is not None:
+            # curl 每次重绘都会输出一行，只在整数百分比变化时上报
+            if int(percent) != last_percent:
+                last_percent = int(percent)
+                await ctx.report_progress(percent, 100)
+            return
+        await ctx.info(line.strip())
+
+    return report
+
+
 def create_server() -> FastMCP:
     """Create and configure the SDKMAN MCP server."""
-    server = FastMCP("SDKMAN", 
+    server = _LazyToolServer("SDKMAN", 
                      description="SDKMAN! SDK Manager for managing parallel versions of multiple SDKs")
     
+    def tool(name: Optional[str] = None) -> Callable:
+        """Add a tool, recording its calls in the metrics registry and accepting an
+        optional SDKMAN `root`, to the tool table."""
+        def decorator(func: Callable) -> Callable:
+            server.tool_table.append(
+                (instrument_tool(name or func.__name__, _with_root(func)), name)
+            )
+            return func
+        return decorator
+    
     # Register all tools
     
-    @server.tool()
-    def sdk_list_all() -> Dict[str, Any]:
-        """List all available SDK candidates in SDKMAN."""
+    @tool()
+    async def sdk_list_all(format: str = "raw") -> Dict[str, Any]:
+        """List all available SDK candidates in SDKMAN.
+        
+        Args:
+            format: "raw" (default, SDKMAN's text), "compact" (one "candidate version" line
+                per candidate) or "json" (candidate, name, version and URL per candidate)
+        """
         logger.info("Listing all SDK candidates")
-        return sdk_list()
+        return await _commands().sdk_list(format)
     
-    @server.tool()
-    def sdk_list_versions(candidate: str) -> Dict[str, Any]:
+    @tool()
+    async def sdk_list_versions(candidate: str, format: str = "raw") -> Dict[str, Any]:
         """List all available versions for a specific SDK candidate.
         
         Args:
             candidate: Name of the SDK candidate (e.g., java, gradle, kotlin)
+            format: "raw" (default, SDKMAN's table), "compact" (identifiers per vendor, ">"
+                marking the current one and "*" installed ones) or "json" (current,
+                installed and all identifiers)
         """
         logger.info(f"Listing versions for {candidate}")
-        return sdk_list_candidate(candidate)
+        return await _commands().sdk_list_candidate(candidate, format)
+    
+    @tool(name="sdk_query_versions")
+    async def sdk_query_candidate_versions(candidate: str, vendor: Optional[str] = None,
+                                           major: Optional[str] = None,
+                                           installed: Optional[bool] = None,
+                                           dist: Optional[str] = None,
+                                           limit: int = 50) -> Dict[str, Any]:
+        """Find versions of an SDK candidate matching the given filters, as structured records.
+        
+        Prefer this over sdk_list_versions when looking for specific versions; it returns
+        only the matching rows instead of the whole table.
+        
+        Args:
+            candidate: Name of the SDK candidate (e.g., java, gradle, kotlin)
+            vendor: Vendor name or dist code (e.g., Temurin, tem, graalce) (Optional)
+            major: Major version (e.g., 21) (Optional)
+            installed: Only installed (true) or only not installed (false) versions (Optional)
+            dist: Distribution code (e.g., tem, amzn) (Optional)
+            limit: Maximum number of versions to return (default 50)
+        """
+        logger.info(f"Querying versions for {candidate}")
+        return await _commands().sdk_query_versions(
+            candidate, vendor, major, installed, dist, limit
+        )
     
-    @server.tool()
-    def sdk_current_all() -> Dict[str, Any]:
-        """Show current versions of all installed SDKs."""
+    @tool(name="sdk_resolve_version")
+    async def sdk_resolve_version_constraint(spec: str) -> Dict[str, Any]:
+        """Pick the best version of an SDK candidate for a constraint without installing it.
+        
+        Examples: "java@21 vendor=tem", "gradle@^8", "kotlin", "latest-lts",
+        "java@>=17,<22 installed=true", "java@21.0.2-tem". Pre-releases (ea, rc, ...) are
+        skipped unless prerelease=true. Returns the chosen identifier and runners-up.
+        
+        Args:
+            spec: Constraint as candidate[@range] followed by vendor=, installed= or prerelease= filters
+        """
+        logger.info(f"Resolving {spec}")
+        return await _commands().resolve_version(spec)
+    
+    @tool(name="sdk_refresh_metadata")
+    async def sdk_refresh_metadata_snapshot(
+            candidates: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Refresh the offline snapshot of SDK candidate and version lists.
+        
+        Only candidates whose published versions or local installs changed are listed
+        again. The list tools fall back to this snapshot when SDKMAN is offline.
+        
+        Args:
+            candidates: Candidates to refresh (Optional, defaults to every candidate in the snapshot)
+        """
+        logger.info("Refreshing the metadata snapshot")
+        return await _commands().refresh_metadata_snapshot(candidates)
+    
+    @tool()
+    async def sdk_current_all(format: str = "raw") -> Dict[str, Any]:
+        """Show current versions of all installed SDKs.
+        
+        Args:
+            format: "raw" (default, SDKMAN's text), "compact" (one "candidate version" line
+                per SDK in use) or "json" (an object mapping candidates to versions)
+        """
         logger.info("Getting current versions for all SDKs")
-        return sdk_current()
+        return await _commands().sdk_current(format)
     
-    @server.tool()
-    def sdk_current_version(candidate: str) -> Dict[str, Any]:
+    @tool()
+    async def sdk_current_version(candidate: str, format: str = "raw") -> Dict[str, Any]:
         """Show the current version of a specific SDK candidate.
         
         Args:
             candidate: Name of the SDK candidate (e.g., java, gradle, kotlin)
+            format: "raw" (default, SDKMAN's text), "compact" (just the version, or "none")
+                or "json" (candidate and version, null when none is in use)
         """
         logger.info(f"Getting current version for {candidate}")
-        return sdk_current_candidate(candidate)
+        return await _commands().sdk_current_candidate(candidate, format)
     
-    @server.tool()
-    def sdk_install_version(candidate: str, version: Optional[str] = None, path: Optional[str] = None) -> Dict[str, Any]:
+    @tool()
+    async def sdk_install_version(candidate: str, version: Optional[str] = None, path: Optional[str] = None,
+                                  background: bool = True, *, ctx: Context) -> Dict[str, Any]:
         """Install a specific version of an SDK candidate.
         
+        By default the install runs as a background job and a job ID is returned at
+        once; follow it with sdk_job_status or sdk_job_wait.
+        
         Args:
             candidate: Name of the SDK candidate (e.g., java, gradle, kotlin)
             version: Version to install (Optional, installs latest stable if not specified)
             path: Path to local installation (Optional, for local installations)
+            background: Run as a background job (default true); false waits and streams progress
         """
         logger.info(f"Installing {candidate} {version or 'latest'} {path or ''}")
-        return sdk_install(candidate, version, path)
+        if background:
+            return await _commands().submit_job(
+                "install", candidate=candidate, version=version, path=path
+            )
+        on_output = _progress_reporter(ctx)
+        return await _commands().sdk_install(candidate, version, path, on_output=on_output)
+    
+    @tool(name="sdk_install_resolved")
+    async def sdk_install_resolved_version(spec: str, background: bool = True, *,
+                                           ctx: Context) -> Dict[str, Any]:
+        """Install the best version matching a constraint, e.g. "java@21 vendor=tem".
+        
+        The constraint is resolved as in sdk_resolve_version; nothing is installed when the
+        chosen version already is. The resolution is returned with the install result.
+        
+        Args:
+            spec: Constraint as candidate[@range] followed by vendor=, installed= or prerelease= filters
+            background: Run the install as a background job (default true)
+        """
+        logger.info(f"Installing the best match for {spec}")
+        on_output = None if background else _progress_reporter(ctx)
+        return await _commands().sdk_install_resolved(spec, background, on_output=on_output)
     
-    @server.tool()
-    def sdk_uninstall_version(candidate: str, version: str) -> Dict[str, Any]:
+    @tool(name="sdk_install_many")
+    async def sdk_install_batch(items: List[Dict[str, str]], max_parallel: int = 4) -> Dict[str, Any]:
+        """Install several SDK candidates in parallel, e.g. to provision a build agent.
+        
+        Versions of the same candidate are installed one after another; different
+        candidates run concurrently. Returns per-item results, timings and total time.
+        
+        Args:
+            items: List of {"candidate": ..., "version": ...} objects; version is optional
+            max_parallel: Maximum number of candidates installed at the same time (default 4)
+        """
+        pairs = [(item["candidate"], item.get("version") or None) for item in items]
+        logger.info(f"Installing {len(pairs)} SDKs with up to {max_parallel} in parallel")
+        return await _commands().sdk_install_many(pairs, max_parallel)
+    
+    @tool(name="sdk_prefetch")
+    async def sdk_prefetch_archives(items: List[Dict[str, str]], max_parallel: int = 4) -> Dict[str, Any]:
+        """Download SDK archives into the local archive cache without installing them.
+        
+        A later install of the same version is served from the cache instead of the network.
+        
+        Args:
+            items: List of {"candidate": ..., "version": ...} objects with exact versions
+            max_parallel: Maximum number of downloads at the same time (default 4)
+        """
+        pairs = [(item["candidate"], item["version"]) for item in items]
+        logger.info(f"Prefetching {len(pairs)} SDK archives")
+        return await _commands().sdk_prefetch(pairs, max_parallel)
+    
+    @tool()
+    async def sdk_uninstall_version(candidate: str, version: str) -> Dict[str, Any]:
         """Uninstall a specific version of an SDK candidate.
         
         Args:
@@ -80,10 +363,10 @@ def create_server() -> FastMCP:
             version: Version to uninstall
         """
         logger.info(f"Uninstalling {candidate} {version}")
-        return sdk_uninstall(candidate, version)
+        return await _commands().sdk_uninstall(candidate, version)
     
-    @server.tool()
-    def sdk_use_version(candidate: str, version: str) -> Dict[str, Any]:
+    @tool()
+    async def sdk_use_version(candidate: str, version: str) -> Dict[str, Any]:
         """Use a specific version of an SDK candidate in the current shell.
         
         Args:
@@ -91,10 +374,10 @@ def create_server() -> FastMCP:
             version: Version to use
         """
         logger.info(f"Using {candidate} {version}")
-        return sdk_use(candidate, version)
+        return await _commands().sdk_use(candidate, version)
     
-    @server.tool()
-    def sdk_set_default(candidate: str, version: str) -> Dict[str, Any]:
+    @tool()
+    async def sdk_set_default(candidate: str, version: str) -> Dict[str, Any]:
         """Set the default version of an SDK candidate.
         
         Args:
@@ -102,10 +385,10 @@ def create_server() -> FastMCP:
             version: Version to set as default
         """
         logger.info(f"Setting default {candidate} to {version}")
-        return sdk_default(candidate, version)
+        return await _commands().sdk_default(candidate, version)
     
-    @server.tool()
-    def sdk_get_home(candidate: str, version: str) -> Dict[str, Any]:
+    @tool()
+    async def sdk_get_home(candidate: str, version: str) -> Dict[str, Any]:
         """Get the home directory of a specific version of an SDK candidate.
         
         Args:
@@ -113,91 +396,231 @@ def create_server() -> FastMCP:
             version: Version to get home directory for
         """
         logger.info(f"Getting home directory for {candidate} {version}")
-        return sdk_home(candidate, version)
+        return await _commands().sdk_home(candidate, version)
     
-    @server.tool()
-    def sdk_manage_env(action: Optional[str] = None) -> Dict[str, Any]:
+    @tool()
+    async def sdk_manage_env(action: Optional[str] = None, *, ctx: Context) -> Dict[str, Any]:
         """Manage the .sdkmanrc file for the current directory.
         
         Args:
             action: Action to perform, can be 'init', 'install', or 'clear'
         """
         logger.info(f"Managing .sdkmanrc with action: {action or 'none'}")
-        return sdk_env(action)
+        on_output = _progress_reporter(ctx) if action == "install" else None
+        return await _commands().sdk_env(action, on_output=on_output)
     
-    @server.tool()
-    def sdk_check_upgrade(candidate: Optional[str] = None) -> Dict[str, Any]:
+    @tool(name="sdk_env_scan")
+    async def sdk_env_scan_tree(path: str, install: bool = True, max_parallel: int = 4,
+                                max_depth: Optional[int] = None) -> Dict[str, Any]:
+        """Find every .sdkmanrc under a directory tree, e.g. a monorepo, and install the
+        SDKs they require that are not installed yet.
+        
+        Returns a per-directory report with the status of each required SDK (present,
+        installed, missing or failed). Each distinct version is installed only once.
+        
+        Args:
+            path: Directory to scan
+            install: Install missing SDKs (default true); false only reports them
+            max_parallel: Maximum number of candidates installed at the same time (default 4)
+            max_depth: How many directory levels below path to scan (Optional, no limit by default)
+        """
+        logger.info(f"Scanning {path} for .sdkmanrc files")
+        return await _commands().sdk_env_scan(path, install, max_parallel, max_depth)
+    
+    @tool()
+    async def sdk_resolve_env(sdks: Optional[List[str]] = None, sdkmanrc: Optional[str] = None,
+                              format: str = "json") -> Dict[str, Any]:
+        """Compute the environment (JAVA_HOME, GRADLE_HOME, ... and PATH) for a set of
+        installed SDKs, so build steps can use it without initialising SDKMAN in a shell.
+        
+        Unlike sdk_use_version, which only affects a throwaway shell, the result can be
+        applied by the caller: "export" returns shell lines to eval or source, and
+        "json" returns the variables and the bin directories to put first on PATH.
+        With neither sdks nor sdkmanrc, every candidate's current version is used.
+        
+        Args:
+            sdks: SDKs as candidate, candidate@version or candidate=version, where version is
+                an installed identifier, current or a constraint such as 21 (Optional)
+            sdkmanrc: A .sdkmanrc file, or a directory containing one, to take SDKs from (Optional)
+            format: "json" (default) or "export"
+        """
+        logger.info(f"Resolving environment for {sdks or sdkmanrc or 'current versions'}")
+        return await _commands().sdk_resolve_env(sdks, sdkmanrc, format)
+    
+    @tool()
+    async def sdk_disk_usage(candidate: Optional[str] = None) -> Dict[str, Any]:
+        """Show how much disk each installed SDK version uses, largest first.
+        
+        Each version reports its size, the bytes uninstalling it would free (files
+        hard-linked with other versions are shared), whether it is current and how many
+        days ago it was last used.
+        
+        Args:
+            candidate: Name of the SDK candidate (Optional, all candidates if not specified)
+        """
+        logger.info(f"Measuring disk usage of {candidate or 'all candidates'}")
+        return await _commands().sdk_disk_usage(candidate)
+    
+    @tool()
+    async def sdk_gc(keep: int = 1, sdkmanrc: Optional[List[str]] = None,
+                     candidate: Optional[str] = None, dry_run: bool = True) -> Dict[str, Any]:
+        """Uninstall SDK versions that nothing needs, to free disk space.
+        
+        Current versions, versions named in the given .sdkmanrc files and the `keep`
+        latest versions of each candidate (of each distribution for Java) are kept.
+        By default only lists what would be removed and how many bytes that frees.
+        
+        Args:
+            keep: Latest versions to keep per candidate or Java distribution (default 1)
+            sdkmanrc: .sdkmanrc files, or directories to search for them, whose versions are kept
+            candidate: Only collect this candidate (Optional, all candidates if not specified)
+            dry_run: Only report what would be removed (default true)
+        """
+        logger.info(f"Collecting unused versions of {candidate or 'all candidates'}")
+        return await _commands().sdk_gc(keep, sdkmanrc, candidate, dry_run)
+    
+    @tool()
+    async def sdk_dedup(candidate: Optional[str] = None, method: Optional[str] = None,
+                        dry_run: bool = False) -> Dict[str, Any]:
+        """Free disk space by making identical files in installed SDK versions share storage,
+        e.g. the many unchanged files of 21.0.1-tem and 21.0.2-tem.
+        
+        Only files that are new or changed since the last pass are read. Reports the
+        number of files replaced and the bytes reclaimed per candidate.
+        
+        Args:
+            candidate: Name of the SDK candidate (Optional, all candidates if not specified)
+            method: "auto" (reflinks; without reflink support only reports what could be
+                merged), "reflink" or "hardlink" (opt-in read-only hard links: an in-place
+                edit as root then changes every linked version)
+            dry_run: Only report what would be replaced (default false)
+        """
+        logger.info(f"Deduplicating {candidate or 'all candidates'}")
+        return await _commands().sdk_dedup(candidate, method, dry_run)
+    
+    @tool()
+    async def sdk_check_upgrade(candidate: Optional[str] = None, background: bool = True,
+                                *, ctx: Context) -> Dict[str, Any]:
         """Check for available upgrades or upgrade a specific candidate.
         
+        By default this runs as a background job and a job ID is returned at once;
+        follow it with sdk_job_status or sdk_job_wait.
+        
         Args:
             candidate: Name of the SDK candidate to upgrade (Optional, checks all if not specified)
+            background: Run as a background job (default true); false waits and streams progress
         """
         logger.info(f"Checking upgrades for {candidate or 'all candidates'}")
-        return sdk_upgrade(candidate)
+        if background:
+            return await _commands().submit_job("upgrade", candidate=candidate)
+        on_output = _progress_reporter(ctx)
+        return await _commands().sdk_upgrade(candidate, on_output=on_output)
+    
+    @tool()
+    async def sdk_job_status(job_id: Optional[str] = None, limit: int = 20) -> Dict[str, Any]:
+        """Show the state, progress, captured output and timings of a background job.
+        
+        Args:
+            job_id: Job ID returned when the job was submitted (Optional, lists recent jobs if not specified)
+            limit: Maximum number of jobs to list when no job_id is given (default 20)
+        """
+        logger.info(f"Getting status of job {job_id or '(recent jobs)'}")
+        return await _commands().job_status(job_id, limit)
     
-    @server.tool()
-    def sdk_get_version() -> Dict[str, Any]:
+    @tool()
+    async def sdk_job_wait(job_id: str, timeout: float = 60) -> Dict[str, Any]:
+        """Wait for a background job to finish and return its final state and output.
+        
+        Returns the current state if the job is still running when the timeout passes.
+        
+        Args:
+            job_id: Job ID returned when the job was submitted
+            timeout: Maximum number of seconds to wait (default 60)
+        """
+        logger.info(f"Waiting for job {job_id}")
+        return await _commands().job_wait(job_id, timeout)
+    
+    @tool()
+    async def sdk_job_cancel(job_id: str) -> Dict[str, Any]:
+        """Cancel a queued background job or stop a running one.
+        
+        Args:
+            job_id: Job ID returned when the job was submitted
+        """
+        logger.info(f"Cancelling job {job_id}")
+        return await _commands().job_cancel(job_id)
+    
+    @tool()
+    async def sdk_get_version() -> Dict[str, Any]:
         """Display the SDKMAN version."""
         logger.info("Getting SDKMAN version")
-        return sdk_version()
+        return await _commands().sdk_version()
     
-    @server.tool()
-    def sdk_set_offline(mode: str) -> Dict[str, Any]:
+    @tool()
+    async def sdk_set_offline(mode: str) -> Dict[str, Any]:
         """Enable or disable offline mode.
         
         Args:
             mode: Must be 'enable' or 'disable'
         """
         logger.info(f"Setting offline mode to {mode}")
-        return sdk_offline(mode)
+        return await _commands().sdk_offline(mode)
     
-    @server.tool()
-    def sdk_self_update(force: bool = False) -> Dict[str, Any]:
+    @tool()
+    async def sdk_self_update(force: bool = False, background: bool = True,
+                              *, ctx: Context) -> Dict[str, Any]:
         """Update SDKMAN itself.
         
+        By default the update runs as a background job and a job ID is returned at
+        once; follow it with sdk_job_status or sdk_job_wait.
+        
         Args:
             force: Force update even if there is no new version available
+            background: Run as a background job (default true); false waits and streams progress
         """
         logger.info(f"Updating SDKMAN {'with force' if force else ''}")
-        return sdk_selfupdate(force)
+        if background:
+            return await _commands().submit_job("selfupdate", force=force)
+        on_output = _progress_reporter(ctx)
+        return await _commands().sdk_selfupdate(force, on_output=on_output)
     
-    @server.tool()
-    def sdk_update_candidates() -> Dict[str, Any]:
+    @tool()
+    async def sdk_update_candidates() -> Dict[str, Any]:
         """Update SDKMAN candidates."""
         logger.info("Updating SDKMAN candidates")
-        return sdk_update()
+        return await _commands().sdk_update()
     
-    @server.tool()
-    def sdk_flush_state(mode: Optional[str] = None) -> Dict[str, Any]:
+    @tool()
+    async def sdk_flush_state(mode: Optional[str] = None) -> Dict[str, Any]:
         """Flush SDKMAN local state.
         
         Args:
             mode: What to flush, can be 'tmp', 'metadata', or 'version'. Flushes all if not specified.
         """
         logger.info(f"Flushing SDKMAN state: {mode or 'all'}")
-        return sdk_flush(mode)
+        return await _commands().sdk_flush(mode)
     
-    @server.tool()
-    def sdk_get_help(command: Optional[str] = None) -> Dict[str, Any]:
+    @tool()
+    async def sdk_get_help(command: Optional[str] = None) -> Dict[str, Any]:
         """Get help about SDKMAN or a specific command.
         
         Args:
             command: Command to get help for (Optional, shows general help if not specified)
         """
         logger.info(f"Getting help for {command or 'SDKMAN'}")
-        return sdk_help(command)
+        return await _commands().sdk_help(command)
     
-    @server.tool()
-    def sdk_edit_config() -> Dict[str, Any]:
+    @tool()
+    async def sdk_edit_config() -> Dict[str, Any]:
         """Edit the SDKMAN configuration."""
         logger.info("Editing SDKMAN configuration")
-        return sdk_config()
+        return await _commands().sdk_config()
     
     # Add resource for SDKMAN version - useful for basic connectivity testing
     @server.resource("sdkman://version")
-    def get_sdkman_version() -> str:
+    async def get_sdkman_version() -> str:
         """Get SDKMAN version information."""
-        result = sdk_version()
+        result = await _commands().sdk_version()
         if result["success"]:
             return result["data"]
         else:
@@ -205,9 +628,9 @@ def create_server() -> FastMCP:
     
     # Add resource for current SDKs
     @server.resource("sdkman://current")
-    def get_current_sdks() -> str:
+    async def get_current_sdks() -> str:
         """Get information about currently active SDKs."""
-        result = sdk_current()
+        result = await _commands().sdk_current()
         if result["success"]:
             return result["data"]
         else:
@@ -215,12 +638,48 @@ def create_server() -> FastMCP:
     
     # Add resource for candidate versions
     @server.resource("sdkman://candidates/{candidate}")
-    def get_candidate_versions(candidate: str) -> str:
+    async def get_candidate_versions(candidate: str) -> str:
         """Get available versions for a specific candidate."""
-        result = sdk_list_candidate(candidate)
+        result = await _commands().sdk_list_candidate(candidate)
         if result["success"]:
             return result["data"]
         else:
             return f"Error getting versions for {candidate}: {result.get('error', 'Unknown error')}"
     
+    # Add resource for cache statistics, used to tune SDKMAN_MCP_LIST_CACHE_TTL and the archive cache
+    @server.resource("sdkman://cache")
+    async def get_cache_stats() -> str:
+        """Get statistics of the list, archive and disk usage caches, memoised environments,
+        dedup index, snapshot and watcher."""
+        _commands()
+        from .sdk_commands import (
+            list_cache_stats, archive_cache_stats, disk_usage_stats, environment_stats,
+            dedup_stats, snapshot_stats, watcher_stats
+        )
+        return json.dumps({
+            "list_cache": list_cache_stats(),
+            "archive_cache": archive_cache_stats(),
+            "disk_usage": disk_usage_stats(),
+            "environments": environment_stats(),
+            "dedup": dedup_stats(),
+            "snapshot": snapshot_stats(),
+            "watcher": watcher_stats()
+        }, indent=2)
+    
+    # Add resources for per-tool and per-command metrics
+    @server.resource("sdkman://metrics")
+    async def get_metrics() -> str:
+        """Get call counts, errors, latency percentiles and output sizes of tools and commands."""
+        _commands()
+        from .sdk_commands import coalescing_stats, lock_stats, job_stats
+        return json.dumps(dict(
+            metrics.snapshot(), coalescing=coalescing_stats(), locks=lock_stats(),
+            jobs=job_stats()
+        ), indent=2)
+    
+    @server.resource("sdkman://metrics/prometheus", mime_type="text/plain")
+    async def get_prometheus_metrics() -> str:
+        """Get the tool and command metrics in Prometheus text exposition format."""
+        return metrics.prometheus()
+    
     return server 
\ No newline at end of file
@@ -0,0 +1,77 @@
+"""
+Single-Flight Module
+
+This module lets concurrent callers asking for the same key share one execution:
+the first caller runs the function, later callers wait for and receive its result.
+"""
+
+import threading
+from typing import Any, Callable, Dict, Generic, Hashable, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class _Call(Generic[T]):
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self) -> None:
+        self.event = threading.Event()
+        self.result: Optional[T] = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight(Generic[T]):
+    """Thread-safe request coalescing keyed by an arbitrary hashable value.
+
+    Only calls that overlap in time are shared; nothing is cached once the leading
+    call has returned.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call[T]] = {}
+        self._stats = {"executed": 0, "coalesced": 0}
+
+    def do(self, key: Hashable, func: Callable[[], T]) -> Tuple[T, bool]:
+        """Run func for key, or wait for the run already in flight.
+
+        Returns the result and whether it was shared from another caller's run. An
+        exception raised by the leading run is raised in every waiting caller too.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self._stats["coalesced"] += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                self._stats["executed"] += 1
+                leader = True
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True  # type: ignore[return-value]
+
+        try:
+            call.result = func()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+        return call.result, False
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            executed, coalesced = self._stats["executed"], self._stats["coalesced"]
+            total = executed + coalesced
+            return {
+                "executed": executed,
+                "coalesced": coalesced,
+                "in_flight": len(self._calls),
+                "coalesced_rate": round(coalesced / total, 4) if total else 0.0,
+            }
@@ -0,0 +1,148 @@
+"""
+Metadata Snapshot Module
+
+This module keeps an on-disk SQLite snapshot of `sdk list` output per candidate, so
+list and query tools can answer instantly and keep working when SDKMAN cannot reach
+its API or is in offline mode.
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS listings (
+    candidate TEXT PRIMARY KEY,
+    output TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    refreshed_at REAL NOT NULL,
+    checked_at REAL NOT NULL,
+    dirty INTEGER NOT NULL DEFAULT 0
+)
+"""
+
+
+class SnapshotEntry(NamedTuple):
+    candidate: str
+    output: str
+    fingerprint: str
+    refreshed_at: float
+    checked_at: float
+    dirty: bool
+
+    @property
+    def age(self) -> float:
+        """Seconds since the entry was last confirmed to match SDKMAN."""
+        return max(0.0, time.time() - self.checked_at)
+
+
+class MetadataSnapshot:
+    """SQLite-backed store of `sdk list` output keyed by candidate ("" for `sdk list`).
+
+    An entry's fingerprint summarises the remote version list and the local install
+    state it was taken with, so a refresh can skip candidates that have not changed.
+    """
+
+    def __init__(self, path: str):
+        self.path = os.path.expanduser(path)
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+            # WAL 允许多个服务器进程同时读写同一个快照
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(_SCHEMA)
+            connection.commit()
+            self._connection = connection
+        return self._connection
+
+    def get(self, candidate: str) -> Optional[SnapshotEntry]:
+        try:
+            with self._lock:
+                row = self._connect().execute(
+                    "SELECT candidate, output, fingerprint, refreshed_at, checked_at, dirty "
+                    "FROM listings WHERE candidate = ?",
+                    (candidate,),
+                ).fetchone()
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"Failed to read metadata snapshot {self.path}: {str(e)}")
+            return None
+        if row is None:
+            return None
+        return SnapshotEntry(row[0], row[1], row[2], row[3], row[4], bool(row[5]))
+
+    def put(self, candidate: str, output: str, fingerprint: str) -> None:
+        now = time.time()
+        try:
+            with self._lock:
+                connection = self._connect()
+                connection.execute(
+                    "INSERT OR REPLACE INTO listings "
+                    "(candidate, output, fingerprint, refreshed_at, checked_at, dirty) "
+                    "VALUES (?, ?, ?, ?, ?, 0)",
+                    (candidate, output, fingerprint, now, now),
+                )
+                connection.commit()
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"Failed to write metadata snapshot {self.path}: {str(e)}")
+
+    def touch(self, candidate: str, fingerprint: str) -> None:
+        """Record that an unchanged entry was checked against SDKMAN just now."""
+        self._update(
+            "UPDATE listings SET checked_at = ?, fingerprint = ? WHERE candidate = ?",
+            (time.time(), fingerprint, candidate),
+        )
+
+    def mark_dirty(self, candidate: Optional[str] = None) -> None:
+        """Flag entries to be re-listed before they are served again; all when candidate is None."""
+        if candidate is None:
+            self._update("UPDATE listings SET dirty = 1", ())
+        else:
+            self._update("UPDATE listings SET dirty = 1 WHERE candidate = ?", (candidate,))
+
+    def _update(self, statement: str, parameters: tuple) -> None:
+        try:
+            with self._lock:
+                connection = self._connect()
+                connection.execute(statement, parameters)
+                connection.commit()
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"Failed to update metadata snapshot {self.path}: {str(e)}")
+
+    def candidates(self) -> List[str]:
+        try:
+            with self._lock:
+                rows = self._connect().execute("SELECT candidate FROM listings").fetchall()
+        except (sqlite3.Error, OSError):
+            return []
+        return [row[0] for row in rows]
+
+    def stats(self) -> Dict[str, Any]:
+        try:
+            with self._lock:
+                rows = self._connect().execute(
+                    "SELECT candidate, checked_at, dirty FROM listings"
+                ).fetchall()
+        except (sqlite3.Error, OSError) as e:
+            return {"path": self.path, "error": str(e)}
+        now = time.time()
+        return {
+            "path": self.path,
+            "entries": len(rows),
+            "dirty": sum(1 for row in rows if row[2]),
+            "oldest_age_seconds": round(max((now - row[1] for row in rows), default=0.0), 1),
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
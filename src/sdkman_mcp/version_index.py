@@ -0,0 +1,139 @@
+"""
+Version Index Module
+
+This module turns `sdk list <candidate>` output into a compact, pre-indexed structure
+so version filters can be answered without re-parsing the table on every call.
+"""
+
+import re
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+# 状态列中被视为"已安装"的取值
+INSTALLED_STATUSES = ("installed", "local only")
+
+_MAJOR_PATTERN = re.compile(r"\d+")
+
+
+def _major_of(version: str) -> str:
+    match = _MAJOR_PATTERN.match(version)
+    return match.group(0) if match else ""
+
+
+class VersionRecord:
+    """One row of `sdk list <candidate>` output."""
+
+    __slots__ = ("vendor", "use", "version", "dist", "status", "identifier", "major")
+
+    def __init__(
+        self, vendor: str, use: bool, version: str, dist: str, status: str, identifier: str
+    ):
+        self.vendor = vendor
+        self.use = use
+        self.version = version
+        self.dist = dist
+        self.status = status
+        self.identifier = identifier
+        self.major = _major_of(version)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "VersionRecord":
+        return cls(
+            data["vendor"],
+            data["use"],
+            data["version"],
+            data["dist"],
+            data["status"],
+            data["identifier"],
+        )
+
+    @property
+    def installed(self) -> bool:
+        return self.status in INSTALLED_STATUSES
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "vendor": self.vendor,
+            "use": self.use,
+            "version": self.version,
+            "dist": self.dist,
+            "status": self.status,
+            "identifier": self.identifier,
+        }
+
+    def __repr__(self) -> str:
+        return f"VersionRecord({self.identifier!r}, vendor={self.vendor!r}, status={self.status!r})"
+
+
+class VersionIndex:
+    """Version records of one candidate with lookup maps by identifier, vendor, dist,
+    major version and status.
+
+    The maps hold positions into `records`, so query results keep SDKMAN's ordering.
+    """
+
+    def __init__(self, records: Iterable[VersionRecord]):
+        self.records: List[VersionRecord] = list(records)
+        self.by_identifier: Dict[str, VersionRecord] = {}
+        self._by_vendor: Dict[str, List[int]] = {}
+        self._by_dist: Dict[str, List[int]] = {}
+        self._by_major: Dict[str, List[int]] = {}
+        self._by_status: Dict[str, List[int]] = {}
+        self.current: Optional[VersionRecord] = None
+
+        for position, record in enumerate(self.records):
+            self.by_identifier.setdefault(record.identifier, record)
+            self._by_vendor.setdefault(record.vendor.lower(), []).append(position)
+            self._by_dist.setdefault(record.dist.lower(), []).append(position)
+            self._by_major.setdefault(record.major, []).append(position)
+            self._by_status.setdefault(record.status, []).append(position)
+            if record.use:
+                self.current = record
+
+    @classmethod
+    def from_parsed(cls, versions: Iterable[Dict[str, Any]]) -> "VersionIndex":
+        """Build an index from the dicts returned by parse_sdk_versions."""
+        return cls(VersionRecord.from_dict(data) for data in versions)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def get(self, identifier: str) -> Optional[VersionRecord]:
+        return self.by_identifier.get(identifier)
+
+    def vendors(self) -> List[str]:
+        return sorted({record.vendor for record in self.records if record.vendor})
+
+    def query(
+        self,
+        vendor: Optional[str] = None,
+        major: Optional[str] = None,
+        installed: Optional[bool] = None,
+        dist: Optional[str] = None,
+    ) -> List[VersionRecord]:
+        """Return the records matching every given filter, in list order.
+
+        `vendor` matches the vendor name or its dist code case-insensitively.
+        """
+        selections: List[Set[int]] = []
+        if vendor:
+            key = vendor.lower()
+            selections.append(set(self._by_vendor.get(key, ())) | set(self._by_dist.get(key, ())))
+        if dist:
+            selections.append(set(self._by_dist.get(dist.lower(), ())))
+        if major is not None and str(major) != "":
+            selections.append(set(self._by_major.get(str(major), ())))
+        if installed is not None:
+            statuses = (
+                INSTALLED_STATUSES if installed
+                else [status for status in self._by_status if status not in INSTALLED_STATUSES]
+            )
+            positions: Set[int] = set()
+            for status in statuses:
+                positions.update(self._by_status.get(status, ()))
+            selections.append(positions)
+
+        if not selections:
+            return list(self.records)
+        selections.sort(key=len)
+        matched = selections[0].intersection(*selections[1:])
+        return [self.records[position] for position in sorted(matched)]
@@ -0,0 +1,287 @@
+"""
+SDKMAN Watcher Module
+
+This module watches an SDKMAN installation for changes made outside the server, such
+as `sdk install` or `sdk default` run by hand in a shell, and reports which candidates
+changed. On Linux it uses inotify; elsewhere, or when inotify is unavailable, it
+compares `stat` results at a fixed interval.
+
+Only the candidates directory, each candidate's directory (its version directories and
+the `current` link), `etc/config` and a few files in `var` are watched; the contents of
+installed SDKs are not.
+"""
+
+import ctypes
+import ctypes.util
+import errno
+import logging
+import os
+import select
+import struct
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# var 中影响候选列表与平台判断的文件；delay_upgrade、broadcast 等每天都会变，不算变更
+VAR_FILES = {"candidates", "platform", "version", "version_native"}
+# 一批文件系统事件在安静这么久之后才合并上报
+DEBOUNCE_SECONDS = 0.2
+
+# 回调参数：发生变化的候选集合，以及是否整体变化（配置、候选列表或事件溢出）
+ChangeCallback = Callable[[Set[str], bool], None]
+
+_IN_MODIFY = 0x00000002
+_IN_ATTRIB = 0x00000004
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_DELETE_SELF = 0x00000400
+_IN_MOVE_SELF = 0x00000800
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ONLYDIR = 0x01000000
+_IN_ISDIR = 0x40000000
+_ENTRY_EVENTS = _IN_CREATE | _IN_DELETE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_ATTRIB
+_FILE_EVENTS = _ENTRY_EVENTS | _IN_CLOSE_WRITE | _IN_MODIFY
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+def _load_inotify() -> Optional[Any]:
+    """Return libc when it provides inotify, else None."""
+    if not hasattr(os, "O_CLOEXEC"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+
+class SdkmanWatcher:
+    """Watch an SDKMAN directory in a daemon thread and report changes to a callback.
+
+    `mode` is "auto" (inotify when available, else polling), "inotify" or "poll";
+    `interval` is the polling period in seconds.
+    """
+
+    def __init__(self, sdkman_dir: str, on_change: ChangeCallback,
+                 mode: str = "auto", interval: float = 2.0):
+        self.sdkman_dir = sdkman_dir
+        self.candidates_dir = os.path.join(sdkman_dir, "candidates")
+        self.config_path = os.path.join(sdkman_dir, "etc", "config")
+        self.var_dir = os.path.join(sdkman_dir, "var")
+        self._on_change = on_change
+        self._mode = mode
+        self._interval = max(0.1, interval)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.backend: Optional[str] = None
+        self._fd: Optional[int] = None
+        self._libc: Optional[Any] = None
+        # inotify 监视描述符 -> (类型, 候选名)
+        self._watches: Dict[int, Tuple[str, str]] = {}
+        self._changes = 0
+        self._batches = 0
+        self._last_change: Optional[float] = None
+
+    def start(self) -> str:
+        """Start watching and return the backend in use ("inotify" or "poll")."""
+        if self._thread is not None:
+            return self.backend or ""
+        if self._mode in ("auto", "inotify"):
+            try:
+                self._start_inotify()
+                self.backend = "inotify"
+            except OSError as e:
+                if self._mode == "inotify":
+                    raise
+                logger.info(f"inotify unavailable, polling SDKMAN for changes: {str(e)}")
+        if self.backend is None:
+            self.backend = "poll"
+        target = self._inotify_loop if self.backend == "inotify" else self._poll_loop
+        self._thread = threading.Thread(target=target, name="sdkman-watcher", daemon=True)
+        self._thread.start()
+        return self.backend
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend,
+            "watches": len(self._watches) if self.backend == "inotify" else None,
+            "changes": self._changes,
+            "batches": self._batches,
+            "last_change_age": (
+                round(time.time() - self._last_change, 1) if self._last_change else None
+            ),
+        }
+
+    def _emit(self, candidates: Set[str], everything: bool) -> None:
+        self._changes += len(candidates) + int(everything)
+        self._batches += 1
+        self._last_change = time.time()
+        try:
+            self._on_change(candidates, everything)
+        except Exception as e:
+            logger.warning(f"SDKMAN change handler failed: {str(e)}")
+
+    # inotify
+
+    def _start_inotify(self) -> None:
+        libc = _load_inotify()
+        if libc is None:
+            raise OSError(errno.ENOSYS, "inotify is not available on this platform")
+        if not os.path.isdir(self.candidates_dir):
+            raise OSError(errno.ENOENT, f"{self.candidates_dir} does not exist")
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            code = ctypes.get_errno()
+            raise OSError(code, os.strerror(code))
+        self._libc, self._fd = libc, fd
+        try:
+            self._add_watch(self.candidates_dir, _ENTRY_EVENTS | _IN_ONLYDIR, ("candidates", ""))
+            for name in os.listdir(self.candidates_dir):
+                self._watch_candidate(name)
+            for directory, kind in ((os.path.dirname(self.config_path), "etc"),
+                                    (self.var_dir, "var")):
+                if os.path.isdir(directory):
+                    self._add_watch(directory, _FILE_EVENTS | _IN_ONLYDIR, (kind, ""))
+        except OSError:
+            os.close(fd)
+            self._fd = None
+            raise
+
+    def _add_watch(self, path: str, mask: int, target: Tuple[str, str]) -> None:
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), mask)
+        if wd < 0:
+            code = ctypes.get_errno()
+            raise OSError(code, os.strerror(code), path)
+        self._watches[wd] = target
+
+    def _watch_candidate(self, name: str) -> None:
+        path = os.path.join(self.candidates_dir, name)
+        if not os.path.isdir(path) or os.path.islink(path):
+            return
+        try:
+            self._add_watch(path, _ENTRY_EVENTS | _IN_DELETE_SELF | _IN_MOVE_SELF | _IN_ONLYDIR,
+                            ("candidate", name))
+        except OSError as e:
+            # 候选目录可能刚被删除，或超出 max_user_watches
+            logger.debug(f"Cannot watch {path}: {str(e)}")
+
+    def _inotify_loop(self) -> None:
+        candidates: Set[str] = set()
+        everything = False
+        pending_since: Optional[float] = None
+        while not self._stop.is_set():
+            timeout = DEBOUNCE_SECONDS if pending_since is not None else 1.0
+            try:
+                readable, _, _ = select.select([self._fd], [], [], timeout)
+            except (OSError, ValueError):
+                return
+            if readable:
+                try:
+                    data = os.read(self._fd, 64 * 1024)
+                except BlockingIOError:
+                    data = b""
+                except OSError:
+                    return
+                if data:
+                    changed, overflow = self._read_events(data)
+                    candidates |= changed
+                    everything = everything or overflow
+                    pending_since = time.monotonic()
+                    continue
+            # 事件停止后再统一上报，一次 install 只触发一批通知
+            if pending_since is not None and (
+                    time.monotonic() - pending_since >= DEBOUNCE_SECONDS):
+                if candidates or everything:
+                    self._emit(candidates, everything)
+                candidates, everything, pending_since = set(), False, None
+
+    def _read_events(self, data: bytes) -> Tuple[Set[str], bool]:
+        changed: Set[str] = set()
+        everything = False
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+            offset += length
+            if mask & _IN_Q_OVERFLOW:
+                everything = True
+                continue
+            kind, candidate = self._watches.get(wd, ("", ""))
+            if mask & _IN_IGNORED:
+                self._watches.pop(wd, None)
+                continue
+            if kind == "candidates" and name:
+                changed.add(name)
+                if mask & (_IN_CREATE | _IN_MOVED_TO) and mask & _IN_ISDIR:
+                    self._watch_candidate(name)
+            elif kind == "candidate":
+                changed.add(candidate)
+            elif kind == "etc" and name == os.path.basename(self.config_path):
+                everything = True
+            elif kind == "var" and name in VAR_FILES:
+                everything = True
+        return changed, everything
+
+    # 轮询
+
+    def _poll_state(self) -> Tuple[Dict[str, Any], Any, Dict[str, Any]]:
+        """Stat everything that is watched: per-candidate directory mtime and current
+        link target, the config file, and the watched var files."""
+        candidates: Dict[str, Any] = {}
+        try:
+            with os.scandir(self.candidates_dir) as entries:
+                for entry in entries:
+                    try:
+                        if not entry.is_dir(follow_symlinks=False):
+                            continue
+                        mtime = entry.stat(follow_symlinks=False).st_mtime_ns
+                        try:
+                            current = os.readlink(os.path.join(entry.path, "current"))
+                        except OSError:
+                            current = None
+                        candidates[entry.name] = (mtime, current)
+                    except OSError:
+                        continue
+        except OSError:
+            pass
+        config = self._stat(self.config_path)
+        var = {name: self._stat(os.path.join(self.var_dir, name)) for name in VAR_FILES}
+        return candidates, config, var
+
+    @staticmethod
+    def _stat(path: str) -> Optional[Tuple[int, int]]:
+        try:
+            result = os.stat(path)
+        except OSError:
+            return None
+        return result.st_mtime_ns, result.st_size
+
+    def _poll_loop(self) -> None:
+        candidates, config, var = self._poll_state()
+        while not self._stop.wait(self._interval):
+            new_candidates, new_config, new_var = self._poll_state()
+            changed = {
+                name for name in candidates.keys() | new_candidates.keys()
+                if candidates.get(name) != new_candidates.get(name)
+            }
+            everything = new_config != config or new_var != var
+            if changed or everything:
+                self._emit(changed, everything)
+            candidates, config, var = new_candidates, new_config, new_var
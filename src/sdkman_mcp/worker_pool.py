@@ -0,0 +1,405 @@
+"""
+Bash Worker Pool Module
+
+This module keeps a pool of long-lived bash processes that have already sourced
+sdkman-init.sh, so SDKMAN commands no longer pay for a fresh shell on every call.
+"""
+
+import logging
+import os
+import re
+import secrets
+import selectors
+import shlex
+import signal
+import subprocess
+import threading
+import time
+from typing import Dict, List, Optional, Tuple, Any
+
+from .output import BoundedOutput, OutputLimits
+from .progress import LineBuffer, OutputCallback, emit_lines
+
+logger = logging.getLogger(__name__)
+
+# 每条命令结束后，worker 会在 stdout/stderr 上各写一个结束帧，格式为
+#   stdout: \x1e<token>:<returncode>\x1e
+#   stderr: \x1e<token>\x1e
+# token 每条命令随机生成，避免与命令输出冲突
+FRAME_SEPARATOR = b"\x1e"
+STARTUP_TIMEOUT = 30.0
+READ_CHUNK_SIZE = 65536
+
+
+class WorkerError(Exception):
+    """Raised when a worker process dies or breaks the framing protocol."""
+
+
+class WorkerStartupError(WorkerError):
+    """Raised when a worker cannot be started or fails to source the init script."""
+
+
+class CommandTimeout(WorkerError):
+    """Raised when a command does not finish within its timeout."""
+
+    def __init__(self, message: str, stdout: str = "", stderr: str = ""):
+        super().__init__(message)
+        self.stdout = stdout
+        self.stderr = stderr
+
+
+class BashWorker:
+    """A single bash process with sdkman-init.sh sourced, driven over stdin/stdout."""
+
+    def __init__(self, init_script: str, startup_timeout: float = STARTUP_TIMEOUT,
+                 env: Optional[Dict[str, str]] = None, limits: Optional[OutputLimits] = None):
+        self.init_script = init_script
+        self.limits = limits
+        self.commands_run = 0
+        self.generation = 0
+        self.started_at = time.monotonic()
+        self.last_used = self.started_at
+        # 启动耗时拆分为 bash 进程创建与 source 初始化脚本两部分
+        self.spawn_seconds = 0.0
+        self.init_seconds = 0.0
+        started = time.perf_counter()
+        try:
+            self._process = subprocess.Popen(
+                ["/bin/bash", "--noprofile", "--norc"],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                env=env,
+                start_new_session=True,  # 便于超时时整组杀掉子进程
+            )
+        except OSError as e:
+            raise WorkerStartupError(f"Failed to start bash worker: {str(e)}") from e
+        self.spawn_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        try:
+            returncode, _, stderr = self._execute(
+                f"source {shlex.quote(init_script)} >/dev/null", startup_timeout
+            )
+            self.init_seconds = time.perf_counter() - started
+        except WorkerError as e:
+            self.close()
+            raise WorkerStartupError(f"Bash worker failed during startup: {str(e)}") from e
+        if returncode != 0:
+            self.close()
+            raise WorkerStartupError(
+                f"Failed to source {init_script} (exit {returncode}): {stderr.strip()}"
+            )
+
+    @property
+    def pid(self) -> int:
+        return self._process.pid
+
+    def is_alive(self) -> bool:
+        return self._process.poll() is None
+
+    def ping(self, timeout: float = 5.0) -> bool:
+        """Check that the worker still answers framed commands."""
+        try:
+            returncode, _, _ = self._execute(":", timeout)
+        except WorkerError:
+            return False
+        return returncode == 0
+
+    def run(
+        self,
+        cmd: List[str],
+        timeout: Optional[float] = None,
+        on_output: Optional[OutputCallback] = None,
+    ) -> Tuple[int, str, str]:
+        """Run `sdk <cmd>` in a subshell so `sdk use` and friends cannot leak state."""
+        args = " ".join(shlex.quote(arg) for arg in cmd)
+        self.commands_run += 1
+        try:
+            return self._execute(f"( sdk {args} ) </dev/null", timeout, on_output)
+        finally:
+            self.last_used = time.monotonic()
+
+    def _execute(
+        self, script: str, timeout: Optional[float], on_output: Optional[OutputCallback] = None
+    ) -> Tuple[int, str, str]:
+        token = secrets.token_hex(8)
+        payload = (
+            f"{script}\n"
+            f"__sdkman_mcp_rc=$?\n"
+            f"printf '\\036{token}:%d\\036' \"$__sdkman_mcp_rc\"\n"
+            f"printf '\\036{token}\\036' >&2\n"
+        )
+        try:
+            self._process.stdin.write(payload.encode("utf-8"))
+            self._process.stdin.flush()
+        except (BrokenPipeError, OSError) as e:
+            raise WorkerError(f"Worker {self.pid} is not accepting commands: {str(e)}") from e
+        return self._read_frames(token.encode("ascii"), timeout, on_output)
+
+    def _read_frames(
+        self, token: bytes, timeout: Optional[float], on_output: Optional[OutputCallback] = None
+    ) -> Tuple[int, str, str]:
+        stdout_end = re.compile(
+            re.escape(FRAME_SEPARATOR + token) + rb":(-?\d+)" + re.escape(FRAME_SEPARATOR)
+        )
+        stderr_end = FRAME_SEPARATOR + token + FRAME_SEPARATOR
+        # 结束帧可能被拆在两次读取之间，缓冲区末尾这么多字节暂不交给输出
+        frame_margin = len(stderr_end) + 24
+        stdout_fd = self._process.stdout.fileno()
+        stderr_fd = self._process.stderr.fileno()
+        names = {stdout_fd: "stdout", stderr_fd: "stderr"}
+        buffers = {stdout_fd: bytearray(), stderr_fd: bytearray()}
+        outputs = {fd: BoundedOutput(name, self.limits) for fd, name in names.items()}
+        line_buffers = {stdout_fd: LineBuffer(), stderr_fd: LineBuffer()}
+        returncode: Optional[int] = None
+        deadline = time.monotonic() + timeout if timeout else None
+
+        with selectors.DefaultSelector() as selector:
+            selector.register(stdout_fd, selectors.EVENT_READ)
+            selector.register(stderr_fd, selectors.EVENT_READ)
+            while selector.get_map():
+                remaining = None
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        # 命令尚未结束，缓冲区中剩余的都是它的输出
+                        for fd in selector.get_map():
+                            outputs[fd].write(bytes(buffers[fd]))
+                            outputs[fd].close()
+                        raise CommandTimeout(
+                            f"Command timed out after {timeout}s",
+                            outputs[stdout_fd].getvalue(),
+                            outputs[stderr_fd].getvalue(),
+                        )
+                for key, _ in selector.select(remaining):
+                    fd = key.fd
+                    chunk = os.read(fd, READ_CHUNK_SIZE)
+                    if not chunk:
+                        for output in outputs.values():
+                            output.close()
+                        raise WorkerError(f"Worker {self.pid} exited unexpectedly")
+                    buffer = buffers[fd]
+                    buffer.extend(chunk)
+                    end = -1
+                    if fd == stdout_fd:
+                        match = stdout_end.search(buffer)
+                        if match:
+                            returncode = int(match.group(1))
+                            end = match.start()
+                    else:
+                        end = buffer.find(stderr_end)
+                    finished = end >= 0
+                    if not finished:
+                        end = max(0, len(buffer) - frame_margin)
+                    data = outputs[fd].write(bytes(buffer[:end]))
+                    if finished:
+                        selector.unregister(fd)
+                        data += outputs[fd].close()
+                        buffer.clear()
+                    else:
+                        del buffer[:end]
+                    if on_output is not None:
+                        emit_lines(on_output, names[fd], line_buffers[fd].feed(data))
+                        if finished:
+                            emit_lines(on_output, names[fd], line_buffers[fd].flush())
+
+        return (
+            returncode if returncode is not None else 1,
+            outputs[stdout_fd].getvalue(),
+            outputs[stderr_fd].getvalue(),
+        )
+
+    def close(self) -> None:
+        """Terminate the worker and anything it spawned."""
+        if self._process.poll() is None:
+            try:
+                os.killpg(self._process.pid, signal.SIGKILL)
+            except (ProcessLookupError, PermissionError):
+                self._process.kill()
+        for stream in (self._process.stdin, self._process.stdout, self._process.stderr):
+            try:
+                stream.close()
+            except OSError:
+                pass
+        self._process.wait()
+
+
+class BashWorkerPool:
+    """A bounded, thread-safe pool of BashWorker processes.
+
+    Workers are started lazily, health-checked when they have been idle for a while,
+    and recycled after `max_commands` commands, on a crash or on a timeout. `env`, when
+    given, is the environment of the bash processes (e.g. a different SDKMAN_DIR), and
+    `limits` bounds and filters the output captured from each command.
+    """
+
+    def __init__(
+        self,
+        init_script: str,
+        size: int = 2,
+        max_commands: int = 200,
+        command_timeout: Optional[float] = None,
+        health_check_interval: float = 30.0,
+        startup_retry_interval: float = 30.0,
+        env: Optional[Dict[str, str]] = None,
+        limits: Optional[OutputLimits] = None,
+    ):
+        self.init_script = init_script
+        self.env = env
+        self.limits = limits
+        self.size = max(1, size)
+        self.max_commands = max_commands
+        self.command_timeout = command_timeout
+        self.health_check_interval = health_check_interval
+        self.startup_retry_interval = startup_retry_interval
+        self._idle: List[BashWorker] = []
+        self._total = 0
+        self._closed = False
+        self._startup_failed_at: Optional[float] = None
+        self._generation = 0
+        self._condition = threading.Condition()
+        self._stats = {"commands": 0, "started": 0, "recycled": 0, "crashed": 0, "timeouts": 0}
+
+    def run(
+        self,
+        cmd: List[str],
+        timeout: Optional[float] = None,
+        on_output: Optional[OutputCallback] = None,
+        timings: Optional[Dict[str, float]] = None,
+    ) -> Tuple[int, str, str]:
+        """Run an SDKMAN command on a warm worker and return (returncode, stdout, stderr).
+
+        When `on_output` is given it is called with each line as the command prints it.
+        When `timings` is given it receives the seconds spent waiting for a worker
+        ("wait"), executing the command ("exec") and, if a worker had to be started for
+        it, starting bash ("spawn") and sourcing the init script ("init").
+
+        Raises WorkerStartupError if no worker can be started, so callers can fall back
+        to a one-shot shell.
+        """
+        timeout = timeout if timeout is not None else self.command_timeout
+        started = time.perf_counter()
+        worker = self._acquire()
+        if timings is not None:
+            waited = time.perf_counter() - started
+            if worker.commands_run == 0:
+                timings["spawn"] = worker.spawn_seconds
+                timings["init"] = worker.init_seconds
+                waited -= worker.spawn_seconds + worker.init_seconds
+            timings["wait"] = max(0.0, waited)
+        healthy = True
+        started = time.perf_counter()
+        try:
+            return worker.run(cmd, timeout, on_output)
+        except CommandTimeout as e:
+            healthy = False
+            self._bump("timeouts")
+            logger.warning(f"Command {cmd} timed out on worker {worker.pid}, recycling it")
+            return 124, e.stdout, e.stderr or str(e)
+        except WorkerError as e:
+            healthy = False
+            self._bump("crashed")
+            logger.error(f"Worker {worker.pid} failed while running {cmd}: {str(e)}")
+            return 1, "", str(e)
+        finally:
+            if timings is not None:
+                timings["exec"] = time.perf_counter() - started
+            self._bump("commands")
+            self._release(worker, healthy)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._condition:
+            return dict(self._stats, size=self.size, live=self._total, idle=len(self._idle))
+
+    def recycle(self) -> None:
+        """Replace every worker once it is next idle, e.g. after `sdk selfupdate`."""
+        with self._condition:
+            self._generation += 1
+            idle, self._idle = self._idle, []
+            self._total -= len(idle)
+            self._stats["recycled"] += len(idle)
+            self._condition.notify_all()
+        for worker in idle:
+            worker.close()
+
+    def close(self) -> None:
+        with self._condition:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._total -= len(idle)
+            self._condition.notify_all()
+        for worker in idle:
+            worker.close()
+
+    def _bump(self, key: str) -> None:
+        with self._condition:
+            self._stats[key] += 1
+
+    def _acquire(self) -> BashWorker:
+        while True:
+            worker = None
+            with self._condition:
+                if self._closed:
+                    raise WorkerStartupError("Worker pool is closed")
+                if self._idle:
+                    worker = self._idle.pop()
+                elif self._total < self.size:
+                    if (
+                        self._startup_failed_at is not None
+                        and time.monotonic() - self._startup_failed_at < self.startup_retry_interval
+                    ):
+                        raise WorkerStartupError("Bash workers recently failed to start")
+                    self._total += 1
+                    break
+                else:
+                    self._condition.wait()
+                    continue
+            # 健康检查可能需要 ping，放在锁外进行
+            if self._is_healthy(worker):
+                return worker
+            with self._condition:
+                self._total -= 1
+                self._stats["recycled"] += 1
+                self._condition.notify()
+            worker.close()
+
+        try:
+            worker = BashWorker(self.init_script, env=self.env, limits=self.limits)
+            worker.generation = self._generation
+        except WorkerStartupError:
+            with self._condition:
+                self._total -= 1
+                self._startup_failed_at = time.monotonic()
+                self._condition.notify()
+            raise
+        with self._condition:
+            self._startup_failed_at = None
+            self._stats["started"] += 1
+        logger.debug(f"Started bash worker {worker.pid}")
+        return worker
+
+    def _is_healthy(self, worker: BashWorker) -> bool:
+        if not worker.is_alive() or worker.generation != self._generation:
+            return False
+        if time.monotonic() - worker.last_used > self.health_check_interval:
+            return worker.ping()
+        return True
+
+    def _release(self, worker: BashWorker, healthy: bool) -> None:
+        recycle = (
+            not healthy
+            or not worker.is_alive()
+            or worker.generation != self._generation
+            or worker.commands_run >= self.max_commands
+        )
+        with self._condition:
+            if recycle or self._closed:
+                self._total -= 1
+                if healthy:
+                    self._stats["recycled"] += 1
+            else:
+                self._idle.append(worker)
+            self._condition.notify()
+        if recycle or self._closed:
+            worker.close()
@@ -0,0 +1,31 @@
+"""
+测试共用的环境
+
+sdkman_mcp 在导入时读取配置，所以在收集任何测试之前先生成合成的 SDKMAN_DIR
+（与基准测试相同的 stub），并把所有缓存、日志与锁放进临时目录，测试不会触碰
+用户真实的 ~/.sdkman 或 ~/.cache/sdkman-mcp。
+"""
+
+import atexit
+import os
+import shutil
+import tempfile
+
+from fake_sdkman import build_fake_sdkman
+
+TEST_ROOT = tempfile.mkdtemp(prefix="sdkman-mcp-tests-")
+atexit.register(shutil.rmtree, TEST_ROOT, True)
+
+SDKMAN_DIR = build_fake_sdkman(TEST_ROOT)
+os.environ.update({
+    "SDKMAN_DIR": SDKMAN_DIR,
+    "SDKMAN_MCP_ARCHIVE_CACHE_DIR": os.path.join(TEST_ROOT, "archives"),
+    "SDKMAN_MCP_SNAPSHOT_PATH": "",
+    "SDKMAN_MCP_SNAPSHOT_REFRESH_INTERVAL": "0",
+    "SDKMAN_MCP_JOB_JOURNAL": "",
+    "SDKMAN_MCP_DEDUP_INDEX": "",
+    "SDKMAN_MCP_LOCK_DIR": os.path.join(TEST_ROOT, "locks"),
+    "SDKMAN_MCP_OUTPUT_SPILL_DIR": os.path.join(TEST_ROOT, "output"),
+    "SDKMAN_MCP_WATCH": "off",
+    "SDKMAN_CANDIDATES_API": "http://127.0.0.1:9",
+})
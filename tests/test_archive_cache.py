@@ -0,0 +1,182 @@
+import hashlib
+import io
+import os
+import tarfile
+import zipfile
+
+import pytest
+
+from fake_sdkman import FakeBroker
+from sdkman_mcp import sdk_commands
+from sdkman_mcp.archive_cache import ArchiveCache, ArchiveCacheError, archive_key
+
+
+@pytest.fixture
+def broker():
+    broker = FakeBroker()
+    yield broker
+    broker.stop()
+
+
+@pytest.fixture
+def cache(tmp_path, broker, monkeypatch):
+    cache = ArchiveCache(str(tmp_path / "archives"), 0)
+    monkeypatch.setattr(sdk_commands, "_archive_cache", cache)
+    monkeypatch.setattr(sdk_commands, "SDKMAN_CANDIDATES_API", broker.start())
+    return cache
+
+
+def _files(directory):
+    return sorted(
+        os.path.relpath(os.path.join(path, name), directory)
+        for path, _, names in os.walk(directory) for name in names
+    )
+
+
+def test_prefetch_verifies_checksum_and_stores(cache, broker):
+    data = broker.add("kotlin", "1.9.22")
+
+    result = sdk_commands.sdk_prefetch([("kotlin", "1.9.22")])
+    assert result["success"], result
+    entry = result["data"]["results"][0]
+    assert entry["status"] == "downloaded"
+    assert entry["digest"] == hashlib.sha256(data).hexdigest()
+    assert entry["bytes"] == len(data)
+    assert broker.requests == ["/broker/download/kotlin/1.9.22/linuxx64"]
+
+    path = cache.lookup(archive_key("kotlin", "1.9.22", "linuxx64"))
+    with open(path, "rb") as f:
+        assert f.read() == data
+    # 缓存中的对象只读，避免通过硬链接被改写
+    assert not os.stat(path).st_mode & 0o222
+
+
+def test_prefetch_hit_skips_download(cache, broker):
+    broker.add("maven", "3.9.6")
+    assert sdk_commands.sdk_prefetch([("maven", "3.9.6")])["success"]
+
+    result = sdk_commands.sdk_prefetch([("maven", "3.9.6"), ("maven", "3.9.6")])
+    assert result["success"]
+    assert [entry["status"] for entry in result["data"]["results"]] == ["cached"]
+    assert len(broker.requests) == 1
+    stats = cache.stats()
+    assert stats["downloaded"] == 1 and stats["archives"] == 1
+
+
+def test_prefetch_rejects_corrupt_download(cache, broker):
+    broker.add("gradle", "8.6")
+    broker.corrupt.add(("gradle", "8.6"))
+
+    result = sdk_commands.sdk_prefetch([("gradle", "8.6")])
+    assert not result["success"]
+    entry = result["data"]["results"][0]
+    assert entry["status"] == "failed"
+    assert "Checksum mismatch" in entry["error"]
+    # 校验失败的下载不留下对象、引用或临时文件
+    assert _files(cache.directory) == []
+    assert cache.lookup(archive_key("gradle", "8.6", "linuxx64")) is None
+
+    broker.corrupt.clear()
+    assert sdk_commands.sdk_prefetch([("gradle", "8.6")])["success"]
+
+
+def test_prefetch_missing_archive_fails(cache, broker):
+    result = sdk_commands.sdk_prefetch([("scala", "0.0.0")])
+    assert not result["success"]
+    assert result["data"]["failed"] == 1
+    assert _files(cache.directory) == []
+
+
+def test_prefetch_repacks_tarball(cache, broker):
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as tar:
+        content = b"#!/bin/sh\n"
+        info = tarfile.TarInfo("scala-3.3.1/bin/scala")
+        # mtime 为 0 的成员（可复现构建）早于 zip 能表示的最早时间
+        info.size, info.mode, info.mtime = len(content), 0o755, 0
+        tar.addfile(info, io.BytesIO(content))
+    broker.add("scala", "3.3.1", buffer.getvalue())
+
+    assert sdk_commands.sdk_prefetch([("scala", "3.3.1")])["success"]
+    path = cache.lookup(archive_key("scala", "3.3.1", "linuxx64"))
+    with zipfile.ZipFile(path) as archive:
+        assert archive.read("scala-3.3.1/bin/scala") == content
+        assert archive.getinfo("scala-3.3.1/bin/scala").external_attr >> 16 & 0o777 == 0o755
+
+
+def test_install_stages_prefetched_archive(cache, broker):
+    data = broker.add("kotlin", "1.9.21")
+    assert sdk_commands.sdk_prefetch([("kotlin", "1.9.21")])["success"]
+
+    target = sdk_commands._sdkman_archive_path("kotlin", "1.9.21")
+    try:
+        assert sdk_commands._stage_cached_archive("kotlin", "1.9.21")
+        with open(target, "rb") as f:
+            assert f.read() == data
+        # 放入 tmp/ 的是可写的副本，不与只读的缓存对象共用 inode
+        objects = [name for name in _files(cache.directory) if name.startswith("objects")]
+        staged, cached = os.stat(target), os.stat(os.path.join(cache.directory, objects[0]))
+        assert staged.st_mode & 0o200 and staged.st_ino != cached.st_ino
+        # 已存在的归档不会被覆盖
+        assert not sdk_commands._stage_cached_archive("kotlin", "1.9.21")
+    finally:
+        os.unlink(target)
+    assert cache.stats()["hits"] == 1
+
+
+def test_store_leaves_sdkman_archive_writable(cache):
+    source = sdk_commands._sdkman_archive_path("maven", "3.9.5")
+    os.makedirs(os.path.dirname(source), exist_ok=True)
+    with open(source, "wb") as f:
+        f.write(b"maven archive")
+    try:
+        sdk_commands._store_installed_archive("maven", "3.9.5")
+        path = cache.lookup(archive_key("maven", "3.9.5", "linuxx64"))
+        # 缓存保存副本，SDKMAN 自己的文件保持可写
+        assert os.stat(source).st_mode & 0o200
+        assert os.stat(source).st_ino != os.stat(path).st_ino
+        assert not os.stat(path).st_mode & 0o222
+    finally:
+        os.unlink(source)
+
+
+def test_lookup_ignores_utime_permission_error(tmp_path, monkeypatch):
+    cache = ArchiveCache(str(tmp_path / "archives"), 0)
+    source = tmp_path / "archive"
+    source.write_bytes(b"data")
+    cache.store("java-21-linuxx64", str(source))
+
+    def denied(path, *args, **kwargs):
+        raise PermissionError(1, "Operation not permitted", path)
+
+    # 共享卷上的对象属于其他用户时无法更新 mtime，但仍是命中
+    monkeypatch.setattr(os, "utime", denied)
+    assert cache.lookup("java-21-linuxx64") is not None
+    cache.store("java-21-linuxx64", str(source))
+    monkeypatch.undo()
+
+    os.unlink(cache.lookup("java-21-linuxx64"))
+    assert cache.lookup("java-21-linuxx64") is None
+    assert cache.stats()["hits"] == 2 and cache.stats()["misses"] == 1
+
+
+def test_download_error_is_archive_cache_error(tmp_path):
+    cache = ArchiveCache(str(tmp_path), 0)
+    with pytest.raises(ArchiveCacheError):
+        cache.download("java-21-linuxx64", "http://127.0.0.1:9/broker/download/java/21/linuxx64")
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = ArchiveCache(str(tmp_path / "archives"), 0)
+    for position, name in enumerate(("a", "b", "c")):
+        source = tmp_path / name
+        source.write_bytes(name.encode() * 100)
+        cache.store(name, str(source))
+        os.utime(cache.lookup(name), (position + 1, position + 1))
+    # 访问 a 刷新其 mtime，b 成为最久未使用的
+    assert cache.lookup("a") is not None
+    cache.max_bytes = 250
+    assert cache.evict() == 1
+    assert cache.lookup("b") is None
+    assert cache.lookup("a") is not None and cache.lookup("c") is not None
+    assert cache.stats()["evicted"] == 1
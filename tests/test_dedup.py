@@ -0,0 +1,133 @@
+import os
+import pathlib
+import shutil
+
+import pytest
+
+from sdkman_mcp import dedup, sdk_commands
+from sdkman_mcp.dedup import DedupIndex, Deduplicator
+from sdkman_mcp.disk_usage import DiskUsageScanner
+
+JDK_FILES = {
+    "lib/modules": b"m" * 65536,
+    "lib/security/cacerts": b"c" * 8192,
+    "conf/security/java.security": b"s" * 8192,
+    "bin/java": b"j" * 16384,
+}
+
+
+def _jdk(candidate_dir, version, files=JDK_FILES):
+    for relative, content in files.items():
+        path = candidate_dir / version / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(content)
+    return candidate_dir / version
+
+
+@pytest.fixture
+def java_dir(tmp_path):
+    candidate_dir = tmp_path / "java"
+    _jdk(candidate_dir, "21.0.1-tem")
+    _jdk(candidate_dir, "21.0.2-tem")
+    return candidate_dir
+
+
+def _inode(path):
+    return os.stat(path).st_ino
+
+
+def test_auto_without_reflinks_changes_nothing(java_dir, monkeypatch):
+    monkeypatch.setattr(dedup, "reflink_supported", lambda directory: False)
+    report = Deduplicator(None, "auto").run(str(java_dir))
+    assert report["method"] is None
+    assert report["dry_run"]
+    assert "method=hardlink" in report["note"]
+    assert report["duplicate_groups"] == 4
+    assert report["hardlinks"] == report["reflinks"] == 0
+    for relative in JDK_FILES:
+        assert _inode(java_dir / "21.0.1-tem" / relative) != _inode(
+            java_dir / "21.0.2-tem" / relative)
+
+
+def test_hardlink_skips_mutable_trees(java_dir):
+    report = Deduplicator(None, "hardlink").run(str(java_dir))
+    assert report["method"] == "hardlink"
+    assert report["hardlinks"] == 2
+    for relative in ("lib/modules", "bin/java"):
+        assert _inode(java_dir / "21.0.1-tem" / relative) == _inode(
+            java_dir / "21.0.2-tem" / relative)
+    for relative in ("lib/security/cacerts", "conf/security/java.security"):
+        assert _inode(java_dir / "21.0.1-tem" / relative) != _inode(
+            java_dir / "21.0.2-tem" / relative)
+    # 共享的文件是只读的
+    assert not os.stat(java_dir / "21.0.2-tem" / "lib" / "modules").st_mode & 0o222
+
+
+def test_dry_run_and_different_content(tmp_path):
+    candidate_dir = tmp_path / "gradle"
+    _jdk(candidate_dir, "8.5", {"lib/a.jar": b"a" * 8192, "lib/b.jar": b"b" * 8192})
+    _jdk(candidate_dir, "8.6", {"lib/a.jar": b"a" * 8192, "lib/b.jar": b"B" * 8192})
+    report = Deduplicator(None, "hardlink").run(str(candidate_dir), dry_run=True)
+    assert report["duplicate_groups"] == 1
+    assert report["replaced_files"] == 1
+    assert report["hardlinks"] == 0
+    assert _inode(candidate_dir / "8.5" / "lib" / "a.jar") != _inode(
+        candidate_dir / "8.6" / "lib" / "a.jar")
+
+
+def test_index_avoids_rehashing(java_dir, tmp_path):
+    index = DedupIndex(str(tmp_path / "dedup.sqlite"))
+    deduplicator = Deduplicator(index, "hardlink")
+    first = deduplicator.run(str(java_dir))
+    assert first["hashed_files"] > 0
+    _jdk(java_dir, "21.0.3-tem")
+    second = deduplicator.run(str(java_dir))
+    # 只需读取新版本中的文件
+    assert second["hashed_files"] == 2
+    assert second["hardlinks"] == 2
+    index.close()
+
+
+@pytest.fixture
+def installed_pair():
+    candidate_dir = pathlib.Path(sdk_commands.current_root().candidates_dir) / "dedupdemo"
+    files = {"lib/modules": b"m" * 204800, "bin/dedupdemo": b"#!/bin/sh\n"}
+    for version in ("1.0", "1.1"):
+        _jdk(candidate_dir, version, files)
+    yield candidate_dir
+    for path, _, names in os.walk(candidate_dir):
+        for name in names:
+            os.chmod(os.path.join(path, name), 0o644)
+    shutil.rmtree(candidate_dir)
+
+
+def _usage():
+    data = sdk_commands.sdk_disk_usage("dedupdemo")["data"]
+    return data["bytes"], {
+        version["version"]: version["unique_bytes"]
+        for version in data["candidates"][0]["versions"]
+    }
+
+
+def test_disk_usage_after_hardlink_dedup(installed_pair):
+    before_total, before = _usage()
+    assert before["1.0"] >= 204800 and before["1.1"] >= 204800
+
+    result = sdk_commands.sdk_dedup("dedupdemo", method="hardlink")
+    assert result["success"], result
+    assert result["data"]["replaced_files"] == 1
+
+    # 缓存的扫描结果必须与全新扫描一致
+    after_total, after = _usage()
+    fresh = DiskUsageScanner().scan(str(installed_pair.parent), ["dedupdemo"])
+    assert after_total == fresh["bytes"] < before_total
+    assert after == {
+        version["version"]: version["unique_bytes"]
+        for version in fresh["candidates"][0]["versions"]
+    }
+    assert after["1.0"] < 204800 and after["1.1"] < 204800
+
+    # 卸载其中一个版本后，另一个版本独占共享文件
+    assert sdk_commands.sdk_uninstall("dedupdemo", "1.0")["success"]
+    _, remaining = _usage()
+    assert remaining["1.1"] >= 204800
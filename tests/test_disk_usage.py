@@ -0,0 +1,86 @@
+import os
+import time
+
+from sdkman_mcp.disk_usage import DiskUsageScanner
+
+
+def _install(candidates_dir, candidate, version, size, age_days=None):
+    home = candidates_dir / candidate / version
+    (home / "bin").mkdir(parents=True)
+    (home / "lib").mkdir()
+    (home / "lib" / "modules").write_bytes(b"x" * size)
+    launcher = home / "bin" / candidate
+    launcher.write_text("#!/bin/sh\n")
+    if age_days is not None:
+        then = time.time() - age_days * 86400
+        for path in (launcher, home / "bin", home / "lib" / "modules", home / "lib", home):
+            os.utime(path, (then, then))
+    return home
+
+
+def _versions(report):
+    return {
+        (entry["candidate"], version["version"]): version
+        for entry in report["candidates"] for version in entry["versions"]
+    }
+
+
+def test_idle_days_survive_scanning(tmp_path):
+    _install(tmp_path, "java", "17.0.10-tem", 4096, age_days=90)
+    _install(tmp_path, "java", "21.0.2-tem", 4096)
+    scanner = DiskUsageScanner()
+    for _ in range(2):
+        versions = _versions(scanner.scan(str(tmp_path)))
+        assert 89.9 <= versions[("java", "17.0.10-tem")]["idle_days"] <= 90.1
+        assert versions[("java", "21.0.2-tem")]["idle_days"] < 1
+
+
+def test_current_and_sizes(tmp_path):
+    _install(tmp_path, "java", "17.0.10-tem", 8192)
+    _install(tmp_path, "java", "21.0.2-tem", 4096)
+    os.symlink(tmp_path / "java" / "21.0.2-tem", tmp_path / "java" / "current")
+    report = DiskUsageScanner().scan(str(tmp_path))
+    versions = _versions(report)
+    assert versions[("java", "21.0.2-tem")]["current"]
+    assert not versions[("java", "17.0.10-tem")]["current"]
+    assert versions[("java", "17.0.10-tem")]["bytes"] > versions[("java", "21.0.2-tem")]["bytes"]
+    assert report["bytes"] == sum(version["bytes"] for version in versions.values())
+
+
+def test_hard_links_are_counted_once(tmp_path):
+    old = _install(tmp_path, "java", "17.0.10-tem", 65536)
+    new = _install(tmp_path, "java", "21.0.2-tem", 4096)
+    os.unlink(new / "lib" / "modules")
+    os.link(old / "lib" / "modules", new / "lib" / "modules")
+    report = DiskUsageScanner().scan(str(tmp_path))
+    versions = _versions(report)
+    shared = os.stat(old / "lib" / "modules").st_blocks * 512
+    assert versions[("java", "17.0.10-tem")]["bytes"] >= shared
+    assert versions[("java", "21.0.2-tem")]["bytes"] >= shared
+    # 共享的文件不会因卸载其中一个版本而释放
+    assert versions[("java", "17.0.10-tem")]["unique_bytes"] < shared
+    assert report["bytes"] < sum(version["bytes"] for version in versions.values())
+
+
+def test_rescan_uses_cache_and_sees_changes(tmp_path):
+    _install(tmp_path, "gradle", "8.6", 4096)
+    scanner = DiskUsageScanner()
+    scanner.scan(str(tmp_path))
+    misses = scanner.stats()["misses"]
+    scanner.scan(str(tmp_path))
+    assert scanner.stats()["misses"] == misses
+    _install(tmp_path, "gradle", "8.5", 4096)
+    versions = _versions(scanner.scan(str(tmp_path)))
+    assert ("gradle", "8.5") in versions
+
+
+def test_invalidate_forgets_tree(tmp_path):
+    _install(tmp_path, "java", "17.0.10-tem", 4096)
+    _install(tmp_path, "gradle", "8.6", 4096)
+    scanner = DiskUsageScanner()
+    scanner.scan(str(tmp_path))
+    directories = scanner.stats()["directories"]
+    # 17.0.10-tem 及其 bin、lib 三个目录
+    assert scanner.invalidate(str(tmp_path / "java")) == 3
+    assert scanner.stats()["directories"] == directories - 3
+    assert scanner.invalidate(str(tmp_path / "jav")) == 0
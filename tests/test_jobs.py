@@ -0,0 +1,149 @@
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from sdkman_mcp import jobs
+from sdkman_mcp.jobs import JobQueue
+
+
+def _runner(calls):
+    def run(kind, params, on_output, handle):
+        calls.append((kind, params))
+        on_output("stdout", "Downloading: java 21.0.2-tem")
+        on_output("stdout", "######## 50.0%")
+        if params.get("block"):
+            cancelled = threading.Event()
+            handle.on_cancel(cancelled.set)
+            cancelled.wait(10)
+            return {"success": False, "error": "killed"}
+        return {"success": True, "data": "done"}
+    return run
+
+
+def _journal_job(path, job_id, owner, state=jobs.RUNNING, attempts=1):
+    connection = sqlite3.connect(path)
+    connection.execute(jobs._SCHEMA)
+    connection.execute(
+        "INSERT INTO jobs (id, kind, params, state, owner, attempts, submitted_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (job_id, "install", json.dumps({"candidate": "java"}), state, owner, attempts,
+         time.time()),
+    )
+    connection.commit()
+    connection.close()
+
+
+@pytest.fixture
+def journal(tmp_path):
+    return str(tmp_path / "jobs.sqlite")
+
+
+def test_submit_and_wait(journal):
+    calls = []
+    queue = JobQueue(_runner(calls), journal)
+    try:
+        job = queue.submit("install", {"candidate": "java"})
+        record = queue.wait(job["id"], timeout=10)
+    finally:
+        queue.close()
+    assert record["state"] == jobs.SUCCEEDED
+    assert record["progress"] == 50.0
+    assert record["output"] == "Downloading: java 21.0.2-tem\n"
+    assert record["attempts"] == 1
+    assert calls == [("install", {"candidate": "java"})]
+
+
+@pytest.mark.parametrize("owner", [
+    str(os.getpid()),                      # 旧版本写入的纯 PID
+    f"{os.getpid()}:-:0123abcd",           # 同一 PID 的上一个进程（如容器中的 PID 1）
+    "999999999:-:0123abcd",                # 已退出的进程
+    None,
+])
+def test_resumes_jobs_of_earlier_processes(journal, owner):
+    _journal_job(journal, "job1", owner)
+    calls = []
+    queue = JobQueue(_runner(calls), journal)
+    try:
+        queue.start()
+        record = queue.wait("job1", timeout=10)
+    finally:
+        queue.close()
+    assert record["state"] == jobs.SUCCEEDED
+    assert record["attempts"] == 2
+    assert calls == [("install", {"candidate": "java"})]
+
+
+def test_leaves_jobs_of_live_processes(journal):
+    other = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"])
+    try:
+        owner = f"{other.pid}:{jobs._start_time(other.pid) or '-'}:0123abcd"
+        _journal_job(journal, "job1", owner)
+        queue = JobQueue(_runner([]), journal)
+        queue.start()
+        assert queue.get("job1")["state"] == jobs.RUNNING
+        assert not queue.owns("job1")
+        queue.close()
+    finally:
+        other.kill()
+        other.wait()
+
+
+@pytest.mark.skipif(not os.path.exists("/proc/self/stat"), reason="needs /proc")
+def test_resumes_jobs_of_reused_pids(journal):
+    other = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"])
+    try:
+        # PID 相同但启动时间不同：原进程已退出，PID 被复用
+        _journal_job(journal, "job1", f"{other.pid}:1:0123abcd")
+        queue = JobQueue(_runner([]), journal)
+        queue.start()
+        record = queue.wait("job1", timeout=10)
+        queue.close()
+    finally:
+        other.kill()
+        other.wait()
+    assert record["state"] == jobs.SUCCEEDED
+
+
+def test_gives_up_after_max_attempts(journal):
+    _journal_job(journal, "job1", "999999999", attempts=jobs.MAX_ATTEMPTS)
+    queue = JobQueue(_runner([]), journal)
+    queue.start()
+    record = queue.get("job1")
+    queue.close()
+    assert record["state"] == jobs.FAILED
+    assert "Interrupted" in record["error"]
+
+
+def test_cancel_running_job(journal):
+    queue = JobQueue(_runner([]), journal, workers=1)
+    try:
+        job = queue.submit("install", {"block": True})
+        deadline = time.monotonic() + 10
+        while queue.get(job["id"])["state"] != jobs.RUNNING and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert queue.owns(job["id"])
+        queue.cancel(job["id"])
+        record = queue.wait(job["id"], timeout=10)
+    finally:
+        queue.close()
+    assert record["state"] == jobs.CANCELLED
+
+
+def test_cancel_queued_job(journal):
+    queue = JobQueue(_runner([]), journal, workers=1)
+    try:
+        blocker = queue.submit("install", {"block": True})
+        queued = queue.submit("install", {"candidate": "gradle"})
+        record = queue.cancel(queued["id"])
+        assert record["state"] == jobs.CANCELLED
+        assert record["error"] == "Cancelled before it started"
+        queue.cancel(blocker["id"])
+        queue.wait(blocker["id"], timeout=10)
+    finally:
+        queue.close()
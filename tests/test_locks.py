@@ -0,0 +1,148 @@
+import asyncio
+import os
+import threading
+import time
+
+import pytest
+
+from sdkman_mcp import async_commands, sdk_commands
+from sdkman_mcp.locks import LockManager, LockTimeout
+
+
+@pytest.fixture
+def manager(tmp_path):
+    return LockManager(str(tmp_path / "locks"), timeout=5)
+
+
+def _in_thread(func):
+    """Run func in a thread and return (thread, outcome list)."""
+    outcome = []
+
+    def run():
+        try:
+            outcome.append(func())
+        except Exception as e:
+            outcome.append(e)
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread, outcome
+
+
+def _hold_briefly(manager, *args, **kwargs):
+    with manager.hold(*args, **kwargs) as waited:
+        return waited
+
+
+def test_readers_share(manager):
+    with manager.hold("java"):
+        thread, outcome = _in_thread(lambda: _hold_briefly(manager, "java", timeout=1))
+        thread.join(2)
+    assert outcome and not isinstance(outcome[0], Exception)
+
+
+def test_writer_excludes_same_candidate_only(manager):
+    with manager.hold("java", exclusive=True):
+        thread, outcome = _in_thread(lambda: _hold_briefly(manager, "java", timeout=0.2))
+        thread.join(2)
+        assert isinstance(outcome[0], LockTimeout)
+        thread, outcome = _in_thread(
+            lambda: _hold_briefly(manager, "gradle", exclusive=True, timeout=0.2)
+        )
+        thread.join(2)
+        assert not isinstance(outcome[0], Exception)
+        assert manager.stats()["busy"] == ["global", "java"]
+    assert manager.stats()["timeouts"] == 1
+    assert manager.stats()["busy"] == []
+
+
+def test_global_exclusive_blocks_candidates(manager):
+    with manager.hold(global_exclusive=True):
+        thread, outcome = _in_thread(lambda: _hold_briefly(manager, "gradle", timeout=0.2))
+        thread.join(2)
+    assert isinstance(outcome[0], LockTimeout)
+
+
+def test_queued_writer_blocks_new_readers(manager):
+    with manager.hold("java"):
+        writer, written = _in_thread(lambda: _hold_briefly(manager, "java", exclusive=True))
+        deadline = time.monotonic() + 2
+        while manager._rwlock("java").idle or not manager._rwlock("java")._writers:
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+        # 写者排队后新的读者不能插队
+        reader, outcome = _in_thread(lambda: _hold_briefly(manager, "java", timeout=0.2))
+        reader.join(2)
+        assert isinstance(outcome[0], LockTimeout)
+    writer.join(2)
+    assert written and not isinstance(written[0], Exception)
+
+
+def test_waited_time_is_reported(manager):
+    held, release = threading.Event(), threading.Event()
+
+    def hold_then_release():
+        with manager.hold("java", exclusive=True):
+            held.set()
+            release.wait(2)
+
+    holder, _ = _in_thread(hold_then_release)
+    held.wait(2)
+    threading.Timer(0.1, release.set).start()
+    with manager.hold("java") as waited:
+        assert waited >= 0.05
+    holder.join(2)
+    assert manager.stats()["contended"] >= 1
+
+
+def test_lock_files_coordinate_managers(tmp_path):
+    # 两个管理器共用锁目录时通过 flock 互斥，与两个进程的情形相同
+    directory = str(tmp_path / "locks")
+    first, second = LockManager(directory), LockManager(directory)
+    with first.hold("java", exclusive=True):
+        with pytest.raises(LockTimeout, match="another process"):
+            with second.hold("java", timeout=0.2):
+                pass
+        with second.hold("gradle", timeout=0.2):
+            pass
+    with second.hold("java", exclusive=True, timeout=0.2):
+        pass
+    assert second.stats()["cross_process"]
+
+
+def test_lock_file_names_stay_in_directory(manager):
+    for name in ("java", "../../etc/passwd", "a b"):
+        path = manager._lock_path(name)
+        assert os.path.dirname(path) == manager.directory
+    assert os.path.basename(manager._lock_path("")) == "global.lock"
+
+
+def test_without_directory_locks_in_process_only():
+    manager = LockManager(None)
+    with manager.hold("java", exclusive=True):
+        pass
+    assert not manager.stats()["cross_process"]
+
+
+async def test_install_lock_does_not_stall_queries():
+    held, release = threading.Event(), threading.Event()
+
+    def install():
+        with sdk_commands._get_lock_manager().hold("java", True, False):
+            held.set()
+            release.wait(30)
+
+    installer, _ = _in_thread(install)
+    held.wait(2)
+    try:
+        for candidate in ("java", "gradle"):
+            sdk_commands._invalidate_list_cache(candidate)
+        # 比查询并发额度更多的读，既有正在安装的候选，也有其他候选
+        reads = [async_commands.sdk_list_candidate("java")
+                 for _ in range(async_commands.MAX_CONCURRENT_QUERIES)]
+        reads += [async_commands.sdk_list_candidate("gradle"), async_commands.sdk_version()]
+        results = await asyncio.wait_for(asyncio.gather(*reads), 10)
+        assert all(result["success"] for result in results)
+    finally:
+        release.set()
+        installer.join(5)
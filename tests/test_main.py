@@ -0,0 +1,22 @@
+import os
+import subprocess
+import sys
+
+
+def test_profile_startup_has_no_side_effects(tmp_path):
+    # 使用默认的缓存、任务日志与快照位置，确认性能分析不会创建它们
+    env = {
+        name: value for name, value in os.environ.items()
+        if not name.startswith("SDKMAN_MCP_") and name != "XDG_CACHE_HOME"
+    }
+    env["HOME"] = str(tmp_path)
+    src_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "src")
+    env["PYTHONPATH"] = src_dir
+    result = subprocess.run(
+        [sys.executable, "-m", "sdkman_mcp", "--profile-startup"],
+        env=env, capture_output=True, text=True, timeout=120, check=False,
+    )
+    # 超出启动预算时退出码为 1，这里只关心它没有崩溃
+    assert result.returncode in (0, 1), result.stderr
+    assert "first tool call (import command layer)" in result.stderr
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,159 @@
+import os
+
+import pytest
+
+from sdkman_mcp import sdk_commands
+from sdkman_mcp.output import parse_candidates
+from sdkman_mcp.version_index import VersionIndex
+
+# 按真实 SDKMAN 5.x 的 `sdk list` 输出整理（保留其列宽、图例与页脚）
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def _fixture(name):
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        return f.read()
+
+
+def _record(vendor, version, dist, status="", use=False, identifier=None):
+    return {
+        "vendor": vendor,
+        "use": use,
+        "version": version,
+        "dist": dist,
+        "status": status,
+        "identifier": identifier or f"{version}-{dist}",
+    }
+
+
+def test_java_table_records():
+    versions = sdk_commands.parse_sdk_versions(_fixture("list-java.txt"))
+    assert len(versions) == 45
+    assert versions[0] == _record("Corretto", "22.0.1", "amzn")
+    # 表头之后的第一行数据不能被当成供应商名
+    assert versions[1] == _record("Corretto", "21.0.3", "amzn")
+    assert _record("Temurin", "21.0.3", "tem", "installed", use=True) in versions
+    assert _record("Temurin", "17.0.11", "tem", "installed") in versions
+    assert versions[-1] == _record(
+        "Unclassified", "jdk-21-dev", "none", "local only", identifier="jdk-21-dev"
+    )
+
+
+def test_java_vendor_comes_from_first_column():
+    versions = sdk_commands.parse_sdk_versions(_fixture("list-java.txt"))
+    vendors = {}
+    for version in versions:
+        vendors.setdefault(version["dist"], set()).add(version["vendor"])
+    # "GraalVM Oracle|" 的供应商名占满整列，紧贴分隔符
+    assert vendors["graal"] == {"GraalVM Oracle"}
+    assert vendors["graalce"] == {"GraalVM CE"}
+    assert vendors["nik"] == {"Liberica NIK"}
+    assert vendors["librca"] == {"Liberica"}
+    assert all(len(names) == 1 for names in vendors.values())
+
+
+def test_java_search_and_index():
+    versions = sdk_commands.parse_sdk_versions(_fixture("list-java.txt"), "21.0.3")
+    assert {version["version"] for version in versions} == {"21.0.3", "21.0.3.fx"}
+
+    index = VersionIndex.from_parsed(
+        sdk_commands.iter_sdk_versions(iter(_fixture("list-java.txt").splitlines(True)))
+    )
+    assert index.current.identifier == "21.0.3-tem"
+    assert [record.identifier for record in index.records if record.installed] == [
+        "21.0.3-tem", "17.0.11-tem", "jdk-21-dev"
+    ]
+    assert index.get("22.1.0.1.r17-gln").vendor == "Gluon"
+
+
+def test_gradle_grid_records():
+    versions = sdk_commands.parse_sdk_versions(_fixture("list-gradle.txt"))
+    assert len(versions) == 44
+    # 网格按行读取，标记只作用于紧随其后的版本
+    assert [version["version"] for version in versions[:5]] == [
+        "8.8-rc-1", "8.0.1", "7.0.2", "6.4", "8.7"
+    ]
+    by_version = {version["version"]: version for version in versions}
+    assert by_version["8.6"] == _record("", "8.6", "", "installed", use=True, identifier="8.6")
+    assert by_version["7.6.2"]["status"] == "installed"
+    assert not by_version["7.6.2"]["use"]
+    assert by_version["8.0-local"]["status"] == "local only"
+    assert by_version["7.6.4"] == _record("", "7.6.4", "", identifier="7.6.4")
+    # 图例中的 "+ - local version" 等行不是版本
+    assert "-" not in by_version and "local" not in by_version
+
+
+@pytest.mark.parametrize("search, expected", [
+    ("1.9.2", ["1.9.24", "1.9.23", "1.9.22", "1.9.21", "1.9.20"]),
+    ("2.", ["2.0.0"]),
+])
+def test_kotlin_grid_search(search, expected):
+    versions = sdk_commands.parse_sdk_versions(_fixture("list-kotlin.txt"), search)
+    assert [version["version"] for version in versions] == expected
+
+
+def test_kotlin_grid_current():
+    versions = sdk_commands.parse_sdk_versions(_fixture("list-kotlin.txt"))
+    assert len(versions) == 22
+    assert [version["version"] for version in versions if version["use"]] == ["1.9.24"]
+
+
+def test_candidate_overview():
+    candidates = parse_candidates(_fixture("list.txt"))
+    assert [item["candidate"] for item in candidates] == ["activemq", "gradle", "java", "kotlin"]
+    assert candidates[0] == {
+        "candidate": "activemq",
+        "name": "Apache ActiveMQ (Classic)",
+        "version": "5.17.1",
+        "url": "https://activemq.apache.org/",
+    }
+    assert candidates[2]["version"] == "21.0.3-tem"
+
+
+def test_find_sdk_version_streams_under_lock(monkeypatch):
+    processes, recorded = [], []
+    monkeypatch.setattr(
+        sdk_commands.metrics, "record_command",
+        lambda name, mode, returncode, *args: recorded.append((name, mode, returncode)),
+    )
+    sdk_commands._invalidate_list_cache("java")
+
+    with sdk_commands._on_process_start(processes.append):
+        versions = sdk_commands.stream_sdk_versions("java", "21")
+        first = next(versions)
+        assert first["identifier"] == "21.0.2-amzn"
+        # 读取期间持有全局共享锁，命令仍在运行
+        assert sdk_commands._get_lock_manager().stats()["busy"] == ["global"]
+        assert processes[0].poll() is None
+        versions.close()
+
+    # 提前停止会结束 shell 并释放锁，不写入列表缓存
+    assert processes[0].poll() is not None
+    assert sdk_commands._get_lock_manager().stats()["busy"] == []
+    assert recorded == [("list", "stream", 0)]
+    assert sdk_commands.current_root().list_cache.get("java") is None
+
+    found = sdk_commands.find_sdk_version(
+        "java", lambda v: v["dist"] == "tem" and v["status"] == "installed", "21"
+    )
+    assert found["identifier"] == "21.0.2-tem"
+    assert found["vendor"] == "Temurin"
+    assert len(processes) == 1
+
+
+def test_find_sdk_version_uses_cached_listing(monkeypatch):
+    assert sdk_commands.sdk_list_candidate("java")["success"]
+    monkeypatch.setattr(sdk_commands, "_stream_command_lines", None)
+    found = sdk_commands.find_sdk_version("java", lambda v: v["vendor"] == "Zulu", "8.")
+    assert found["identifier"] == "8.0.402-zulu"
+
+
+def test_stream_lines_filter_and_cut(monkeypatch):
+    monkeypatch.setattr(sdk_commands, "OUTPUT_MAX_BYTES", 32)
+    lines = list(sdk_commands._stream_command_lines(["list", "java"]))
+    assert all(len(line.encode()) <= 32 for line in lines)
+    assert "".join(lines) == sdk_commands._run_command(["list", "java"])[1]
+
+
+def test_stream_sdk_versions_yields_nothing_on_failure():
+    assert list(sdk_commands.stream_sdk_versions("nosuchcandidate")) == []
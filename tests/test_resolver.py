@@ -0,0 +1,130 @@
+import os
+
+import pytest
+
+from sdkman_mcp import sdk_commands
+from sdkman_mcp.resolver import VersionResolver, is_java_lts, parse_constraint, version_key
+from sdkman_mcp.version_index import VersionIndex
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def _resolver(name):
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        return VersionResolver(VersionIndex.from_parsed(sdk_commands.iter_sdk_versions(f)).records)
+
+
+@pytest.fixture(scope="module")
+def java():
+    return _resolver("list-java.txt")
+
+
+@pytest.fixture(scope="module")
+def gradle():
+    return _resolver("list-gradle.txt")
+
+
+@pytest.mark.parametrize("spec, low, high", [
+    ("java@21", (21, 0, 0), (22, 0, 0)),
+    ("java@21.0", (21, 0, 0), (21, 1, 0)),
+    ("java@21.0.2", (21, 0, 2), (21, 0, 3)),
+    ("gradle@^8", (8, 0, 0), (9, 0, 0)),
+    ("gradle@^8.6", (8, 6, 0), (9, 0, 0)),
+    ("kotlin@^0.9", (0, 9, 0), (0, 10, 0)),
+    ("java@~21", (21, 0, 0), (22, 0, 0)),
+    ("java@~21.0", (21, 0, 0), (21, 1, 0)),
+    ("java@>=17,<22", (17, 0, 0), (22, 0, 0)),
+    ("java@>17", (18, 0, 0), None),
+    ("java@<=21", None, (22, 0, 0)),
+    ("java version=17", (17, 0, 0), (18, 0, 0)),
+    ("java@latest", None, None),
+])
+def test_parse_ranges(spec, low, high):
+    constraint = parse_constraint(spec)
+    assert (constraint.low, constraint.high) == (low, high)
+    assert constraint.exact is None
+
+
+def test_parse_filters_and_exact():
+    constraint = parse_constraint("Java@21.0.2-tem vendor=Temurin installed=yes prerelease=0")
+    assert constraint.candidate == "java"
+    assert constraint.exact == "21.0.2-tem"
+    assert constraint.vendor == "Temurin"
+    assert constraint.installed is True
+    assert constraint.prerelease is False
+
+    lts = parse_constraint("latest-lts")
+    assert (lts.candidate, lts.lts) == ("java", True)
+
+
+@pytest.mark.parametrize("spec", [
+    "",
+    "vendor=tem",
+    "java@21 vendor",
+    "java@21 arch=x64",
+    "java@21 installed=maybe",
+    "gradle@lts",
+])
+def test_parse_rejects(spec):
+    with pytest.raises(ValueError):
+        parse_constraint(spec)
+
+
+def test_version_key_ordering():
+    assert version_key("21.0.10") > version_key("21.0.2")
+    assert version_key("21").numbers == version_key("21.0.0").numbers
+    # 预发布版本排在同号正式版之前，变体（.fx）排在普通构建之前
+    assert version_key("23.ea.22") < version_key("23")
+    assert version_key("8.6-rc-1") < version_key("8.6")
+    assert version_key("22.0.1.fx") < version_key("22.0.1")
+    assert not version_key("8.8-rc-1").final
+
+
+@pytest.mark.parametrize("major, lts", [(8, True), (11, True), (17, True), (21, True),
+                                        (25, True), (9, False), (22, False), (23, False)])
+def test_is_java_lts(major, lts):
+    assert is_java_lts(major) is lts
+
+
+@pytest.mark.parametrize("spec, identifier", [
+    # 同一版本号优先已安装的与 SDKMAN 默认发行版
+    ("java@21", "21.0.3-tem"),
+    ("java@21 vendor=zulu", "21.0.3-zulu"),
+    ("java@21 vendor=Liberica", "21.0.3-librca"),
+    ("java@>=17,<21 installed=true", "17.0.11-tem"),
+    ("java@17 installed=false", "17.0.11-amzn"),
+    ("latest-lts", "21.0.3-tem"),
+    ("java@23 vendor=open prerelease=true", "23.ea.22-open"),
+    ("java@8 vendor=kona", "8.0.412-kona"),
+    ("java@jdk-21-dev", "jdk-21-dev"),
+])
+def test_resolve_java(java, spec, identifier):
+    assert java.resolve(parse_constraint(spec)).identifier == identifier
+
+
+def test_resolve_java_without_match(java):
+    # Java.net 的 23 只有 EA 构建
+    assert java.resolve(parse_constraint("java@23 vendor=open")) is None
+    assert java.resolve(parse_constraint("java@21 vendor=nosuchvendor")) is None
+
+
+@pytest.mark.parametrize("spec, identifier", [
+    ("gradle@^8", "8.7"),
+    ("gradle@^7", "7.6.4"),
+    ("gradle@~7.6", "7.6.4"),
+    ("gradle@8.0", "8.0.1"),
+    ("gradle@>=6,<7", "6.9.4"),
+    ("gradle@8 installed=true", "8.6"),
+    ("gradle@^8 prerelease=true", "8.8-rc-1"),
+    ("gradle@8.0-local", "8.0-local"),
+])
+def test_resolve_gradle(gradle, spec, identifier):
+    assert gradle.resolve(parse_constraint(spec)).identifier == identifier
+
+
+def test_matches_best_first(gradle):
+    matches = gradle.matches(parse_constraint("gradle@^8"), limit=3)
+    assert [record.identifier for record in matches] == ["8.7", "8.6", "8.5"]
+    # 本地版本只参与精确匹配，不进入范围
+    everything = gradle.matches(parse_constraint("gradle@8"), limit=100)
+    assert "8.0-local" not in [record.identifier for record in everything]
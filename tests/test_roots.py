@@ -0,0 +1,29 @@
+import pytest
+
+from sdkman_mcp import sdk_commands
+from sdkman_mcp.sdk_commands import get_root
+
+
+def test_default_root():
+    assert get_root() is get_root("default")
+    assert get_root(None).sdkman_dir == sdk_commands.SDKMAN_DIR
+
+
+def test_directories_are_refused_by_default(tmp_path, monkeypatch):
+    (tmp_path / "bin").mkdir()
+    (tmp_path / "bin" / "sdkman-init.sh").write_text("touch pwned\n")
+    monkeypatch.setattr(sdk_commands, "ALLOW_ROOT_PATHS", False)
+    with pytest.raises(ValueError, match="Unknown SDKMAN root"):
+        get_root(str(tmp_path))
+
+
+def test_named_roots_are_accepted(monkeypatch):
+    monkeypatch.setattr(sdk_commands, "ROOTS", {"main": sdk_commands.SDKMAN_DIR})
+    assert get_root("main").sdkman_dir == get_root().sdkman_dir
+    with pytest.raises(ValueError, match="configured roots: main"):
+        get_root("other")
+
+
+def test_directories_when_allowed(monkeypatch):
+    monkeypatch.setattr(sdk_commands, "ALLOW_ROOT_PATHS", True)
+    assert get_root(sdk_commands.SDKMAN_DIR) is get_root()
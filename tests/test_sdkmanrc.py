@@ -0,0 +1,64 @@
+import os
+
+from sdkman_mcp import sdk_commands
+from sdkman_mcp.sdkmanrc import iter_sdkmanrc, parse_sdkmanrc
+
+
+def test_parse_entries_comments_and_duplicates():
+    sdks, errors = parse_sdkmanrc(
+        "# project SDKs\n"
+        "java=21.0.2-tem\n"
+        "\n"
+        "gradle = 8.6  # build\n"
+        "java=17.0.10-tem\n"
+    )
+    assert sdks == [("gradle", "8.6"), ("java", "17.0.10-tem")]
+    assert errors == []
+
+
+def test_parse_rejects_invalid_lines():
+    sdks, errors = parse_sdkmanrc("java\nJava=21\nkotlin=\nmaven=3 9\nscala=3.3.1\n")
+    assert sdks == [("scala", "3.3.1")]
+    assert [error.split(":")[0] for error in errors] == ["line 1", "line 2", "line 3", "line 4"]
+
+
+def test_parse_rejects_shell_metacharacters():
+    sdks, errors = parse_sdkmanrc(
+        "java=21.0.1-tem;touch${IFS}/tmp/x\n"
+        "gradle=$(id)\n"
+        "maven=3.9.6&&true\n"
+        "kotlin=`id`\n"
+        "scala=3.3.1|cat\n"
+        "groovy=4.0.0+build.1\n"
+    )
+    assert sdks == [("groovy", "4.0.0+build.1")]
+    assert len(errors) == 5
+
+
+def test_scan_does_not_run_injected_commands(tmp_path):
+    marker = tmp_path / "injected"
+    project = tmp_path / "project"
+    project.mkdir()
+    (project / ".sdkmanrc").write_text(f"java=21.0.1-tem;touch${{IFS}}{marker}\n")
+    result = sdk_commands.sdk_env_scan(str(tmp_path), install=True)
+    assert not marker.exists()
+    assert result["success"]
+
+
+def test_one_shot_shell_quotes_arguments(tmp_path):
+    marker = tmp_path / "injected"
+    sdk_commands._run_command_oneshot(["home", "java", f"21;touch {marker}"])
+    assert not marker.exists()
+
+
+def test_iter_sdkmanrc_skips_dependency_dirs(tmp_path):
+    for directory in ("a", "a/node_modules/x", "b/c"):
+        os.makedirs(tmp_path / directory)
+    (tmp_path / "a" / ".sdkmanrc").write_text("java=21.0.2-tem\n")
+    (tmp_path / "a" / "node_modules" / "x" / ".sdkmanrc").write_text("java=8.0.402-tem\n")
+    (tmp_path / "b" / "c" / ".sdkmanrc").write_text("gradle=8.6\n")
+    found = [os.path.relpath(rc.path, tmp_path) for rc in iter_sdkmanrc(str(tmp_path))]
+    assert found == [os.path.join("a", ".sdkmanrc"), os.path.join("b", "c", ".sdkmanrc")]
+    assert [rc.path for rc in iter_sdkmanrc(str(tmp_path), max_depth=1)] == [
+        str(tmp_path / "a" / ".sdkmanrc")
+    ]
@@ -0,0 +1,101 @@
+import threading
+import time
+
+import pytest
+
+from sdkman_mcp.singleflight import SingleFlight
+
+
+def _wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def _run_callers(flight, key, func, count):
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(_call(flight, key, func)))
+        for _ in range(count)
+    ]
+    for thread in threads:
+        thread.start()
+    return threads, results
+
+
+def _call(flight, key, func):
+    try:
+        return flight.do(key, func)
+    except Exception as e:
+        return e
+
+
+def test_overlapping_calls_share_one_run():
+    flight = SingleFlight()
+    release = threading.Event()
+    runs = []
+
+    def slow():
+        runs.append(1)
+        release.wait(2)
+        return "output"
+
+    threads, results = _run_callers(flight, ("list", "java"), slow, 5)
+    _wait_for(lambda: flight.stats()["coalesced"] == 4)
+    release.set()
+    for thread in threads:
+        thread.join(2)
+
+    assert len(runs) == 1
+    assert sorted(results) == [("output", False)] + [("output", True)] * 4
+    stats = flight.stats()
+    assert stats["executed"] == 1 and stats["in_flight"] == 0
+    assert stats["coalesced_rate"] == 0.8
+
+
+def test_distinct_keys_run_separately():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def slow():
+        release.wait(2)
+        return threading.get_ident()
+
+    first, first_results = _run_callers(flight, "java", slow, 1)
+    second, second_results = _run_callers(flight, "gradle", slow, 1)
+    _wait_for(lambda: flight.stats()["in_flight"] == 2)
+    release.set()
+    for thread in first + second:
+        thread.join(2)
+    assert first_results[0][1] is False and second_results[0][1] is False
+    assert first_results[0][0] != second_results[0][0]
+
+
+def test_error_reaches_every_waiter():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def failing():
+        release.wait(2)
+        raise RuntimeError("sdk list failed")
+
+    threads, results = _run_callers(flight, "java", failing, 3)
+    _wait_for(lambda: flight.stats()["coalesced"] == 2)
+    release.set()
+    for thread in threads:
+        thread.join(2)
+    assert [str(result) for result in results] == ["sdk list failed"] * 3
+
+    # 失败的调用不会留在进行中，下一次重新执行
+    assert flight.do("java", lambda: "ok") == ("ok", False)
+
+
+def test_sequential_calls_are_not_cached():
+    flight = SingleFlight()
+    counter = iter(range(10))
+    assert flight.do("java", lambda: next(counter)) == (0, False)
+    assert flight.do("java", lambda: next(counter)) == (1, False)
+    with pytest.raises(KeyError):
+        flight.do("java", lambda: {}["missing"])
+    assert flight.stats()["in_flight"] == 0